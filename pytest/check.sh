@@ -10,7 +10,7 @@ if [[ -z "${GITHUB_ACTIONS+x}" ]]; then
   uv run ruff check src
   uv run ruff check tests
   uv run mypy src/testsolar_pytestx --strict
-  uv run mypy src/load.py src/run.py --strict
+  uv run mypy src/load.py src/run.py src/pipeline.py src/worker.py --strict
   uv run pytest tests --durations=5 --cov=. --cov-fail-under=90 --cov-report term
   uv export --no-hashes --no-dev --locked >requirements.txt
 else
@@ -28,6 +28,6 @@ else
   uv run ruff check src
   uv run ruff check tests
   uv run mypy src/testsolar_pytestx --strict
-  uv run mypy src/load.py src/run.py --strict
+  uv run mypy src/load.py src/run.py src/pipeline.py src/worker.py --strict
   uv run pytest tests --durations=5 --cov=. --cov-fail-under=90 --cov-report term
 fi
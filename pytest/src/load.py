@@ -3,15 +3,26 @@ import sys
 from pathlib import Path
 from typing import Optional, List, BinaryIO
 
-from dacite import from_dict
-from testsolar_testtool_sdk.model.param import EntryParam
-
 # 将pytestx加入path
 parent = str(Path(__file__).parent.resolve())
 if parent not in sys.path:
     sys.path.append(parent)
 
+if __name__ == "__main__":
+    # 常驻进程模式下交给常驻进程执行，跳过下面的导入
+    from testsolar_pytestx.worker import check_worker_enable, run_in_worker  # type: ignore[import]
+
+    if check_worker_enable():
+        exit_code = run_in_worker("load", sys.argv)
+        if exit_code is not None:
+            sys.exit(exit_code)
+
+from dacite import from_dict  # noqa: E402
+from testsolar_testtool_sdk.model.param import EntryParam  # noqa: E402
+
 from testsolar_pytestx.collector import collect_testcases  # type: ignore[import] # noqa: E402
+from testsolar_pytestx.log_policy import configure_logger  # type: ignore[import] # noqa: E402
+from testsolar_pytestx.profiling import profile_session  # type: ignore[import] # noqa: E402
 
 
 def collect_testcases_from_args(
@@ -26,8 +37,10 @@ def collect_testcases_from_args(
         entry = from_dict(data_class=EntryParam, data=json.loads(f.read()))
         if workspace:
             entry.ProjectPath = workspace
-        collect_testcases(entry_param=entry, pipe_io=pipe_io)
+        with profile_session(entry.FileReportPath, "load"):
+            collect_testcases(entry_param=entry, pipe_io=pipe_io)
 
 
 if __name__ == "__main__":
+    configure_logger()
     collect_testcases_from_args(sys.argv)
@@ -0,0 +1,51 @@
+import json
+import sys
+from pathlib import Path
+from typing import Optional, List, BinaryIO
+
+# 将pytestx加入path
+parent = str(Path(__file__).parent.resolve())
+if parent not in sys.path:
+    sys.path.append(parent)
+
+if __name__ == "__main__":
+    # 常驻进程模式下交给常驻进程执行，跳过下面的导入
+    from testsolar_pytestx.worker import check_worker_enable, run_in_worker  # type: ignore[import]
+
+    if check_worker_enable():
+        exit_code = run_in_worker("pipeline", sys.argv)
+        if exit_code is not None:
+            sys.exit(exit_code)
+
+from dacite import from_dict  # noqa: E402
+from testsolar_testtool_sdk.model.param import EntryParam  # noqa: E402
+
+from testsolar_pytestx.ini_fixer import fix_pytest_ini  # type: ignore[import] # noqa: E402
+from testsolar_pytestx.log_policy import configure_logger  # type: ignore[import] # noqa: E402
+from testsolar_pytestx.pipeline import load_and_run_testcases  # type: ignore[import] # noqa: E402
+from testsolar_pytestx.profiling import profile_session  # type: ignore[import] # noqa: E402
+
+
+def load_and_run_testcases_from_args(
+    args: List[str], workspace: Optional[str] = None, pipe_io: Optional[BinaryIO] = None
+) -> None:
+    if len(args) != 2:
+        raise SystemExit("Usage: python pipeline.py <entry_file>")
+
+    filename = args[1]
+
+    with open(filename, "r") as f:
+        entry = from_dict(data_class=EntryParam, data=json.loads(f.read()))
+        if workspace:
+            entry.ProjectPath = workspace
+
+        # 检查用户的pytest.ini中是否有冲突配置，如果有冲突配置覆盖
+        with fix_pytest_ini(Path(entry.ProjectPath)), profile_session(
+            entry.FileReportPath, "pipeline"
+        ):
+            load_and_run_testcases(entry=entry, pipe_io=pipe_io)
+
+
+if __name__ == "__main__":
+    configure_logger()
+    load_and_run_testcases_from_args(sys.argv)
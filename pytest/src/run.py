@@ -3,16 +3,27 @@ import sys
 from pathlib import Path
 from typing import Optional, List, BinaryIO
 
-from dacite import from_dict
-from testsolar_testtool_sdk.model.param import EntryParam
-
 # 将pytestx加入path
 parent = str(Path(__file__).parent.resolve())
 if parent not in sys.path:
     sys.path.append(parent)
 
+if __name__ == "__main__":
+    # 常驻进程模式下交给常驻进程执行，跳过下面的导入
+    from testsolar_pytestx.worker import check_worker_enable, run_in_worker  # type: ignore[import]
+
+    if check_worker_enable():
+        exit_code = run_in_worker("run", sys.argv)
+        if exit_code is not None:
+            sys.exit(exit_code)
+
+from dacite import from_dict  # noqa: E402
+from testsolar_testtool_sdk.model.param import EntryParam  # noqa: E402
+
 from testsolar_pytestx.executor import run_testcases  # type: ignore[import] # noqa: E402
 from testsolar_pytestx.ini_fixer import fix_pytest_ini  # type: ignore[import] # noqa: E402
+from testsolar_pytestx.log_policy import configure_logger  # type: ignore[import] # noqa: E402
+from testsolar_pytestx.profiling import profile_session  # type: ignore[import] # noqa: E402
 
 
 def run_testcases_from_args(
@@ -29,9 +40,10 @@ def run_testcases_from_args(
             entry.ProjectPath = workspace
 
         # 检查用户的pytest.ini中是否有冲突配置，如果有冲突配置覆盖
-        with fix_pytest_ini(Path(entry.ProjectPath)):
+        with fix_pytest_ini(Path(entry.ProjectPath)), profile_session(entry.FileReportPath, "run"):
             run_testcases(entry=entry, pipe_io=pipe_io)
 
 
 if __name__ == "__main__":
+    configure_logger()
     run_testcases_from_args(sys.argv)
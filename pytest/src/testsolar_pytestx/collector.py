@@ -3,7 +3,8 @@ import sys
 import traceback
 from collections import defaultdict
 from pathlib import Path
-from typing import BinaryIO, Sequence, Optional, List, Dict, Union, Callable, Set
+from typing import BinaryIO, Sequence, Optional, List, Dict, Union, Callable, Set, Generator
+import pytest
 from loguru import logger
 from pytest import Item, Collector
 
@@ -22,39 +23,68 @@ from .filter import filter_invalid_selector_path
 from .parser import parse_case_attributes
 from .util import append_extra_args
 from .stream import pytest_main_with_output
+from .timing import (
+    NullTimingRecorder,
+    TimingRecorder,
+    create_timing_recorder,
+    get_report_dir,
+    get_timing_profile_path,
+)
+from .import_profiler import IMPORT_PROFILE_FILE, ImportProfiler, check_import_profile_enable
 
 
 class PytestCollector:
-    def __init__(self, report_file_path: Path):
+    def __init__(
+        self,
+        report_file_path: Path,
+        timing: Optional[TimingRecorder] = None,
+        import_profiler: Optional[ImportProfiler] = None,
+    ):
         self.collected: List[Item] = []
         self.errors: Dict[str, str] = {}
         self.reporter: BaseReporter = FileReporter(report_file_path)
+        self.timing = timing or NullTimingRecorder()
+        self.import_profiler = import_profiler
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_make_collect_report(self, collector: Collector) -> Generator[None, None, None]:
+        """
+        开启导入耗时剖析时，将收集节点中发生的导入归属到该节点
+        """
+        if self.import_profiler is None:
+            yield
+            return
+        with self.import_profiler.trigger(collector.nodeid or "<session>"):
+            yield
 
     def pytest_collection_modifyitems(self, items: Sequence[Union[Item, Collector]]) -> None:
-        for item in items:
-            if isinstance(item, Item):
-                self.collected.append(item)
+        with self.timing.measure("hook.pytest_collection_modifyitems"):
+            for item in items:
+                if isinstance(item, Item):
+                    self.collected.append(item)
 
     def pytest_collectreport(self, report: CollectReport) -> None:
-        if report.failed:
-            path = report.fspath
-            if path in self.errors:
-                return
-            path = os.path.splitext(path)[0].replace(os.path.sep, ".")
-            try:
-                __import__(path)
-            except Exception as e:
-                print(e)
-                self.errors[report.fspath] = traceback.format_exc()
+        with self.timing.measure("hook.pytest_collectreport"):
+            if report.failed:
+                path = report.fspath
+                if path in self.errors:
+                    return
+                path = os.path.splitext(path)[0].replace(os.path.sep, ".")
+                try:
+                    __import__(path)
+                except Exception as e:
+                    print(e)
+                    self.errors[report.fspath] = traceback.format_exc()
 
     def pytest_collection_finish(self, session) -> None:  # type: ignore
         """
         在pytest_collection_modifyitems没有被调用的情况下兜底执行.
         """
-        if not self.collected:
-            for item in session.items:
-                if isinstance(item, Item):
-                    self.collected.append(item)
+        with self.timing.measure("hook.pytest_collection_finish"):
+            if not self.collected:
+                for item in session.items:
+                    if isinstance(item, Item):
+                        self.collected.append(item)
 
     def pytest_internalerror(self, excrepr) -> None:  # type: ignore
         if (
@@ -123,7 +153,9 @@ def collect_testcases(
 
     testcase_list = [os.path.join(entry_param.ProjectPath, it) for it in pytest_paths if it]
 
-    my_plugin = PytestCollector(Path(entry_param.FileReportPath))
+    timing = create_timing_recorder()
+    import_profiler = ImportProfiler() if check_import_profile_enable() else None
+    my_plugin = PytestCollector(Path(entry_param.FileReportPath), timing, import_profiler)
     args = [
         f"--rootdir={entry_param.ProjectPath}",
         "--collect-only",
@@ -135,7 +167,19 @@ def collect_testcases(
 
     args.extend(testcase_list)
     logger.info(f"[Load] try to collect testcases: {args}")
-    _, captured_stderr, exit_code = pytest_main_with_output(args=args, plugin=my_plugin)
+    if import_profiler is not None:
+        import_profiler.install()
+    try:
+        with timing.measure("pytest.main"):
+            _, captured_stderr, exit_code = pytest_main_with_output(args=args, plugin=my_plugin)
+    finally:
+        if import_profiler is not None:
+            import_profiler.uninstall()
+    if import_profiler is not None:
+        logger.info("[Load] " + import_profiler.report())
+        import_profiler.write_profile(
+            get_report_dir(Path(entry_param.FileReportPath), "load") / IMPORT_PROFILE_FILE
+        )
     if exit_code != 0:
         # 若加载用例失败，则将本批次的用例结果统一作为loaderror上报，并将标准错误流作为用例错误日志上报
         logger.warning(f"[Warn][Load] collect testcases exit_code: {exit_code}")
@@ -148,10 +192,9 @@ def collect_testcases(
                     )
                 )
 
-    for item in my_plugin.collected:
-        full_name = pytest_to_selector(item, entry_param.ProjectPath)
-        attributes = parse_case_attributes(item, case_comment_fields)
-        load_result.Tests.append(TestCase(Name=full_name, Attributes=attributes))
+    append_collected_testcases(
+        load_result, my_plugin.collected, entry_param.ProjectPath, case_comment_fields, timing
+    )
 
     # 增加额外功能，方便外部接入
     if extra_load_function:
@@ -169,7 +212,28 @@ def collect_testcases(
     logger.info(f"[Load] collect load error count: {len(load_result.LoadErrors)}")
 
     reporter = FileReporter(Path(entry_param.FileReportPath))
-    reporter.report_load_result(load_result)
+    with timing.measure("helper.report_load_result"):
+        reporter.report_load_result(load_result)
+    timing.write_profile(get_timing_profile_path(Path(entry_param.FileReportPath), "load"))
+
+
+def append_collected_testcases(
+    load_result: LoadResult,
+    collected: List[Item],
+    project_path: str,
+    case_comment_fields: Optional[List[str]] = None,
+    timing: Optional[TimingRecorder] = None,
+) -> None:
+    """
+    将收集到的用例转换为选择器格式并解析属性，追加到加载结果中
+    """
+    timing = timing or NullTimingRecorder()
+    to_selector = timing.wrap("helper.pytest_to_selector", pytest_to_selector)
+    parse_attributes = timing.wrap("helper.parse_case_attributes", parse_case_attributes)
+    for item in collected:
+        full_name = to_selector(item, project_path)
+        attributes = parse_attributes(item, case_comment_fields)
+        load_result.Tests.append(TestCase(Name=full_name, Attributes=attributes))
 
 
 def collect_testcases_file_mode(entry_param: EntryParam, load_result: LoadResult) -> None:
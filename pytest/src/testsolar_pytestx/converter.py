@@ -71,6 +71,17 @@ def extract_case_and_datadrive(case_selector: str) -> Tuple[str, str]:
     return case_selector, ""
 
 
+def match_pytest_nodeid(nodeid: str, pytest_arg: str) -> bool:
+    """
+    判断用例nodeid是否属于pytest命令行中的用例参数（目录、文件、类、用例或数据驱动），参数需要相对于rootdir
+    """
+    if pytest_arg in ("", "."):
+        return True
+    return nodeid == pytest_arg or nodeid.startswith(
+        (pytest_arg + "::", pytest_arg + "[", pytest_arg + "/")
+    )
+
+
 def pytest_to_selector(item: Item, project_path: str) -> str:
     """
     translate from pytest format to test selector format
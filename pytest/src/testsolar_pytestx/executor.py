@@ -1,9 +1,15 @@
+import contextlib
+import functools
 import os
 from pathlib import Path
 import sys
+import tempfile
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import BinaryIO, Optional, Dict, Any, List, Callable
+from typing import BinaryIO, Optional, Dict, Any, Iterator, List, Callable, Set, Tuple
 
+import pytest
 from loguru import logger
 from pytest import Item, Session
 
@@ -18,25 +24,69 @@ from testsolar_testtool_sdk.model.testresult import (
     TestResult,
     ResultType,
     TestCaseStep,
+    TestCaseLog,
+    LogLevel,
 )
 from testsolar_testtool_sdk.reporter import BaseReporter, FileReporter
 from enum import Enum
 
 from .case_log import gen_logs
+from .log_policy import ProgressLogger
+from .timing import (
+    NullTimingRecorder,
+    TimingRecorder,
+    create_timing_recorder,
+    get_timing_profile_path,
+)
 from .converter import selector_to_pytest, normalize_testcase_name
 from .extend.allure_extend import (
+    AllureData,
+    ALLURE_BINARY_ATTACHMENTS_DIR,
+    AllureStreamListener,
     check_allure_enable,
-    initialization_allure_dir,
-    generate_allure_results,
+    check_allure_streaming_enable,
+    create_allure_results_dir,
+    cleanup_allure_dir_async,
+    get_allure_results_stale_seconds,
+    purge_stale_allure_dirs,
+    process_allure_results,
+    apply_allure_result,
+    AllureNameIndex,
+    build_allure_name_index,
+    get_allure_attachment_max_bytes,
+    get_allure_attachment_file_max_bytes,
+    read_allure_attachments,
+    register_allure_stream_listener,
+    unregister_allure_stream_listener,
 )
 
 from .extend.coverage_extend import (
+    COVERAGE_CONTEXT_ALL,
+    COVERAGE_CONTEXT_CALL,
+    COVERAGE_CONTEXT_TEST,
     collect_coverage_report,
+    get_coverage_context_mode,
+    switch_coverage_context,
+)
+from .util import (
+    append_extra_args,
+    append_coverage_args,
+    get_coverage_environ,
+    is_xdist_enabled,
+    scoped_environ,
 )
-from .util import append_extra_args, append_coverage_args
+from .fail_fast import FailFastPolicy, create_fail_fast_policy
 from .filter import filter_invalid_selector_path
 from .parser import parse_case_attributes
+from .single_session import (
+    SelectorRun,
+    SingleSessionScheduler,
+    build_session_args,
+    check_single_session_enable,
+    prepare_selector_run,
+)
 from .stream import pytest_main_with_output
+# 重试、快照、崩溃隔离和超时看门狗只在开启对应功能时使用，在函数中延迟导入以缩短启动耗时
 
 # from .header_injection import set_current_test_nodeid
 from .conftest_generator import generate_conftest_for_header_injection
@@ -52,57 +102,238 @@ def should_enable_header_injection() -> bool:
     return os.environ.get("ENABLE_API_COLLECTING", "") == "1"
 
 
+@contextlib.contextmanager
+def measure_pytest_main(timing: TimingRecorder, env: Dict[str, str]) -> Iterator[None]:
+    """
+    记录 pytest.main 的耗时，并只在执行期间设置 env 中的环境变量。
+
+    选择了覆盖率内核时额外按内核名称记录耗时并输出到日志，作为该内核在实际用例集上的开销。
+    """
+    coverage_core = env.get("COVERAGE_CORE")
+    start_time = time.perf_counter()
+    with timing.measure("pytest.main"), scoped_environ(env):
+        if coverage_core:
+            with timing.measure(f"pytest.main.coverage_core.{coverage_core}"):
+                yield
+        else:
+            yield
+    if coverage_core:
+        logger.info(
+            f"pytest.main with coverage core {coverage_core} cost time: "
+            f"{time.perf_counter() - start_time:.2f}s"
+        )
+
+
 class PytestExecutor:
     def __init__(
         self,
         reporter: BaseReporter,
         comment_fields: Optional[List[str]] = None,
         data_drive_key: Optional[str] = None,
+        coverage_context_mode: Optional[str] = None,
+        timing: Optional[TimingRecorder] = None,
+        fail_fast: Optional[FailFastPolicy] = None,
+        allure_binary_dir: str = "",
     ) -> None:
+        from .watchdog import create_timeout_watchdog
+
         self.reporter: BaseReporter = reporter
         self.testcase_count = 0
         self.testdata: Dict[str, TestResult] = {}
         self.skipped_testcase: Dict[str, str] = {}
         self.comment_fields = comment_fields
         self.data_drive_key = data_drive_key
+        # 本次会话中执行过的用例nodeid，用于增量采集覆盖率
+        self.executed_nodeids: Set[str] = set()
+        # 由插件在用例边界切换覆盖率上下文时，是否记录setup/teardown阶段
+        self.switch_coverage_context = coverage_context_mode in [
+            COVERAGE_CONTEXT_CALL,
+            COVERAGE_CONTEXT_ALL,
+        ]
+        self.coverage_all_phases = coverage_context_mode == COVERAGE_CONTEXT_ALL
+        # allure流式处理模式下，用例结果生成后立即转换上报
+        self.allure_listener: Optional[AllureStreamListener] = None
+        self.allure_dir = ""
+        # 保存allure二进制附件的目录，allure结果目录在执行结束后会被删除
+        self.allure_binary_dir = allure_binary_dir
+        self.allure_finished: Set[str] = set()
+        self.allure_applied: Set[str] = set()
+        # 流式处理模式下的用例名称索引，整个会话只建立一次，用例开始时增量加入
+        self.allure_name_index = AllureNameIndex()
+        # 已经处理过的allure结果文件名，快照模式下每一批只处理本批新生成的结果文件
+        self.allure_processed_files: Set[str] = set()
+        # 单个用例的日志为DEBUG级别，INFO级别只按数量和时间间隔聚合输出执行进度
+        self.progress = ProgressLogger()
+        # 用例和会话超时看门狗，未配置超时时间时为None
+        self.watchdog = create_timeout_watchdog()
+        self.timeout_steps: Dict[str, TestCaseStep] = {}
+        # 提前终止策略，在同一次执行的所有会话中共用
+        self.fail_fast = fail_fast
+        self.setup_failed: Set[str] = set()
+        self.session: Optional[Session] = None
+        # 记录各个hook和辅助函数的耗时，未开启耗时剖析时不做任何记录
+        self.timing = timing or NullTimingRecorder()
+        self._normalize_testcase_name = self.timing.wrap(
+            "helper.normalize_testcase_name", normalize_testcase_name
+        )
+        self._parse_case_attributes = self.timing.wrap(
+            "helper.parse_case_attributes", parse_case_attributes
+        )
+        self._gen_logs = self.timing.wrap("helper.gen_logs", gen_logs)
+        self._report_case_result = self.timing.wrap(
+            "helper.report_case_result", reporter.report_case_result
+        )
+        self._switch_coverage_context = self.timing.wrap(
+            "helper.switch_coverage_context", switch_coverage_context
+        )
+        self._process_allure_results = self.timing.wrap(
+            "helper.process_allure_results", process_allure_results
+        )
+
+    def set_reporter(self, reporter: BaseReporter) -> None:
+        """
+        替换上报器，例如快照模式的子进程中需要记录已经上报的用例
+        """
+        self.reporter = reporter
+        self._report_case_result = self.timing.wrap(
+            "helper.report_case_result", reporter.report_case_result
+        )
+
+    def pytest_sessionstart(self, session: Session) -> None:
+        """
+        Called after the Session object has been created and before performing collection.
+        """
+        with self.timing.measure("hook.pytest_sessionstart"):
+            self.session = session
+            if self.watchdog:
+                self.watchdog.start_session(session)
+            if not (check_allure_enable() and check_allure_streaming_enable()):
+                return
+            try:
+                self.allure_dir = session.config.option.allure_report_dir
+            except AttributeError:
+                logger.warning("allure-pytest is not loaded, allure streaming is disabled")
+                return
+            listener = AllureStreamListener(self._on_allure_result)
+            if register_allure_stream_listener(listener):
+                self.allure_listener = listener
+
+    def _on_allure_result(self, allure_data: AllureData) -> None:
+        """
+        单个用例的allure结果生成后立即转换为步骤信息，用例已经结束的直接上报
+        """
+        attachments = read_allure_attachments(
+            allure_data,
+            self.allure_dir,
+            get_allure_attachment_max_bytes(),
+            get_allure_attachment_file_max_bytes(),
+            self.allure_binary_dir,
+        )
+        applied = apply_allure_result(
+            self.testdata,
+            allure_data,
+            self.allure_dir,
+            self.allure_name_index,
+            attachments,
+        )
+        for testcase_name in applied:
+            if testcase_name in self.allure_finished:
+                self._report_allure_testcase(testcase_name)
+            else:
+                self.allure_applied.add(testcase_name)
+
+    def _report_allure_testcase(self, testcase_name: str) -> None:
+        self.allure_finished.discard(testcase_name)
+        self.allure_applied.discard(testcase_name)
+        test_result = self.testdata.pop(testcase_name, None)
+        if test_result:
+            self._restore_timeout_step(testcase_name, test_result)
+            self._report_case_result(test_result)
 
     def pytest_runtest_logstart(self, nodeid: str, location: Any) -> None:
         """
         Called at the start of running the runtest protocol for a single item.
         """
-        logger.info(f"{nodeid} start")
-
-        # 通知ResultHouse用例开始运行
-        testcase_name = normalize_testcase_name(nodeid, self.data_drive_key)
-
-        # 设置当前测试用例的nodeid到上下文
-        # 注意：这里使用处理后的 testcase_class_name，与 conftest.py 中的格式可能不同
-        # conftest.py 中使用原始 nodeid，这里使用处理后的名称
-        # if should_enable_header_injection():
-        #     testcase_class_name = testcase_name.split("?", 1)[-1]
-        #     set_current_test_nodeid(testcase_class_name)
-
-        test_result = TestResult(
-            Test=TestCase(Name=testcase_name),
-            ResultType=ResultType.RUNNING,
-            StartTime=datetime.utcnow(),
-            Message="",
-        )
+        with self.timing.measure("hook.pytest_runtest_logstart"):
+            logger.debug("{} start", nodeid)
+            if self.watchdog:
+                self.watchdog.start_test(nodeid)
+
+            # 通知ResultHouse用例开始运行
+            testcase_name = self._normalize_testcase_name(nodeid, self.data_drive_key)
+
+            # 设置当前测试用例的nodeid到上下文
+            # 注意：这里使用处理后的 testcase_class_name，与 conftest.py 中的格式可能不同
+            # conftest.py 中使用原始 nodeid，这里使用处理后的名称
+            # if should_enable_header_injection():
+            #     testcase_class_name = testcase_name.split("?", 1)[-1]
+            #     set_current_test_nodeid(testcase_class_name)
+
+            test_result = TestResult(
+                Test=TestCase(Name=testcase_name),
+                ResultType=ResultType.RUNNING,
+                StartTime=datetime.utcnow(),
+                Message="",
+            )
+
+            self.testdata[testcase_name] = test_result
+            if self.allure_listener is not None:
+                self.allure_name_index.add(testcase_name)
 
-        self.testdata[testcase_name] = test_result
+            self._report_case_result(test_result)
 
-        self.reporter.report_case_result(test_result)
+    def _switch_coverage_phase(self, nodeid: str, phase: str) -> None:
+        if not self.switch_coverage_context:
+            return
+        if phase == "run" or self.coverage_all_phases:
+            self._switch_coverage_context(f"{nodeid}|{phase}")
+        else:
+            self._switch_coverage_context("")
 
+    @pytest.hookimpl(tryfirst=True)
     def pytest_runtest_setup(self, item: Item) -> None:
         """
         Called to perform the setup phase for a test item.
         """
+        with self.timing.measure("hook.pytest_runtest_setup"):
+            self._switch_coverage_phase(item.nodeid, "setup")
+            if self.watchdog:
+                self.watchdog.arm(item, "setup")
+
+            # 在Setup阶段将用例的属性解析出来并设置到Test中
+            testcase_name = self._normalize_testcase_name(item.nodeid, self.data_drive_key)
+            test_result = self.testdata[testcase_name]
+            if test_result:
+                test_result.Test.Attributes = self._parse_case_attributes(item, self.comment_fields)
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_runtest_call(self, item: Item) -> None:
+        """
+        Called to run the test for test item (the call phase).
+        """
+        with self.timing.measure("hook.pytest_runtest_call"):
+            self._switch_coverage_phase(item.nodeid, "run")
+            if self.watchdog:
+                self.watchdog.arm(item, "call")
 
-        # 在Setup阶段将用例的属性解析出来并设置到Test中
-        testcase_name = normalize_testcase_name(item.nodeid, self.data_drive_key)
-        test_result = self.testdata[testcase_name]
-        if test_result:
-            test_result.Test.Attributes = parse_case_attributes(item, self.comment_fields)
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_runtest_teardown(self, item: Item) -> None:
+        """
+        Called to perform the teardown phase for a test item.
+        """
+        with self.timing.measure("hook.pytest_runtest_teardown"):
+            self._switch_coverage_phase(item.nodeid, "teardown")
+            if self.watchdog:
+                self.watchdog.arm(item, "teardown")
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_runtest_makereport(self, item: Item, call: Any) -> None:
+        """
+        Called to create a TestReport for each of the setup, call and teardown runtest phases.
+        """
+        # 阶段已经结束，在生成报告前停止计时，超时异常只会在阶段执行过程中抛出
+        if self.watchdog:
+            self.watchdog.disarm()
 
     def _get_result_type_by_report(self, report: TestReport) -> ResultType:
         result_type: ResultType
@@ -122,70 +353,73 @@ class PytestExecutor:
         """
         Process the TestReport produced for each of the setup, call and teardown runtest phases of an item.
         """
-        logger.info(f"S {report.nodeid} log report")
+        with self.timing.measure("hook.pytest_runtest_logreport"):
+            logger.debug("S {} log report", report.nodeid)
 
-        testcase_name = normalize_testcase_name(report.nodeid, self.data_drive_key)
-        test_result = self.testdata[testcase_name]
+            testcase_name = self._normalize_testcase_name(report.nodeid, self.data_drive_key)
+            test_result = self.testdata[testcase_name]
 
-        step_end_time = datetime.utcnow()
+            step_end_time = datetime.utcnow()
 
-        result_type: ResultType = self._get_result_type_by_report(report=report)
+            result_type: ResultType = self._get_result_type_by_report(report=report)
 
-        if report.when == "setup":
-            test_result.Steps.append(
-                TestCaseStep(
-                    Title="Setup",
-                    Logs=[gen_logs(report)],
-                    StartTime=step_end_time - timedelta(seconds=report.duration),
-                    EndTime=step_end_time,
-                    ResultType=result_type,
+            if report.when == "setup":
+                test_result.Steps.append(
+                    TestCaseStep(
+                        Title="Setup",
+                        Logs=[self._gen_logs(report)],
+                        StartTime=step_end_time - timedelta(seconds=report.duration),
+                        EndTime=step_end_time,
+                        ResultType=result_type,
+                    )
                 )
-            )
-
-            test_result.ResultType = result_type
-
-            if report.skipped and isinstance(report.longrepr, tuple):
-                file, line, reason = report.longrepr
-                logger.info(f"Skipped {file}:{line}: {reason}")
-                test_result.Message = reason[:1000]
-
-            logger.info(f"{report.nodeid} setup result type: {result_type}")
 
-        elif report.when == "call":
-            test_result.Steps.append(
-                TestCaseStep(
-                    Title="Run TestCase",
-                    Logs=[gen_logs(report)],
-                    StartTime=step_end_time - timedelta(seconds=report.duration),
-                    EndTime=step_end_time,
-                    ResultType=result_type,
+                test_result.ResultType = result_type
+                if report.failed:
+                    self.setup_failed.add(report.nodeid)
+
+                if report.skipped and isinstance(report.longrepr, tuple):
+                    file, line, reason = report.longrepr
+                    logger.debug("Skipped {}:{}: {}", file, line, reason)
+                    test_result.Message = reason[:1000]
+
+                logger.debug("{} setup result type: {}", report.nodeid, result_type)
+
+            elif report.when == "call":
+                test_result.Steps.append(
+                    TestCaseStep(
+                        Title="Run TestCase",
+                        Logs=[self._gen_logs(report)],
+                        StartTime=step_end_time - timedelta(seconds=report.duration),
+                        EndTime=step_end_time,
+                        ResultType=result_type,
+                    )
                 )
-            )
 
-            if not test_result.Message and report.failed:
-                # 避免错误信息过长，因此仅获取前面最多1000个字符
-                test_result.Message = report.longreprtext[:1000]
+                if not test_result.Message and report.failed:
+                    # 避免错误信息过长，因此仅获取前面最多1000个字符
+                    test_result.Message = report.longreprtext[:1000]
 
-            test_result.ResultType = result_type
+                test_result.ResultType = result_type
 
-            logger.info(f"{report.nodeid} call result type: {result_type}")
+                logger.debug("{} call result type: {}", report.nodeid, result_type)
 
-        elif report.when == "teardown":
-            test_result.Steps.append(
-                TestCaseStep(
-                    Title="Teardown",
-                    Logs=[gen_logs(report)],
-                    StartTime=step_end_time - timedelta(seconds=report.duration),
-                    EndTime=step_end_time,
-                    ResultType=result_type,
+            elif report.when == "teardown":
+                test_result.Steps.append(
+                    TestCaseStep(
+                        Title="Teardown",
+                        Logs=[self._gen_logs(report)],
+                        StartTime=step_end_time - timedelta(seconds=report.duration),
+                        EndTime=step_end_time,
+                        ResultType=result_type,
+                    )
                 )
-            )
-            if not test_result.is_final():
-                test_result.ResultType = result_type
+                if not test_result.is_final():
+                    test_result.ResultType = result_type
 
-            logger.info(f"{report.nodeid} teardown result type: {result_type}")
+                logger.debug("{} teardown result type: {}", report.nodeid, result_type)
 
-        logger.info(f"E {report.nodeid} log report")
+            logger.debug("E {} log report", report.nodeid)
 
     def _correct_result_type(
         self, steps: List[TestCaseStep], original_result_type: ResultType, testcase_name: str
@@ -205,58 +439,177 @@ class PytestExecutor:
         """
         Called at the end of running the runtest protocol for a single item.
         """
-        logger.info(f"S {nodeid} runtest_logfinish")
-        testcase_name = normalize_testcase_name(nodeid, self.data_drive_key)
-
-        test_result = self.testdata[testcase_name]
-        test_result.EndTime = datetime.utcnow()
-        # 上报前预先校正一遍测试结果
-        test_result.ResultType = self._correct_result_type(
-            test_result.Steps, test_result.ResultType, testcase_name
-        )
-        self.testcase_count += 1
-        logger.info(
-            f"Testcase {nodeid} finished with result type {test_result.ResultType}, total {self.testcase_count} testcases complete"
+        with self.timing.measure("hook.pytest_runtest_logfinish"):
+            logger.debug("S {} runtest_logfinish", nodeid)
+            testcase_name = self._normalize_testcase_name(nodeid, self.data_drive_key)
+
+            test_result = self.testdata[testcase_name]
+            test_result.EndTime = datetime.utcnow()
+            timeout_log = self.watchdog.finish_test(nodeid) if self.watchdog else None
+            if timeout_log:
+                self._apply_timeout(testcase_name, timeout_log, test_result)
+            # 上报前预先校正一遍测试结果
+            test_result.ResultType = self._correct_result_type(
+                test_result.Steps, test_result.ResultType, testcase_name
+            )
+            self.testcase_count += 1
+            self.executed_nodeids.add(nodeid)
+            setup_failed = nodeid in self.setup_failed
+            self.setup_failed.discard(nodeid)
+            if self.fail_fast and not self.fail_fast.reason:
+                reason = self.fail_fast.record(test_result.ResultType, setup_failed)
+                if reason and self.session is not None:
+                    self.session.shouldstop = reason
+            if self.switch_coverage_context:
+                self._switch_coverage_context("")
+            logger.debug(
+                "Testcase {} finished with result type {}, total {} testcases complete",
+                nodeid,
+                test_result.ResultType,
+                self.testcase_count,
+            )
+            self.progress.update(test_result.ResultType)
+            # 检查是否allure报告，如果是在统一生成json文件后再上报
+            enable_allure = check_allure_enable()
+            if not enable_allure:
+                self._report_case_result(test_result)
+
+                # 上报完成后测试记录就没有用了，删除以节省内存
+                self.testdata.pop(testcase_name, None)
+            elif self.allure_listener is not None:
+                # 流式处理模式下，allure结果已经转换完成的用例直接上报，否则等待allure结果生成
+                self.allure_finished.add(testcase_name)
+                if testcase_name in self.allure_applied:
+                    self._report_allure_testcase(testcase_name)
+
+            # 清除当前测试用例的nodeid
+            # if should_enable_header_injection():
+            #     set_current_test_nodeid(None)
+
+            logger.debug("E {} runtest_logfinish", nodeid)
+
+    def _apply_timeout(self, testcase_name: str, timeout_log: str, test_result: TestResult) -> None:
+        """
+        用例超时时将超时信息和所有线程的调用栈作为单独的步骤写入用例日志，并将用例置为失败
+        """
+        now = datetime.utcnow()
+        timeout_step = TestCaseStep(
+            Title="Timeout",
+            Logs=[TestCaseLog(Time=now, Level=LogLevel.ERROR, Content=timeout_log)],
+            StartTime=test_result.StartTime,
+            EndTime=now,
+            ResultType=ResultType.FAILED,
         )
-        # 检查是否allure报告，如果是在统一生成json文件后再上报
-        enable_allure = check_allure_enable()
-        if not enable_allure:
-            self.reporter.report_case_result(test_result)
-
-            # 上报完成后测试记录就没有用了，删除以节省内存
-            self.testdata.pop(testcase_name, None)
-
-        # 清除当前测试用例的nodeid
-        # if should_enable_header_injection():
-        #     set_current_test_nodeid(None)
-
-        logger.info(f"E {nodeid} runtest_logfinish")
+        test_result.Steps.append(timeout_step)
+        test_result.ResultType = ResultType.FAILED
+        test_result.Message = timeout_log.split("\n", 1)[0]
+        if check_allure_enable():
+            # allure结果会替换用例的步骤，上报前需要重新添加超时步骤
+            self.timeout_steps[testcase_name] = timeout_step
+
+    def _restore_timeout_step(self, testcase_name: str, test_result: TestResult) -> None:
+        timeout_step = self.timeout_steps.pop(testcase_name, None)
+        if timeout_step and timeout_step not in test_result.Steps:
+            test_result.Steps.append(timeout_step)
+
+    def _report_not_executed(self, session: Session, message: str) -> None:
+        """
+        会话提前终止后没有执行的用例上报为IGNORED
+        """
+        for item in session.items:
+            if item.nodeid in self.executed_nodeids:
+                continue
+            testcase_name = self._normalize_testcase_name(item.nodeid, self.data_drive_key)
+            self._report_case_result(
+                TestResult(
+                    Test=TestCase(Name=testcase_name),
+                    ResultType=ResultType.IGNORED,
+                    StartTime=datetime.utcnow(),
+                    EndTime=datetime.utcnow(),
+                    Message=message,
+                )
+            )
 
     def pytest_sessionfinish(self, session: Session, exitstatus: int) -> None:
         """
         allure json报告在所有用例运行完才能生成, 故在运行用例结束后生成result并上报
         """
-        logger.info(f"S {session.nodeid} session finish")
+        with self.timing.measure("hook.pytest_sessionfinish"):
+            logger.info(f"S {session.nodeid} session finish")
+            if self.watchdog:
+                self.watchdog.close()
+            if self.watchdog and self.watchdog.is_session_expired():
+                self._report_not_executed(
+                    session,
+                    "Not executed because session exceeded timeout of "
+                    f"{self.watchdog.session_timeout}s",
+                )
+            elif self.fail_fast and self.fail_fast.reason:
+                self._report_not_executed(session, f"Not executed: {self.fail_fast.reason}")
+            self.progress.finish()
+            self.report_allure_results(session)
+
+    def report_allure_results(self, session: Session) -> None:
+        """
+        将等待allure结果的用例转换后上报
+        """
         enable_allure = check_allure_enable()
         if not enable_allure:
             return
+        if self.allure_listener is not None:
+            unregister_allure_stream_listener(self.allure_listener)
+            self.allure_listener = None
+            # 流式处理模式下只需要处理还没有收到allure结果的用例
+            if not self.testdata:
+                logger.info(f"E {session.nodeid} session finish")
+                return
         allure_dir = session.config.option.allure_report_dir
-        for file_name in os.listdir(allure_dir):
-            if not file_name.endswith("result.json"):
-                continue
-            generate_allure_results(self.testdata, os.path.join(allure_dir, file_name), allure_dir)
-        for _, test_result in self.testdata.items():
-            self.reporter.report_case_result(test_result)
+        # 只建立一次用例名称索引，每个结果文件按索引查找对应用例
+        name_index = build_allure_name_index(self.testdata.keys())
+        processed = self._process_allure_results(
+            self.testdata,
+            allure_dir,
+            name_index,
+            binary_dir=self.allure_binary_dir,
+            skip_files=self.allure_processed_files,
+        )
+        self.allure_processed_files.update(processed)
+        for testcase_name, test_result in self.testdata.items():
+            self._restore_timeout_step(testcase_name, test_result)
+            self._report_case_result(test_result)
         logger.info(f"E {session.nodeid} session finish")
 
 
+def report_not_executed_selectors(
+    reporter: BaseReporter, selectors: List[str], reason: str
+) -> None:
+    """
+    提前终止后将还没有执行的用例选择器上报为IGNORED
+    """
+    for selector in selectors:
+        reporter.report_case_result(
+            TestResult(
+                Test=TestCase(Name=selector),
+                ResultType=ResultType.IGNORED,
+                StartTime=datetime.utcnow(),
+                EndTime=datetime.utcnow(),
+                Message=f"Not executed: {reason}",
+            )
+        )
+
+
 def run_testcases(
     entry: EntryParam,
     pipe_io: Optional[BinaryIO] = None,
     case_comment_fields: Optional[List[str]] = None,
     run_mode: Optional[RunMode] = RunMode.BATCH,
     extra_run_function: Optional[Callable[[str, str, List[str]], str]] = None,
+    extra_plugins: Optional[List[Any]] = None,
 ) -> None:
+    from .rerun import FailedCaseRecorder, get_rerun_attempts, rerun_failed_cases
+
+    # 本次运行的开始时间，用于排除之前运行遗留的覆盖率数据
+    run_start = time.time()
     if entry.ProjectPath not in sys.path:
         sys.path.insert(0, entry.ProjectPath)
 
@@ -283,23 +636,100 @@ def run_testcases(
 
     # check allure
     enable_allure = check_allure_enable()
+    allure_dir = ""
+    allure_binary_dir = ""
     if enable_allure:
         print("Start allure test")
-        # 通过给allure_results增加当前进程pid来生成唯一的路径，避免并发冲突
-        process_id = os.getpid()
-        allure_dir = os.path.join(entry.ProjectPath, f"allure_results_{process_id}")
+        # 每次执行使用新建的唯一目录（优先放在tmpfs上），无需删除旧目录，避免并发冲突
+        allure_dir = create_allure_results_dir()
         args.append("--alluredir={}".format(allure_dir))
-        initialization_allure_dir(allure_dir)
+        allure_binary_dir = os.path.join(entry.FileReportPath, ALLURE_BINARY_ATTACHMENTS_DIR)
+        # 在后台清理本工具的根目录下异常退出遗留的过期目录
+        threading.Thread(
+            target=purge_stale_allure_dirs,
+            args=(
+                [os.path.dirname(allure_dir)],
+                get_allure_results_stale_seconds(),
+                [allure_dir],
+            ),
+            name="allure-janitor",
+            daemon=True,
+        ).start()
 
     code_packages: List[str] = append_coverage_args(args, valid_selectors, entry.FileReportPath)
+    coverage_context_mode = get_coverage_context_mode() if code_packages else None
+    if coverage_context_mode and is_xdist_enabled(args):
+        # 与 append_coverage_args 一致，xdist 下由子进程中的 pytest-cov 记录上下文
+        coverage_context_mode = COVERAGE_CONTEXT_TEST
+    # 只在执行 pytest 期间设置的环境变量，崩溃隔离模式下 fork 出的子进程同样继承
+    pytest_env = get_coverage_environ(code_packages)
 
     append_extra_args(args)
 
-    reporter: BaseReporter = FileReporter(report_path=Path(entry.FileReportPath))
+    file_reporter = FileReporter(report_path=Path(entry.FileReportPath))
+    reporter: BaseReporter = file_reporter
+    rerun_attempts = get_rerun_attempts()
+    if rerun_attempts and run_mode != RunMode.BATCH:
+        logger.warning("Rerun of failed testcases is only supported in batch mode, disabled")
+        rerun_attempts = 0
+    failed_record_path = ""
+    if rerun_attempts:
+        # 记录首次执行失败的用例，执行结束后在新的进程中重试
+        fd, failed_record_path = tempfile.mkstemp(prefix="testsolar_failed_", suffix=".jsonl")
+        os.close(fd)
+        reporter = FailedCaseRecorder(file_reporter, failed_record_path)
+    timing = create_timing_recorder()
+    timing_profile_path = get_timing_profile_path(Path(entry.FileReportPath), "run")
     exit_code = 0
     captured_stderr = ""
-    if run_mode == RunMode.SINGLE:
+    testcase_count = 0
+    executed_nodeids: Set[str] = set()
+    # 满足提前终止条件后不再执行剩余的用例和批次
+    fail_fast = create_fail_fast_policy()
+    if run_mode == RunMode.SINGLE and check_single_session_enable():
+        if extra_run_function is None:
+            logger.error("[Error] Extra run function is not set, Please check extra_run_function")
+            return
+        # 连续的、选项相同的选择器在同一个会话中执行，每个会话只初始化一次配置、插件、conftest和会话级fixture
+        pending = [SelectorRun(selector=it) for it in valid_selectors]
+        prepare = functools.partial(
+            prepare_selector_run,
+            project_path=entry.ProjectPath,
+            base_args=args,
+            extra_run_function=extra_run_function,
+        )
+        while pending:
+            if fail_fast and fail_fast.reason:
+                report_not_executed_selectors(
+                    reporter, [run.selector for run in pending], fail_fast.reason
+                )
+                break
+            prepare(pending[0])
+            session_args = build_session_args(pending, entry.ProjectPath)
+            logger.info(f"Pytest single session run args: {session_args}")
+            my_plugin = PytestExecutor(
+                reporter=reporter,
+                comment_fields=case_comment_fields,
+                coverage_context_mode=coverage_context_mode,
+                timing=timing,
+                fail_fast=fail_fast,
+                allure_binary_dir=allure_binary_dir,
+            )
+            scheduler = SingleSessionScheduler(my_plugin, pending, entry.ProjectPath, prepare)
+            with measure_pytest_main(timing, pytest_env):
+                _, captured_stderr, exit_code = pytest_main_with_output(
+                    args=session_args,
+                    plugin=my_plugin,
+                    extra_plugins=[*(extra_plugins or []), scheduler],
+                )
+            testcase_count = my_plugin.testcase_count
+            executed_nodeids.update(my_plugin.executed_nodeids)
+            pending = scheduler.remaining
+    elif run_mode == RunMode.SINGLE:
         for it in valid_selectors:
+            if fail_fast and fail_fast.reason:
+                report_not_executed_selectors(reporter, [it], fail_fast.reason)
+                continue
             serial_args = args.copy()
 
             if extra_run_function is None:
@@ -313,22 +743,91 @@ def run_testcases(
                 reporter=reporter,
                 comment_fields=case_comment_fields,
                 data_drive_key=data_drive_key,
+                coverage_context_mode=coverage_context_mode,
+                timing=timing,
+                fail_fast=fail_fast,
+                allure_binary_dir=allure_binary_dir,
             )
-            _, captured_stderr, exit_code = pytest_main_with_output(
-                args=serial_args, plugin=my_plugin
-            )
+            with measure_pytest_main(timing, pytest_env):
+                _, captured_stderr, exit_code = pytest_main_with_output(
+                    args=serial_args, plugin=my_plugin, extra_plugins=extra_plugins
+                )
+            testcase_count = my_plugin.testcase_count
+            executed_nodeids.update(my_plugin.executed_nodeids)
     else:
         # 注意：传递给pytest中的用例必须在执行时能找到，否则pytest会报错
         # TODO: pytest执行出错时，将用例都设置为IGNORED，并设置错误原因
-        args.extend(
-            [
-                os.path.join(entry.ProjectPath, selector_to_pytest(it)) if it != "." else "."
-                for it in valid_selectors
-            ]
+        test_args = [
+            os.path.join(entry.ProjectPath, selector_to_pytest(it)) if it != "." else "."
+            for it in valid_selectors
+        ]
+        logger.info(f"Pytest run args: {args + test_args}")
+
+        def create_batch_plugins(batch_reporter: BaseReporter) -> Tuple[PytestExecutor, List[Any]]:
+            from .snapshot import (
+                SessionSnapshot,
+                check_snapshot_enable,
+                get_snapshot_batch_size,
+                is_snapshot_supported,
+            )
+
+            batch_plugin = PytestExecutor(
+                reporter=batch_reporter,
+                comment_fields=case_comment_fields,
+                coverage_context_mode=coverage_context_mode,
+                timing=timing,
+                fail_fast=fail_fast,
+                allure_binary_dir=allure_binary_dir,
+            )
+            batch_plugins: List[Any] = list(extra_plugins or [])
+            if check_snapshot_enable():
+                if code_packages:
+                    logger.warning("Snapshot mode does not support coverage collection, disabled")
+                elif not is_snapshot_supported():
+                    logger.warning("Snapshot mode requires fork, disabled")
+                else:
+                    batch_plugins.append(
+                        SessionSnapshot(batch_plugin, valid_selectors, get_snapshot_batch_size())
+                    )
+            return batch_plugin, batch_plugins
+
+        from .supervisor import (
+            CrashSupervisor,
+            check_crash_isolation_enable,
+            get_crash_max_restarts,
+            is_crash_isolation_supported,
         )
-        logger.info(f"Pytest run args: {args}")
-        my_plugin = PytestExecutor(reporter=reporter, comment_fields=case_comment_fields)
-        _, captured_stderr, exit_code = pytest_main_with_output(args=args, plugin=my_plugin)
+
+        crash_isolation = check_crash_isolation_enable()
+        if crash_isolation and not is_crash_isolation_supported():
+            logger.warning("Crash isolation mode requires fork, disabled")
+            crash_isolation = False
+        if crash_isolation:
+            # 在子进程中执行用例，子进程崩溃后上报崩溃用例并在新的子进程中继续执行剩余用例
+            supervisor = CrashSupervisor(
+                reporter,
+                create_batch_plugins,
+                entry.ProjectPath,
+                max_restarts=get_crash_max_restarts(),
+                fail_fast=fail_fast,
+            )
+            with measure_pytest_main(timing, pytest_env):
+                supervised = supervisor.run(args, test_args)
+            exit_code = supervised.exit_code
+            captured_stderr = supervised.captured_output
+            testcase_count = supervised.testcase_count
+            executed_nodeids.update(supervised.executed_nodeids)
+        else:
+            my_plugin, batch_plugins = create_batch_plugins(reporter)
+            with measure_pytest_main(timing, pytest_env):
+                _, captured_stderr, exit_code = pytest_main_with_output(
+                    args=args + test_args, plugin=my_plugin, extra_plugins=batch_plugins
+                )
+            testcase_count = my_plugin.testcase_count
+            executed_nodeids.update(my_plugin.executed_nodeids)
+    if allure_dir:
+        # allure结果在各个pytest会话结束时已经处理完成，后台删除结果目录
+        cleanup_allure_dir_async(allure_dir)
     if exit_code != 0:
         if exit_code == 5:
             logger.warning("all testcases has been filtered")
@@ -336,7 +835,7 @@ def run_testcases(
             # 若pytest没有成功执行，则将本批次的用例结果统一设置为FAILED，并将标准错误流作为用例错误日志上报
             msg = f"Pytest run exit with code {exit_code}"
             logger.error(msg)
-            if my_plugin.testcase_count == 0:
+            if testcase_count == 0:
                 for selector in valid_selectors:
                     test_result = TestResult(
                         Test=TestCase(Name=selector),
@@ -345,8 +844,24 @@ def run_testcases(
                         Message=captured_stderr or msg,
                     )
                     reporter.report_case_result(test_result)
+                if failed_record_path:
+                    os.unlink(failed_record_path)
+                timing.write_profile(timing_profile_path)
                 return
     if len(code_packages) > 0:
         # 如果存在需要采集覆盖率的代码包，则生成覆盖率报告
-        collect_coverage_report(entry.ProjectPath, entry.FileReportPath, code_packages)
+        with timing.measure("helper.collect_coverage_report"):
+            collect_coverage_report(
+                entry.ProjectPath,
+                entry.FileReportPath,
+                code_packages,
+                executed_nodeids,
+                run_start=run_start,
+            )
+    if failed_record_path:
+        # 在覆盖率报告生成之后重试，重试进程不采集覆盖率
+        with timing.measure("helper.rerun_failed_cases"):
+            rerun_failed_cases(entry, failed_record_path, file_reporter, rerun_attempts)
+        os.unlink(failed_record_path)
+    timing.write_profile(timing_profile_path)
     logger.info("pytest process exit")
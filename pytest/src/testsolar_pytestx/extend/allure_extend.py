@@ -1,13 +1,16 @@
 import json
 import os
 import shutil
+import tempfile
+import threading
+import time
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Any, Callable, List, Dict, Iterable, Optional, Set, Tuple
 from loguru import logger
 from pathlib import Path
 
-from dacite import from_dict
+import pluggy
 from testsolar_testtool_sdk.model.testresult import (
     TestCaseLog,
     LogLevel,
@@ -16,6 +19,52 @@ from testsolar_testtool_sdk.model.testresult import (
     TestCaseStep,
 )
 
+from ..converter import CASE_DRIVE_SEPARATOR
+
+# 单个用例默认最多读取的附件字节数
+ALLURE_ATTACHMENT_MAX_BYTES: int = 10 * 1024 * 1024
+
+# 单个附件默认最多读取的字节数，超出时保留首尾内容
+ALLURE_ATTACHMENT_FILE_MAX_BYTES: int = 1024 * 1024
+
+# 附件内容被截断时追加的提示
+ALLURE_ATTACHMENT_TRUNCATED: str = "\n...[attachment truncated]"
+
+# 除 text/* 之外按文本内联的附件类型，其余已知类型的附件只引用文件路径
+ALLURE_TEXT_ATTACHMENT_TYPES = {
+    "application/json",
+    "application/xml",
+    "application/javascript",
+    "application/x-yaml",
+    "application/yaml",
+    "application/x-sh",
+}
+
+# 附件类型未知时用于判断是否为二进制内容的字节数
+ALLURE_ATTACHMENT_SNIFF_BYTES: int = 1024
+
+
+# Allure 结果目录名前缀，清理过期目录时据此识别
+ALLURE_RESULTS_DIR_PREFIX: str = "allure_results_"
+
+# 本工具创建的 Allure 结果目录所在的根目录名，只清理该根目录下的过期目录
+ALLURE_RESULTS_ROOT_NAME: str = "testsolar_allure"
+
+# 优先用于存放 Allure 结果的内存文件系统
+ALLURE_RESULTS_TMPFS_DIR: str = "/dev/shm"
+
+# 内存文件系统的剩余空间低于该值（字节）时改用磁盘上的临时目录
+ALLURE_RESULTS_TMPFS_MIN_FREE_BYTES: int = 512 * 1024 * 1024
+
+# 二进制附件复制到报告目录下的该子目录中，Allure 结果目录删除后附件路径仍然有效
+ALLURE_BINARY_ATTACHMENTS_DIR: str = "allure_attachments"
+
+# 超过该时间（秒）未修改的 Allure 结果目录视为过期
+ALLURE_RESULTS_STALE_SECONDS: int = 24 * 60 * 60
+
+# Allure 插件体系使用的 hookimpl 标记，与 allure_commons.hookimpl 等价，无需导入 allure 即可声明实现
+allure_hookimpl = pluggy.HookimplMarker("allure")
+
 
 # 定义数据类，用于表示Allure报告中的各种结构
 @dataclass
@@ -64,6 +113,64 @@ class AllureData:
     attachments: Optional[List[Attachments]] = None
 
 
+def _decode_attachments(data: Optional[List[Dict[str, Any]]]) -> Optional[List[Attachments]]:
+    if not data:
+        return None
+    return [Attachments(name=it["name"], source=it["source"], type=it["type"]) for it in data]
+
+
+def _decode_steps(data: Optional[List[Dict[str, Any]]]) -> List[Step]:
+    if not data:
+        return []
+    steps: List[Step] = []
+    for it in data:
+        status_details = it.get("statusDetails")
+        parameters = it.get("parameters")
+        steps.append(
+            Step(
+                name=it["name"],
+                status=it["status"],
+                start=it["start"],
+                stop=it["stop"],
+                parameters=[Parameter(name=p["name"], value=p["value"]) for p in parameters]
+                if parameters
+                else [],
+                steps=_decode_steps(it.get("steps")),
+                statusDetails=StatusDetails(
+                    message=status_details.get("message"), trace=status_details.get("trace")
+                )
+                if status_details
+                else None,
+                attachments=_decode_attachments(it.get("attachments")),
+            )
+        )
+    return steps
+
+
+def decode_allure_data(data: Dict[str, Any]) -> AllureData:
+    """
+    将 Allure 结果 JSON 解码为 AllureData。
+
+    按照 Allure 结果的固定结构直接构造数据类，代替 dacite 基于类型注解的通用解码，
+    并跳过转换过程中不会使用的 labels 字段。
+
+    :param data: Allure 结果 JSON 数据
+    :return: Allure 结果数据
+    """
+    return AllureData(
+        name=data["name"],
+        status=data["status"],
+        start=data["start"],
+        stop=data["stop"],
+        uuid=data["uuid"],
+        historyId=data["historyId"],
+        testCaseId=data["testCaseId"],
+        fullName=data["fullName"],
+        steps=_decode_steps(data.get("steps")),
+        attachments=_decode_attachments(data.get("attachments")),
+    )
+
+
 def check_allure_enable() -> bool:
     """
     检查环境变量以确定是否启用Allure报告。
@@ -71,29 +178,486 @@ def check_allure_enable() -> bool:
     return os.getenv("TESTSOLAR_TTP_ENABLEALLURE", "") in ["1", "true"]
 
 
-def initialization_allure_dir(allure_dir: str) -> None:
+def check_allure_streaming_enable() -> bool:
     """
-    初始化 Allure 报告目录。如果指定的目录存在，则删除该目录及其所有内容。然后重新创建一个空目录。
+    检查环境变量以确定是否在用例执行过程中逐个处理Allure结果。
+    """
+    return os.getenv("TESTSOLAR_TTP_ALLURESTREAMING", "") in ["1", "true"]
+
+
+class AllureStreamListener:
+    """
+    Allure 结果监听器。
 
-    :param allure_dir: Allure 报告目录路径
+    注册到 allure_commons 的插件管理器后，每个用例的 Allure 结果生成时都会立即回调，
+    不需要等到会话结束后再扫描结果目录。
     """
-    logger.info(f"Initializing Allure directory: {allure_dir}")
-    if Path(allure_dir).exists():
-        logger.info(f"Directory {allure_dir} exists. Removing it.")
+
+    def __init__(self, callback: Callable[[AllureData], None]) -> None:
+        self.callback = callback
+
+    @allure_hookimpl
+    def report_result(self, result: Any) -> None:
         try:
-            shutil.rmtree(allure_dir)
-        except (OSError, FileNotFoundError) as e:
-            logger.warning(f"Failed to remove existing directory {allure_dir}: {e}")
+            import attr
+
+            # 与 AllureFileLogger 写入结果文件时使用相同的字段过滤规则
+            data = attr.asdict(result, filter=lambda _, v: v or v is False)
+            allure_data = decode_allure_data(data)
+        except Exception as e:
+            logger.warning(f"Failed to convert allure result: {e}")
+            return
+        self.callback(allure_data)
 
+
+def register_allure_stream_listener(listener: AllureStreamListener) -> bool:
+    """
+    将监听器注册到 allure_commons 的插件管理器。
+
+    :param listener: Allure 结果监听器
+    :return: 是否注册成功，未安装 allure-pytest 时返回 False
+    """
     try:
-        os.makedirs(allure_dir, exist_ok=True)
-        logger.info(f"Directory {allure_dir} created.")
+        import allure_commons
+    except ImportError:
+        logger.warning("allure-pytest is not installed, allure streaming is disabled")
+        return False
+    allure_commons.plugin_manager.register(listener)
+    return True
+
+
+def unregister_allure_stream_listener(listener: AllureStreamListener) -> None:
+    """
+    从 allure_commons 的插件管理器中移除监听器。
+    """
+    try:
+        import allure_commons
+    except ImportError:
+        return
+    if allure_commons.plugin_manager.is_registered(listener):
+        allure_commons.plugin_manager.unregister(listener)
+
+
+def _has_free_space(path: str, min_free_bytes: int) -> bool:
+    try:
+        return shutil.disk_usage(path).free >= min_free_bytes
+    except OSError:
+        return False
+
+
+def get_allure_results_base_dir() -> str:
+    """
+    获取存放 Allure 结果目录的父目录。
+
+    优先使用 TESTSOLAR_TTP_ALLURERESULTSDIR 指定的目录，其次是可写且剩余空间充足的 tmpfs（/dev/shm），
+    最后是系统临时目录。
+    """
+    base_dir = os.getenv("TESTSOLAR_TTP_ALLURERESULTSDIR", "")
+    if base_dir:
+        return base_dir
+    if os.path.isdir(ALLURE_RESULTS_TMPFS_DIR) and os.access(
+        ALLURE_RESULTS_TMPFS_DIR, os.W_OK | os.X_OK
+    ):
+        if _has_free_space(ALLURE_RESULTS_TMPFS_DIR, ALLURE_RESULTS_TMPFS_MIN_FREE_BYTES):
+            return ALLURE_RESULTS_TMPFS_DIR
+        logger.info(f"Not enough free space in {ALLURE_RESULTS_TMPFS_DIR}, use temp dir instead")
+    return tempfile.gettempdir()
+
+
+def get_allure_results_root() -> str:
+    """
+    获取本工具创建 Allure 结果目录的根目录，位于 get_allure_results_base_dir 之下。
+    """
+    return os.path.join(get_allure_results_base_dir(), ALLURE_RESULTS_ROOT_NAME)
+
+
+def create_allure_results_dir(root_dir: Optional[str] = None) -> str:
+    """
+    为本次执行创建一个新的 Allure 结果目录，目录名包含当前进程 pid，不会与其他执行冲突。
+
+    :param root_dir: 存放结果目录的根目录，为空时使用 get_allure_results_root 的结果
+    :return: 新建的 Allure 结果目录
+    """
+    base_dir = root_dir or get_allure_results_root()
+    os.makedirs(base_dir, exist_ok=True)
+    allure_dir = tempfile.mkdtemp(prefix=f"{ALLURE_RESULTS_DIR_PREFIX}{os.getpid()}_", dir=base_dir)
+    logger.info(f"Created Allure directory: {allure_dir}")
+    return allure_dir
+
+
+def get_allure_results_stale_seconds() -> float:
+    """
+    获取 Allure 结果目录的过期时间（秒），<=0 表示不清理过期目录。
+    """
+    try:
+        return float(
+            os.getenv("TESTSOLAR_TTP_ALLURERESULTSSTALESECONDS", "") or ALLURE_RESULTS_STALE_SECONDS
+        )
+    except ValueError:
+        return ALLURE_RESULTS_STALE_SECONDS
+
+
+def purge_stale_allure_dirs(
+    base_dirs: Iterable[str], stale_seconds: float, exclude: Iterable[str] = ()
+) -> List[str]:
+    """
+    删除根目录下超过过期时间未修改的 Allure 结果目录，用于清理异常退出的执行遗留的目录。
+
+    只应传入本工具自己的根目录（见 get_allure_results_root），不能传入用户项目等目录，避免误删用户的文件。
+
+    :param base_dirs: 需要检查的根目录列表
+    :param stale_seconds: 过期时间（秒），<=0 表示不清理
+    :param exclude: 不需要清理的目录
+    :return: 被删除的目录列表
+    """
+    removed: List[str] = []
+    if stale_seconds <= 0:
+        return removed
+
+    excluded = {os.path.abspath(it) for it in exclude}
+    deadline = time.time() - stale_seconds
+    for base_dir in set(base_dirs):
+        try:
+            entries = list(os.scandir(base_dir))
+        except OSError:
+            continue
+        for entry in entries:
+            if not entry.name.startswith(ALLURE_RESULTS_DIR_PREFIX):
+                continue
+            if os.path.abspath(entry.path) in excluded:
+                continue
+            try:
+                if not entry.is_dir(follow_symlinks=False):
+                    continue
+                if entry.stat(follow_symlinks=False).st_mtime > deadline:
+                    continue
+            except OSError:
+                continue
+            shutil.rmtree(entry.path, ignore_errors=True)
+            removed.append(entry.path)
+
+    if removed:
+        logger.info(f"Purged {len(removed)} stale Allure directories")
+    return removed
+
+
+def cleanup_allure_dir_async(allure_dir: str) -> threading.Thread:
+    """
+    在后台线程中删除已经处理完成的 Allure 结果目录，不阻塞后续的覆盖率收集等流程。
+
+    线程不是守护线程，进程退出前会等待删除完成。
+
+    :param allure_dir: Allure 结果目录
+    :return: 执行删除的线程
+    """
+    thread = threading.Thread(
+        target=shutil.rmtree,
+        args=(allure_dir,),
+        kwargs={"ignore_errors": True},
+        name="allure-cleanup",
+    )
+    thread.start()
+    return thread
+
+
+@dataclass
+class AllureNameIndex:
+    """
+    testsolar 用例名称的索引，用于根据 Allure 的 fullName 快速找到对应用例。
+    """
+
+    # 格式化后的完整用例名称（包含参数部分） -> 用例名称列表
+    exact: Dict[str, List[str]] = field(default_factory=dict)
+    # 去掉参数部分和数据驱动部分的用例名称的各级后缀（按.分隔） -> 用例名称列表
+    suffix: Dict[str, List[str]] = field(default_factory=dict)
+    # 用例名称 -> 格式化后的完整用例名称
+    format_names: Dict[str, str] = field(default_factory=dict)
+
+    def add(self, testcase_name: str) -> None:
+        """
+        将一个用例名称加入索引，已经在索引中的用例不会重复加入。
+        """
+        if testcase_name in self.format_names:
+            return
+        format_name = format_testcase_name(testcase_name)
+        self.format_names[testcase_name] = format_name
+        self.exact.setdefault(format_name, []).append(testcase_name)
+
+        # 处理参数化和数据驱动测试用例：使用基础名称的各级后缀建立索引
+        parts = get_base_name(format_name).split(".")
+        for i in range(len(parts)):
+            self.suffix.setdefault(".".join(parts[i:]), []).append(testcase_name)
+
+
+def format_testcase_name(testcase_name: str) -> str:
+    """
+    将 testsolar 用例名称格式化为与 Allure fullName 相同的点分格式。
+
+    :param testcase_name: testsolar 用例名称，例如 a/test_b.py?test_c/[data0]
+    :return: 格式化后的名称，例如 a.test_b.test_c[data0]
+    """
+    return ".".join(testcase_name.replace(".py?", os.sep).replace("/[", "[").split(os.sep))
+
+
+def get_base_name(format_name: str) -> str:
+    """
+    去掉格式化后用例名称中的参数部分和数据驱动部分。
+
+    :param format_name: 格式化后的用例名称，例如 a.test_b.test_c[data0] 或 a.test_b.test_c→key1
+    :return: 基础名称，例如 a.test_b.test_c
+    """
+    return format_name.split("[")[0].split(CASE_DRIVE_SEPARATOR)[0]
+
+
+def build_allure_name_index(test_names: Iterable[str]) -> AllureNameIndex:
+    """
+    为所有用例名称建立一次索引，之后每个 Allure 结果文件只需要常数次查找即可匹配用例。
+
+    :param test_names: testsolar 用例名称
+    :return: 用例名称索引
+    """
+    index = AllureNameIndex()
+    for testcase_name in test_names:
+        index.add(testcase_name)
+    return index
+
+
+def match_allure_testcases(index: AllureNameIndex, full_name: str, name: str) -> List[str]:
+    """
+    根据 Allure 结果的 fullName 和 name 查找对应的用例名称。
+
+    :param index: 用例名称索引
+    :param full_name: 将 # 替换为 . 之后的 Allure fullName
+    :param name: Allure 结果中的用例名称，参数化用例会带有参数部分
+    :return: 匹配到的用例名称列表
+    """
+    # 参数化用例优先按照完整参数精确匹配
+    if "[" in name:
+        matched = index.exact.get(full_name + name[name.index("[") :])
+        if matched:
+            return list(matched)
+
+    matched = list(index.exact.get(full_name, []))
+    for testcase_name in index.suffix.get(full_name, []):
+        if testcase_name in matched:
+            continue
+        format_name = index.format_names[testcase_name]
+        if format_name.split("[")[0] == full_name:
+            logger.debug(
+                f"Test case {format_name} is a parameterized case, matched base name: {full_name}"
+            )
+            matched.append(testcase_name)
+        elif full_name in format_name and format_name.endswith(name):
+            logger.debug(f"Test case {format_name} was datadrive case, matched: {full_name}")
+            matched.append(testcase_name)
+    return matched
+
+
+def parse_allure_result(file_name: str) -> AllureData:
+    """
+    解析单个 Allure 结果文件。
+
+    :param file_name: 包含 Allure 报告的 JSON 文件的名称
+    :return: Allure 结果数据
+    """
+    logger.debug(f"Reading Allure data from file: {file_name}")
+    with open(file_name) as fp:
+        return decode_allure_data(json.loads(fp.read()))
+
+
+def get_allure_attachment_max_bytes() -> int:
+    """
+    获取单个用例读取附件的最大字节数，<=0 表示不限制。
+    """
+    try:
+        return int(
+            os.getenv("TESTSOLAR_TTP_ALLUREATTACHMENTMAXBYTES", "") or ALLURE_ATTACHMENT_MAX_BYTES
+        )
+    except ValueError:
+        return ALLURE_ATTACHMENT_MAX_BYTES
+
+
+def get_allure_attachment_file_max_bytes() -> int:
+    """
+    获取单个附件读取的最大字节数，<=0 表示不限制。
+    """
+    try:
+        return int(
+            os.getenv("TESTSOLAR_TTP_ALLUREATTACHMENTFILEMAXBYTES", "")
+            or ALLURE_ATTACHMENT_FILE_MAX_BYTES
+        )
+    except ValueError:
+        return ALLURE_ATTACHMENT_FILE_MAX_BYTES
+
+
+def is_text_attachment(attachment_path: Path, mime_type: str) -> bool:
+    """
+    判断附件是否可以按文本内联。
+
+    优先根据附件的 MIME 类型判断；类型未知时读取文件开头的少量字节，包含 NUL 字节的视为二进制。
+
+    :param attachment_path: 附件路径
+    :param mime_type: 附件的 MIME 类型
+    :return: 是否为文本附件
+    """
+    mime_type = (mime_type or "").split(";")[0].strip().lower()
+    if mime_type and mime_type != "application/octet-stream":
+        return (
+            mime_type.startswith("text/")
+            or mime_type in ALLURE_TEXT_ATTACHMENT_TYPES
+            or mime_type.endswith("+json")
+            or mime_type.endswith("+xml")
+        )
+
+    with open(attachment_path, "rb") as f:
+        return b"\0" not in f.read(ALLURE_ATTACHMENT_SNIFF_BYTES)
+
+
+def keep_binary_attachment(attachment_path: Path, binary_dir: str) -> Path:
+    """
+    将二进制附件保存到 binary_dir 中，Allure 结果目录在执行结束后会被删除，附件需要保存到报告目录中。
+
+    与附件位于同一文件系统时使用硬链接，否则复制文件。保存失败时返回原路径。
+
+    :param attachment_path: 附件路径
+    :param binary_dir: 保存二进制附件的目录
+    :return: 保存后的附件路径
+    """
+    target = Path(binary_dir) / attachment_path.name
+    try:
+        os.makedirs(binary_dir, exist_ok=True)
+        if not target.exists():
+            try:
+                os.link(attachment_path, target)
+            except OSError:
+                shutil.copyfile(attachment_path, target)
     except OSError as e:
-        logger.error(f"Failed to create directory {allure_dir}: {e}")
+        logger.warning(f"Failed to keep binary attachment {attachment_path}: {e}")
+        return attachment_path
+    return target
+
+
+def read_allure_attachment(
+    attachment_path: Path, mime_type: str, max_bytes: int = 0, binary_dir: str = ""
+) -> Tuple[str, int]:
+    """
+    读取单个附件的内容。
+
+    二进制附件（截图、视频、压缩包等）不读取内容，保存到 binary_dir 后只返回文件路径的引用；
+    文本附件超出 max_bytes 时只读取开头和结尾各一半的内容，中间部分以截断提示代替。
+
+    :param attachment_path: 附件路径
+    :param mime_type: 附件的 MIME 类型
+    :param max_bytes: 最多读取的字节数，<=0 表示不限制
+    :param binary_dir: 保存二进制附件的目录，为空时引用附件的原路径
+    :return: 附件内容和实际读取的字节数
+    """
+    size = attachment_path.stat().st_size
+    if not is_text_attachment(attachment_path, mime_type):
+        if binary_dir:
+            attachment_path = keep_binary_attachment(attachment_path, binary_dir)
+        return f"[binary attachment {mime_type or 'unknown'}, {size} bytes: {attachment_path}]", 0
+
+    with open(attachment_path, "rb") as f:
+        if max_bytes <= 0 or size <= max_bytes:
+            data = f.read()
+            return data.decode("utf-8", errors="ignore"), len(data)
+
+        head = f.read(max_bytes - max_bytes // 2)
+        f.seek(size - max_bytes // 2)
+        tail = f.read(max_bytes // 2) if max_bytes // 2 > 0 else b""
+
+    omitted = size - len(head) - len(tail)
+    text = (
+        head.decode("utf-8", errors="ignore")
+        + f"\n...[attachment truncated, {omitted} bytes omitted]...\n"
+        + tail.decode("utf-8", errors="ignore")
+    )
+    return text, len(head) + len(tail)
+
+
+def iter_allure_attachments(allure_data: AllureData) -> List[Attachments]:
+    """
+    按照生成报告时的顺序列出用例的全部附件：先是各层步骤中的附件，最后是用例级别的附件。
+    """
+    attachments: List[Attachments] = []
+    pending: List[Step] = list(reversed(allure_data.steps))
+    while pending:
+        step = pending.pop()
+        if step.attachments:
+            attachments.extend(step.attachments)
+        if step.steps:
+            pending.extend(reversed(step.steps))
+    if allure_data.attachments:
+        attachments.extend(allure_data.attachments)
+    return attachments
+
+
+def read_allure_attachments(
+    allure_data: AllureData,
+    attachment_dir: str,
+    max_bytes: int = 0,
+    file_max_bytes: int = 0,
+    binary_dir: str = "",
+) -> Dict[str, str]:
+    """
+    读取用例的全部附件内容。
+
+    :param allure_data: Allure 结果数据
+    :param attachment_dir: 附件目录
+    :param max_bytes: 单个用例最多读取的附件字节数，超出部分会被截断，<=0 表示不限制
+    :param file_max_bytes: 单个附件最多读取的字节数，超出时保留首尾内容，<=0 表示不限制
+    :param binary_dir: 保存二进制附件的目录，为空时引用附件的原路径
+    :return: 附件 source 到附件内容的映射，不存在的附件不会出现在结果中
+    """
+    contents: Dict[str, str] = {}
+    remaining = max_bytes
+    for attachment in iter_allure_attachments(allure_data):
+        if attachment.source in contents:
+            continue
+        attachment_path = Path(attachment_dir).joinpath(attachment.source)
+        if not attachment_path.is_file():
+            continue
+        if max_bytes > 0 and remaining <= 0:
+            contents[attachment.source] = ALLURE_ATTACHMENT_TRUNCATED
+            continue
+
+        limit = file_max_bytes
+        if max_bytes > 0:
+            limit = min(limit, remaining) if limit > 0 else remaining
+        text, read_bytes = read_allure_attachment(
+            attachment_path, attachment.type, limit, binary_dir
+        )
+        remaining -= read_bytes
+        contents[attachment.source] = text
+    return contents
+
+
+def _read_attachment(
+    attachment_dir: str, attachment: Attachments, attachments: Optional[Dict[str, str]]
+) -> Optional[str]:
+    """
+    获取附件内容，优先使用预先读取的附件内容。
+    """
+    if attachments is not None:
+        return attachments.get(attachment.source)
+
+    attachment_path = Path(attachment_dir).joinpath(attachment.source)
+    logger.debug(f"Attachment path: {str(attachment_path)}")
+    if not attachment_path.is_file():
+        return None
+    logger.info(f"Reading attachment: {attachment_path}")
+    text, _ = read_allure_attachment(
+        attachment_path, attachment.type, get_allure_attachment_file_max_bytes()
+    )
+    return text
 
 
 def generate_allure_results(
-    test_data: Dict[str, TestResult], file_name: str, attachment_dir: str
+    test_data: Dict[str, TestResult],
+    file_name: str,
+    attachment_dir: str,
+    name_index: Optional[AllureNameIndex] = None,
 ) -> None:
     """
     生成 Allure 报告结果。
@@ -101,79 +665,142 @@ def generate_allure_results(
     :param test_data: 测试数据字典
     :param file_name: 包含 Allure 报告的 JSON 文件的名称
     :param attachment_dir: 附件目录
+    :param name_index: 用例名称索引，处理多个结果文件时应传入同一个索引避免重复构建
     """
-    logger.info("Start to generate allure results")
-    logger.debug(f"Reading Allure data from file: {file_name}")
-    with open(file_name) as fp:
-        allure_data = from_dict(data_class=AllureData, data=json.loads(fp.read()))
-        full_name = allure_data.fullName.replace("#", ".")
-        logger.debug(f"Parsed Allure data for test case: {full_name}")
-
-        for testcase_name in test_data.keys():
-            logger.info(f"Processing test case: {testcase_name}")
-            step_info: List[TestCaseStep] = []
-            testcase_format_name = ".".join(
-                testcase_name.replace(".py?", os.sep).replace("/[", "[").split(os.sep)
-            )
-            logger.debug(f"Formatted test case name: {testcase_format_name}")
+    apply_allure_result(test_data, parse_allure_result(file_name), attachment_dir, name_index)
+
+
+def apply_allure_result(
+    test_data: Dict[str, TestResult],
+    allure_data: AllureData,
+    attachment_dir: str,
+    name_index: Optional[AllureNameIndex] = None,
+    attachments: Optional[Dict[str, str]] = None,
+) -> List[str]:
+    """
+    将一个 Allure 结果转换为步骤信息，并设置到匹配的用例中。
 
-            # 处理参数化测试用例：提取基础名称进行匹配
-            testcase_base_name = (
-                testcase_format_name.split("[")[0]
-                if "[" in testcase_format_name
-                else testcase_format_name
+    :param test_data: 测试数据字典
+    :param allure_data: Allure 结果数据
+    :param attachment_dir: 附件目录
+    :param name_index: 用例名称索引
+    :param attachments: 预先读取的附件内容，为 None 时从附件目录读取
+    :return: 设置了步骤信息的用例名称列表
+    """
+    full_name = allure_data.fullName.replace("#", ".")
+
+    if name_index is None:
+        name_index = build_allure_name_index(test_data.keys())
+    matched = match_allure_testcases(name_index, full_name, allure_data.name)
+    if not matched:
+        logger.info(f"Test case name {full_name} does not match any test case. Skipping.")
+        return []
+
+    step_info: List[TestCaseStep] = []
+    if allure_data.steps:
+        logger.info(f"Generating step info for test case {full_name}")
+        step_info = gen_allure_step_info(allure_data.steps, attachment_dir, attachments=attachments)
+
+    if allure_data.attachments:
+        logger.info(f"Processing attachments for test case {full_name}")
+        for attachment in allure_data.attachments:
+            log_content = _read_attachment(attachment_dir, attachment, attachments)
+            if log_content is None:
+                continue
+            log_info = TestCaseLog(
+                Time=format_allure_time(allure_data.start),
+                Level=LogLevel.INFO,
+                Content=f"Attachment {attachment.name}:\n{log_content}",
+            )
+            step_info.append(
+                TestCaseStep(
+                    Title="Testcase Stdout:",
+                    Logs=[log_info],
+                    StartTime=format_allure_time(allure_data.start),
+                    EndTime=format_allure_time(allure_data.stop),
+                    ResultType=ResultType.SUCCEED
+                    if allure_data.status == "passed"
+                    else ResultType.FAILED,
+                )
             )
 
-            if full_name != testcase_format_name:
-                if full_name == testcase_base_name:
-                    logger.info(
-                        f"Test case {testcase_format_name} is a parameterized case, matched base name: {full_name}"
-                    )
-                elif full_name in testcase_format_name and testcase_format_name.endswith(
-                    allure_data.name
-                ):
-                    logger.info(
-                        f"Test case {testcase_format_name} was datadrive case , continue to get result!!"
-                    )
-                else:
-                    logger.info(
-                        f"Test case name {full_name} does not match {testcase_format_name}. Skipping."
-                    )
-                    continue
+    applied: List[str] = []
+    for testcase_name in matched:
+        if testcase_name not in test_data:
+            continue
+        test_data[testcase_name].Steps.clear()
+        test_data[testcase_name].Steps.extend(step_info)
+        applied.append(testcase_name)
+        logger.info(f"Finished processing test case: {testcase_name}")
+    return applied
+
+
+def process_allure_results(
+    test_data: Dict[str, TestResult],
+    allure_dir: str,
+    name_index: Optional[AllureNameIndex] = None,
+    max_workers: Optional[int] = None,
+    binary_dir: str = "",
+    skip_files: Optional[Set[str]] = None,
+) -> List[str]:
+    """
+    并行解析 Allure 结果目录中的全部结果文件和附件，并设置到匹配的用例中。
+
+    结果文件解析和附件读取都是 IO 密集型操作，使用线程池并发执行；
+    每个结果文件加载完成后立即在当前线程中转换为步骤信息并修改 test_data，之后不再持有其内容，
+    避免所有结果和附件同时驻留在内存中。
 
-            if allure_data.steps:
-                logger.info(f"Generating step info for test case {full_name}")
-                step_info = gen_allure_step_info(allure_data.steps, attachment_dir)
-
-            if allure_data.attachments:
-                logger.info(f"Processing attachments for test case {full_name}")
-                for attachment in allure_data.attachments:
-                    attachment_path = Path(attachment_dir).joinpath(attachment.source)
-                    logger.debug(f"Attachment path: {str(attachment_path)}")
-
-                    if Path(attachment_path).is_file():
-                        logger.info(f"Reading attachment: {attachment_path}")
-                        with open(attachment_path, "r", encoding="utf-8", errors="ignore") as f:
-                            log_content = f.read()
-                            log_info = TestCaseLog(
-                                Time=format_allure_time(allure_data.start),
-                                Level=LogLevel.INFO,
-                                Content=f"Attachment {attachment.name}:\n{log_content}",
-                            )
-                            step_info.append(
-                                TestCaseStep(
-                                    Title="Testcase Stdout:",
-                                    Logs=[log_info],
-                                    StartTime=format_allure_time(allure_data.start),
-                                    EndTime=format_allure_time(allure_data.stop),
-                                    ResultType=ResultType.SUCCEED
-                                    if allure_data.status == "passed"
-                                    else ResultType.FAILED,
-                                )
-                            )
-            test_data[testcase_name].Steps.clear()
-            test_data[testcase_name].Steps.extend(step_info)
-            logger.info(f"Finished processing test case: {testcase_name}")
+    :param test_data: 测试数据字典
+    :param allure_dir: Allure 结果目录，同时也是附件目录
+    :param name_index: 用例名称索引
+    :param max_workers: 线程池大小，为 None 时使用 ThreadPoolExecutor 的默认值
+    :param binary_dir: 保存二进制附件的目录，为空时引用附件的原路径
+    :param skip_files: 不需要再处理的结果文件名，例如之前批次已经处理过的结果文件
+    :return: 本次处理的结果文件名
+    """
+    # 只在开启 allure 时使用，延迟导入以缩短启动耗时
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    start_time = time.time()
+    processed = [
+        file_name
+        for file_name in sorted(os.listdir(allure_dir))
+        if file_name.endswith("result.json") and not (skip_files and file_name in skip_files)
+    ]
+    file_names = [os.path.join(allure_dir, it) for it in processed]
+    if name_index is None:
+        name_index = build_allure_name_index(test_data.keys())
+    max_bytes = get_allure_attachment_max_bytes()
+    file_max_bytes = get_allure_attachment_file_max_bytes()
+
+    def load(file_name: str) -> Tuple[AllureData, Dict[str, str], float, float]:
+        parse_start = time.time()
+        allure_data = parse_allure_result(file_name)
+        read_start = time.time()
+        attachments = read_allure_attachments(
+            allure_data, allure_dir, max_bytes, file_max_bytes, binary_dir
+        )
+        return allure_data, attachments, read_start - parse_start, time.time() - read_start
+
+    parse_cost = 0.0
+    read_cost = 0.0
+    convert_cost = 0.0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # as_completed 不保留已经返回的 future，处理完成的结果可以被及时回收
+        for future in as_completed([executor.submit(load, it) for it in file_names]):
+            allure_data, attachments, parse_time, read_time = future.result()
+            parse_cost += parse_time
+            read_cost += read_time
+            convert_start = time.time()
+            apply_allure_result(test_data, allure_data, allure_dir, name_index, attachments)
+            convert_cost += time.time() - convert_start
+
+    logger.info(
+        f"Processed {len(file_names)} allure results in {time.time() - start_time:.3f}s: "
+        f"parse {parse_cost:.3f}s, attachments {read_cost:.3f}s across threads, "
+        f"convert {convert_cost:.3f}s"
+    )
+    return processed
 
 
 def format_allure_time(timestamp: float) -> datetime:
@@ -183,26 +810,60 @@ def format_allure_time(timestamp: float) -> datetime:
     :param timestamp: 时间戳
     :return: 格式化的日期时间对象
     """
-    formatted_time = datetime.fromtimestamp(timestamp / 1000)
-    logger.debug(f"Formatted timestamp {timestamp} to {formatted_time}")
-    return formatted_time
+    return datetime.fromtimestamp(timestamp / 1000)
+
+
+def get_allure_step_max_depth() -> int:
+    """
+    获取转换 Allure 步骤时展开的最大嵌套层数，<=0 表示不限制。
+    """
+    try:
+        return int(os.getenv("TESTSOLAR_TTP_ALLURESTEPMAXDEPTH", "") or 0)
+    except ValueError:
+        return 0
+
+
+def _count_nested_steps(steps: List[Step]) -> int:
+    count = 0
+    pending = list(steps)
+    while pending:
+        step = pending.pop()
+        count += 1
+        if step.steps:
+            pending.extend(step.steps)
+    return count
 
 
 def gen_allure_step_info(
-    steps: List[Step], attachment_dir: str, index: int = 0
+    steps: List[Step],
+    attachment_dir: str,
+    index: int = 0,
+    attachments: Optional[Dict[str, str]] = None,
+    max_depth: Optional[int] = None,
 ) -> List[TestCaseStep]:
     """
     生成 Allure 步骤信息。
 
+    嵌套步骤按先序展开为一个列表，标题使用层级编号，如 1、1.2、1.2.10。
+
     :param steps: 步骤列表
     :param attachment_dir: 附件目录
-    :param index: 步骤索引
+    :param index: 第一层步骤的起始编号，第一个步骤编号为 index + 1
+    :param attachments: 预先读取的附件内容，为 None 时从附件目录读取
+    :param max_depth: 最多展开的嵌套层数，超出的子步骤不再生成，只在父步骤日志中提示；
+        为 None 时读取 TESTSOLAR_TTP_ALLURESTEPMAXDEPTH，<=0 表示不限制
     :return: 测试用例步骤列表
     """
-    logger.info("Generating allure step info")
-    case_steps = []
-    for step in steps:
-        index += 1
+    if max_depth is None:
+        max_depth = get_allure_step_max_depth()
+
+    case_steps: List[TestCaseStep] = []
+    # 栈中保存 (步骤, 编号, 层数)，逆序入栈保证按原顺序出栈
+    pending: List[Tuple[Step, str, int]] = [
+        (step, str(index + i + 1), 1) for i, step in reversed(list(enumerate(steps)))
+    ]
+    while pending:
+        step, number, depth = pending.pop()
         result = step.status
         result_type: ResultType
         if result == "passed":
@@ -212,41 +873,50 @@ def gen_allure_step_info(
         else:
             result_type = ResultType.FAILED
 
-        log = "\n"
+        log = ["\n"]
         if step.parameters:
             for param in step.parameters:
-                log += "%-30s%-20s\n" % (
-                    "key: {}".format(param.name),
-                    "value: {}".format(param.value),
+                log.append(
+                    "%-30s%-20s\n"
+                    % (
+                        "key: {}".format(param.name),
+                        "value: {}".format(param.value),
+                    )
                 )
         if step.statusDetails:
             if step.statusDetails.message and step.statusDetails.trace:
-                log += step.statusDetails.message + step.statusDetails.trace
+                log.append(step.statusDetails.message + step.statusDetails.trace)
         if step.attachments:
             for attachment in step.attachments:
-                attachment_path = Path(attachment_dir).joinpath(attachment.source)
-                logger.debug(f"Attachment path: {str(attachment_path)}")
-
-                if Path(attachment_path).exists():
-                    logger.info(f"Reading attachment: {attachment_path}")
-                    with open(attachment_path, "r") as f:
-                        log += f"\n{attachment.name}:\n" + f.read() + "\n\n"
-
-        log_info = TestCaseLog(
-            Time=format_allure_time(step.start),
-            Level=LogLevel.ERROR if result == "failed" else LogLevel.INFO,
-            Content=log,
-        )
-        step_info = TestCaseStep(
-            Title="{}: {}".format(".".join(list(str(index))), step.name),
-            Logs=[log_info],
-            StartTime=format_allure_time(step.start),
-            EndTime=format_allure_time(step.stop),
-            ResultType=result_type,
-        )
+                content = _read_attachment(attachment_dir, attachment, attachments)
+                if content is not None:
+                    log.append(f"\n{attachment.name}:\n{content}\n\n")
 
-        logger.info(f"Generated step info: {step_info}")
-        case_steps.append(step_info)
         if step.steps:
-            case_steps.extend(gen_allure_step_info(step.steps, attachment_dir, index * 10))
+            if 0 < max_depth <= depth:
+                log.append(f"\n...[{_count_nested_steps(step.steps)} nested steps omitted]\n")
+            else:
+                pending.extend(
+                    (child, f"{number}.{i + 1}", depth + 1)
+                    for i, child in reversed(list(enumerate(step.steps)))
+                )
+
+        start_time = format_allure_time(step.start)
+        case_steps.append(
+            TestCaseStep(
+                Title=f"{number}: {step.name}",
+                Logs=[
+                    TestCaseLog(
+                        Time=start_time,
+                        Level=LogLevel.ERROR if result == "failed" else LogLevel.INFO,
+                        Content="".join(log),
+                    )
+                ],
+                StartTime=start_time,
+                EndTime=format_allure_time(step.stop),
+                ResultType=result_type,
+            )
+        )
+
+    logger.debug(f"Generated {len(case_steps)} allure steps")
     return case_steps
@@ -1,18 +1,94 @@
 from dataclasses import dataclass, field, asdict
-from typing import List, Dict
+from typing import TYPE_CHECKING, Any, List, Dict, Optional, Set
 import json
 import os
 import configparser
+import re
+import shutil
 import sys
+import tempfile
 import time
 import uuid
-from xml.dom import minidom
-import coverage
 from loguru import logger
 from pathlib import Path
 
+# coverage、xml.dom.minidom、sqlite3、tomllib、hashlib、subprocess 等只在开启覆盖率时使用，
+# 在函数中延迟导入，避免拖慢未开启覆盖率时的启动
+if TYPE_CHECKING:
+    import sqlite3
+
 COVERAGE_DIR: str = "testsolar_coverage"
 
+# 覆盖率上下文的记录方式，详见 get_coverage_context_mode
+COVERAGE_CONTEXT_TEST: str = "test"
+COVERAGE_CONTEXT_CALL: str = "call"
+COVERAGE_CONTEXT_ALL: str = "all"
+
+# 覆盖率采集内核，按跟踪开销从低到高排列
+COVERAGE_CORES: List[str] = ["sysmon", "ctrace", "pytrace"]
+
+# 探测覆盖率内核时在独立进程中执行的脚本：在两个上下文中各执行一次同一段代码，
+# 两个上下文都被完整记录时以 0 退出。放在独立进程中执行，避免当前进程已有的跟踪函数
+# （例如 pytest-cov 或调试器）导致嵌套的 coverage 无法记录
+_COVERAGE_PROBE_SCRIPT: str = """
+import dis
+import sys
+import warnings
+
+import coverage
+
+
+def target(iterations):
+    total = 0
+    for i in range(iterations):
+        if i % 3:
+            total += i
+        else:
+            total -= 1
+    return total
+
+
+contexts = ("testsolar_probe_1", "testsolar_probe_2")
+cov = coverage.Coverage(data_file=None, include=[__file__])
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore")
+    cov.start()
+    try:
+        # 同一段代码在第二个上下文中也必须被完整记录，部分内核只记录代码的首次执行
+        for context in contexts:
+            cov.switch_context(context)
+            target(10)
+    finally:
+        cov.stop()
+context_map = cov.get_data().contexts_by_lineno(__file__)
+lines = {line for _, line in dis.findlinestarts(target.__code__) if line and line in context_map}
+supported = bool(lines) and all(set(contexts) <= set(context_map[line]) for line in lines)
+sys.exit(0 if supported else 1)
+"""
+
+# 探测覆盖率内核的超时时间（秒）
+COVERAGE_PROBE_TIMEOUT: float = 60.0
+
+# 覆盖率内核探测结果的缓存文件名前缀，按解释器和 coverage 版本区分
+COVERAGE_CORE_CACHE_PREFIX: str = "testsolar_coverage_core_"
+
+# 增量覆盖率采集时缓存各用例覆盖率数据的文件名，不使用 .json 后缀以免被当作覆盖率报告
+COVERAGE_CACHE_FILE: str = ".coverage_cache"
+
+# 查找覆盖率数据库文件时目录扫描的最大深度和最长耗时（秒）
+COVERAGE_SCAN_MAX_DEPTH: int = 6
+COVERAGE_SCAN_TIME_BUDGET: float = 5.0
+
+# 扫描覆盖率数据库文件时需要跳过的依赖和缓存目录，虚拟环境按 pyvenv.cfg 识别，不按目录名跳过
+# 以免跳过 env、build 等可能存放覆盖率数据的普通目录
+COVERAGE_SCAN_EXCLUDE_DIRS = {
+    "__pycache__",
+    "node_modules",
+    "site-packages",
+}
+
+_coverage_db_path_cache: Dict[str, Path] = {}
+
 
 @dataclass
 class TestFileLines:
@@ -90,6 +166,209 @@ def check_coverage_enable() -> bool:
     return os.getenv("TESTSOLAR_TTP_ENABLECOVERAGE", "") in ["1", "true"]
 
 
+def get_coverage_context_mode() -> str:
+    """
+    获取覆盖率上下文的记录方式。
+
+    - test: 默认方式，由 pytest-cov 的 `--cov-context=test` 记录每个阶段的上下文
+    - call: 由执行插件在用例边界切换上下文，只记录 call 阶段
+    - all: 由执行插件在用例边界切换上下文，记录 setup/call/teardown 全部阶段
+
+    Returns:
+        str: 覆盖率上下文的记录方式。
+    """
+    mode = os.getenv("TESTSOLAR_TTP_COVERAGECONTEXT", "").strip().lower()
+    if mode in [COVERAGE_CONTEXT_CALL, COVERAGE_CONTEXT_ALL]:
+        return mode
+    return COVERAGE_CONTEXT_TEST
+
+
+def switch_coverage_context(context: str) -> None:
+    """
+    切换当前正在运行的 coverage 的动态上下文。
+
+    没有正在运行的 coverage 时（例如未启用覆盖率或位于 xdist 子进程之外）不做任何处理。
+
+    Args:
+        context (str): 新的上下文，空字符串表示不归属任何用例。
+    """
+    import coverage
+
+    cov = coverage.Coverage.current()
+    if cov is None:
+        return
+    try:
+        cov.switch_context(context)
+    except coverage.CoverageException as e:
+        logger.warning(f"Failed to switch coverage context to {context}: {e}")
+
+
+def is_coverage_core_available(core: str) -> bool:
+    """
+    检查当前解释器和 coverage 版本是否提供指定的覆盖率内核。
+
+    Args:
+        core (str): 覆盖率内核名称，可选 sysmon、ctrace、pytrace。
+
+    Returns:
+        bool: 是否可用。
+    """
+    import coverage
+
+    if core == "sysmon":
+        return sys.version_info >= (3, 12) and coverage.version_info >= (7, 4)
+    if core == "ctrace":
+        try:
+            from coverage.tracer import CTracer  # type: ignore[import-not-found, unused-ignore] # noqa: F401
+        except ImportError:
+            return False
+        return True
+    return core == "pytrace"
+
+
+def probe_coverage_core(core: str) -> bool:
+    """
+    在独立进程中使用指定内核运行探测脚本，检查是否支持按用例记录上下文。
+
+    探测进程中去掉 pytest-cov 传递给子进程的环境变量，避免探测进程本身也被采集覆盖率。
+
+    Args:
+        core (str): 覆盖率内核名称。
+
+    Returns:
+        bool: 是否支持按用例记录上下文。
+    """
+    import subprocess
+
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if not key.startswith("COV_CORE_") and key != "COVERAGE_PROCESS_START"
+    }
+    env["COVERAGE_CORE"] = core
+    with tempfile.TemporaryDirectory(prefix="testsolar_coverage_probe_") as probe_dir:
+        script = Path(probe_dir) / "coverage_probe.py"
+        script.write_text(_COVERAGE_PROBE_SCRIPT, encoding="utf-8")
+        try:
+            result = subprocess.run(
+                [sys.executable, str(script)],
+                env=env,
+                cwd=probe_dir,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                timeout=COVERAGE_PROBE_TIMEOUT,
+            )
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning(f"Failed to probe coverage core {core}: {e}")
+            return False
+    if result.returncode not in (0, 1):
+        logger.warning(
+            f"Failed to probe coverage core {core}: "
+            f"{result.stderr.decode('utf-8', errors='replace').strip()}"
+        )
+    return result.returncode == 0
+
+
+def get_coverage_core_cache_file() -> Path:
+    """
+    获取覆盖率内核探测结果的缓存文件路径。
+
+    探测结果只与解释器和 coverage 版本有关，按两者区分缓存，同一环境只需探测一次。
+
+    Returns:
+        Path: 缓存文件路径。
+    """
+    import hashlib
+
+    import coverage
+
+    key = f"{sys.executable}|{sys.version}|{coverage.__version__}"
+    digest = hashlib.md5(key.encode("utf-8")).hexdigest()
+    return Path(tempfile.gettempdir()) / f"{COVERAGE_CORE_CACHE_PREFIX}{digest}.json"
+
+
+def is_coverage_core_supported(core: str) -> bool:
+    """
+    检查指定内核是否支持按用例记录上下文，优先使用缓存的探测结果。
+
+    Args:
+        core (str): 覆盖率内核名称。
+
+    Returns:
+        bool: 是否支持按用例记录上下文。
+    """
+    cache_file = get_coverage_core_cache_file()
+    cache: Dict[str, bool] = {}
+    try:
+        cache = json.loads(cache_file.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        pass
+    if isinstance(cache, dict) and isinstance(cache.get(core), bool):
+        return cache[core]
+    if not isinstance(cache, dict):
+        cache = {}
+
+    supported = probe_coverage_core(core)
+    cache[core] = supported
+    try:
+        # 先写临时文件再替换，避免并发执行时读到不完整的缓存
+        tmp_file = cache_file.with_name(f"{cache_file.name}.{uuid.uuid4().hex}")
+        tmp_file.write_text(json.dumps(cache), encoding="utf-8")
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        logger.warning(f"Failed to save coverage core probe result to {cache_file}: {e}")
+    return supported
+
+
+def select_coverage_core() -> Optional[str]:
+    """
+    根据 TESTSOLAR_TTP_COVERAGECORE 选择覆盖率内核。
+
+    - 未设置时不做选择，沿用 coverage 的默认行为
+    - auto: 按开销从低到高选择第一个可用且支持按用例记录上下文的内核
+    - sysmon/ctrace/pytrace: 使用指定内核，不可用或不支持上下文时按 auto 选择
+
+    是否支持上下文的探测结果按解释器和 coverage 版本缓存，不会在每次执行时重复探测。
+    选中内核的实际开销以执行用例时 pytest.main 的耗时为准，见执行日志和耗时统计文件。
+
+    Returns:
+        Optional[str]: 选中的内核名称，未设置或没有可用内核时返回 None。
+    """
+    requested = os.getenv("TESTSOLAR_TTP_COVERAGECORE", "").strip().lower()
+    if not requested:
+        return None
+
+    candidates = list(COVERAGE_CORES)
+    if requested in COVERAGE_CORES:
+        candidates.remove(requested)
+        candidates.insert(0, requested)
+    elif requested != "auto":
+        logger.warning(f"Unknown coverage core {requested}, select it automatically")
+
+    for core in candidates:
+        if not is_coverage_core_available(core):
+            logger.info(f"Coverage core {core} is not available")
+            continue
+        if not is_coverage_core_supported(core):
+            logger.info(f"Coverage core {core} does not support per-test contexts")
+            continue
+        logger.info(f"Select coverage core {core}")
+        return core
+
+    logger.warning("No coverage core supports per-test contexts, use coverage default")
+    return None
+
+
+def check_incremental_coverage_enable() -> bool:
+    """
+    检查是否启用增量覆盖率采集。
+
+    Returns:
+        bool: 是否启用增量覆盖率采集。
+    """
+    return os.getenv("TESTSOLAR_TTP_COVERAGEINCREMENTAL", "") in ["1", "true"]
+
+
 def collect_code_packages(testcase_list: List[str]) -> List[str]:
     """
     自动计算被测代码包。
@@ -139,6 +418,8 @@ def filter_coverage_xml_packages(xml_path: Path, code_package: List[str]) -> Non
         xml_path (str): coverage.xml 文件路径。
         code_package (List[str]): 被测代码包列表。
     """
+    from xml.dom import minidom
+
     start_time: float = time.time()
     logger.info(f"code_package: {code_package}")
     with open(xml_path, "r") as fp:
@@ -161,11 +442,32 @@ def filter_coverage_xml_packages(xml_path: Path, code_package: List[str]) -> Non
     logger.info("filter_coverage_xml_packages cost time: %s" % (time.time() - start_time))
 
 
+def context_to_case_name(context: str) -> str:
+    """
+    将覆盖率上下文（pytest nodeid 加上 `|run` 等阶段后缀）转换为用例名称。
+
+    Args:
+        context (str): 覆盖率上下文。
+
+    Returns:
+        str: 用例名称。
+    """
+    try:
+        name = context[: context.index("|")]
+    except ValueError:
+        name = context
+    items = name.split("::")
+    if items[0].endswith(".py"):
+        items[0] = items[0][:-3].replace(os.sep, ".")
+    return ".".join(items)
+
+
 def convert_coverage_data(
     result: Dict[str, CoverageData],
     rav_fn: str,
     line_map: List[int],
     context_map: Dict[int, List[str]],
+    case_names: Optional[Set[str]] = None,
 ) -> Dict[str, CoverageData]:
     """
     转换覆盖率数据。
@@ -175,6 +477,7 @@ def convert_coverage_data(
         rav_fn (str): 文件路径。
         line_map (List[int]): 覆盖的行号列表。
         context_map (Dict[int, List[str]]): 行号与测试用例的映射。
+        case_names (Optional[Set[str]]): 需要转换的用例名称集合，为 None 时转换全部用例。
 
     Returns:
         Dict[str, CoverageData]: 更新后的覆盖率数据字典。
@@ -184,14 +487,9 @@ def convert_coverage_data(
         for test_case in test_case_list:
             if not test_case:
                 continue
-            try:
-                name = test_case[: test_case.index("|")]
-            except ValueError:
-                name = test_case
-            items = name.split("::")
-            if items[0].endswith(".py"):
-                items[0] = items[0][:-3].replace(os.sep, ".")
-            name = ".".join(items)
+            name = context_to_case_name(test_case)
+            if case_names is not None and name not in case_names:
+                continue
             if name not in result:
                 result[name] = CoverageData(name=name)
             if rav_fn not in result[name].files:
@@ -200,8 +498,18 @@ def convert_coverage_data(
     return result
 
 
+def _get_query_contexts_max() -> int:
+    """
+    coverage 按上下文 id 查询时每个 id 占用一个 SQL 参数，不能超过 SQLite 的参数个数上限，
+    超过时不限定查询的上下文，改为读取后再按用例名称过滤。
+    """
+    import sqlite3
+
+    return 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+
+
 def get_testcase_coverage_data(
-    code_package: List[str], coverage_db_path: Path
+    code_package: List[str], coverage_db_path: Path, case_names: Optional[Set[str]] = None
 ) -> Dict[str, CoverageData]:
     """
     获取测试用例的覆盖率数据。
@@ -209,10 +517,13 @@ def get_testcase_coverage_data(
     Args:
         code_package (List[str]): 被测代码包列表。
         coverage_db_path (str): 覆盖率数据库文件路径。
+        case_names (Optional[Set[str]]): 只获取这些用例的覆盖率数据，为 None 时获取全部用例。
 
     Returns:
         Dict[str, CoverageData]: 包含覆盖率数据的字典。
     """
+    import coverage
+
     if not os.path.isfile(coverage_db_path):
         raise RuntimeError(f"Coverage db {coverage_db_path} not exist")
     root_path: str = os.path.dirname(os.path.abspath(coverage_db_path))
@@ -221,21 +532,33 @@ def get_testcase_coverage_data(
     # 加载覆盖率数据并获取计量的文件
     cov = coverage.Coverage(data_file=coverage_db_path)
     cov.load()
-    file_set = cov.get_data().measured_files()
+    data = cov.get_data()
+    file_set = data.measured_files()
     logger.info("Coverage data loaded")
 
+    if case_names is not None:
+        contexts = [it for it in data.measured_contexts() if context_to_case_name(it) in case_names]
+        if not contexts:
+            logger.info("No coverage context found for executed testcases")
+            return result
+        if len(contexts) <= _get_query_contexts_max():
+            # 在数据库中只查询这些用例的上下文，之后读取行号和上下文时不再读取其余用例的数据
+            data.set_query_contexts(["^(?:" + "|".join(map(re.escape, contexts)) + ")$"])
+
     for fn in file_set:
         rav_fn = prepare_file_path(fn, root_path)
         if not is_file_in_code_package(rav_fn, code_package):
             continue
 
-        line_map = cov.get_data().lines(fn)
-        context_map = cov.get_data().contexts_by_lineno(fn)
-        if line_map is not None:
-            try:
-                result = convert_coverage_data(result, rav_fn, line_map, context_map)
-            except Exception as e:
-                logger.error(f"Error processing file {fn}: {e}")
+        # 限定了查询的上下文时，没有被这些用例执行过的文件没有行号，无需再读取上下文
+        line_map = data.lines(fn)
+        if not line_map:
+            continue
+        context_map = data.contexts_by_lineno(fn)
+        try:
+            result = convert_coverage_data(result, rav_fn, line_map, context_map, case_names)
+        except Exception as e:
+            logger.error(f"Error processing file {fn}: {e}")
 
     return result
 
@@ -273,48 +596,457 @@ def is_file_in_code_package(fn: str, code_package: List[str]) -> bool:
     return False
 
 
-def find_coverage_db_path(proj: str, cov_file: str) -> Path:
+def _import_tomllib() -> Any:
+    """
+    导入 toml 解析模块，Python 3.11 以下使用 tomli，都不可用时返回 None。
+    """
+    try:
+        import tomllib  # type: ignore[import-not-found, unused-ignore]
+    except ImportError:
+        try:
+            import tomli as tomllib  # type: ignore[no-redef, import-not-found, unused-ignore]
+        except ImportError:
+            return None
+    return tomllib
+
+
+def _read_config_data_file(proj: str) -> List[Path]:
+    """
+    读取项目中 coverage 配置文件里的 data_file 配置。
+
+    按照 coverage 自身的优先级依次检查 .coveragerc、setup.cfg 以及 pyproject.toml。
+
+    Args:
+        proj (str): 项目路径。
+
+    Returns:
+        List[Path]: 配置中声明的覆盖率数据库文件路径列表，相对路径已按项目路径解析。
+    """
+    data_files: List[Path] = []
+
+    for config_name, section in [(".coveragerc", "run"), ("setup.cfg", "coverage:run")]:
+        config_path = Path(proj) / config_name
+        if not config_path.is_file():
+            continue
+        config = configparser.ConfigParser()
+        try:
+            config.read(config_path)
+        except configparser.Error as e:
+            logger.warning(f"Failed to parse {config_path}: {e}")
+            continue
+        if section in config and "data_file" in config[section]:
+            data_files.append(Path(config[section]["data_file"].strip()))
+
+    pyproject_path = Path(proj) / "pyproject.toml"
+    tomllib = _import_tomllib() if pyproject_path.is_file() else None
+    if tomllib is not None:
+        try:
+            with open(pyproject_path, "rb") as fp:
+                pyproject = tomllib.load(fp)
+            data_file = (
+                pyproject.get("tool", {}).get("coverage", {}).get("run", {}).get("data_file")
+            )
+            if data_file:
+                data_files.append(Path(str(data_file).strip()))
+        except Exception as e:
+            logger.warning(f"Failed to parse {pyproject_path}: {e}")
+
+    # 配置中的相对路径相对于项目路径，不依赖当前工作目录
+    return [it if it.is_absolute() else Path(proj) / it for it in data_files]
+
+
+def _coverage_db_cache_file(proj: str) -> Path:
+    """
+    获取覆盖率数据库路径缓存文件的位置。
+
+    缓存文件放在系统临时目录中，以项目路径的摘要区分，避免在用户项目中留下额外文件。
+    """
+    import hashlib
+
+    digest = hashlib.md5(os.path.abspath(proj).encode("utf-8")).hexdigest()
+    return Path(tempfile.gettempdir()) / f"testsolar_coverage_db_{digest}"
+
+
+def _load_cached_coverage_db_path(proj: str, since: Optional[float] = None) -> Optional[Path]:
+    """
+    读取之前扫描得到的覆盖率数据库路径，文件已不存在或在 since 之前修改（不是本次运行生成）时视为缓存失效。
+    """
+    cached = _coverage_db_path_cache.get(os.path.abspath(proj))
+    if cached is None:
+        cache_file = _coverage_db_cache_file(proj)
+        if not cache_file.is_file():
+            return None
+        try:
+            cached = Path(cache_file.read_text(encoding="utf-8").strip())
+        except OSError:
+            return None
+
+    try:
+        mtime = cached.stat().st_mtime
+    except OSError:
+        return None
+    if since is not None and mtime < since:
+        logger.info(f"Cached coverage db file {cached} is older than this run, ignore it")
+        return None
+    return cached
+
+
+def _save_cached_coverage_db_path(proj: str, coverage_path: Path) -> None:
+    """
+    缓存扫描得到的覆盖率数据库路径，供后续的 load/run 阶段复用。
+    """
+    _coverage_db_path_cache[os.path.abspath(proj)] = coverage_path
+    try:
+        _coverage_db_cache_file(proj).write_text(str(coverage_path), encoding="utf-8")
+    except OSError as e:
+        logger.warning(f"Failed to save coverage db path cache: {e}")
+
+
+def _scan_coverage_db_path(
+    proj: str, max_depth: int, time_budget: float, db_name: str = ".coverage"
+) -> Optional[Path]:
+    """
+    在项目目录中有限深度、有限时间地扫描覆盖率数据库文件。
+
+    跳过隐藏目录（包括 .git 等版本管理目录）、虚拟环境、node_modules 等不可能存放覆盖率数据的目录。
+
+    Args:
+        proj (str): 项目路径。
+        max_depth (int): 最大扫描深度，项目根目录深度为 0。
+        time_budget (float): 扫描的最长耗时（秒）。
+        db_name (str): 覆盖率数据库文件名。
+
+    Returns:
+        Optional[Path]: 找到的覆盖率数据库文件路径，未找到时返回 None。
+    """
+    start_time = time.time()
+    root_depth = os.path.abspath(proj).rstrip(os.sep).count(os.sep)
+
+    for root, dirs, files in os.walk(proj):
+        if db_name in files:
+            return Path(root) / db_name
+
+        if time.time() - start_time > time_budget:
+            logger.warning(
+                f"Scan coverage db file in {proj} exceeded {time_budget}s, stop scanning"
+            )
+            return None
+
+        depth = os.path.abspath(root).rstrip(os.sep).count(os.sep) - root_depth
+        if depth >= max_depth:
+            dirs[:] = []
+        else:
+            dirs[:] = sorted(
+                d
+                for d in dirs
+                if not d.startswith(".")
+                and d not in COVERAGE_SCAN_EXCLUDE_DIRS
+                and not os.path.isfile(os.path.join(root, d, "pyvenv.cfg"))
+            )
+
+    return None
+
+
+def find_coverage_db_path(
+    proj: str,
+    cov_file: str,
+    max_depth: int = COVERAGE_SCAN_MAX_DEPTH,
+    time_budget: float = COVERAGE_SCAN_TIME_BUDGET,
+    since: Optional[float] = None,
+) -> Path:
     """
     查找覆盖率数据库文件路径。
 
+    查找顺序：
+    1. 本次运行配置的路径（项目根目录下的 cov_file 以及 COVERAGE_FILE 环境变量）
+    2. .coveragerc / setup.cfg / pyproject.toml 中的 data_file 配置
+    3. 之前扫描缓存的结果，只使用 since 之后修改过的文件，避免使用之前运行遗留的数据
+    4. 有限深度、有限耗时的目录扫描
+
     Args:
         proj (str): 项目路径。
         cov_file (str): 覆盖率文件名。
+        max_depth (int): 目录扫描的最大深度。
+        time_budget (float): 目录扫描的最长耗时（秒）。
+        since (Optional[float]): 本次运行的开始时间戳，为 None 时不检查缓存路径的修改时间。
 
     Returns:
         Path: 覆盖率数据库文件路径。如果未找到，返回空路径。
     """
-    # 检查是否根目录存在db文件
-    coverage_db_path = Path(proj) / cov_file
-    if coverage_db_path.is_file():
-        logger.info("Found coverage db file: {}", coverage_db_path)
-        return coverage_db_path
-
-    # 查找 .coveragerc 文件 data_file 配置
-    coveragerc_file_path = Path(proj) / ".coveragerc"
-    if coveragerc_file_path.is_file():
-        config = configparser.ConfigParser()
-        config.read(coveragerc_file_path)
-
-        # 检查 [run] 部分中的 data_file 配置项
-        if "run" in config and "data_file" in config["run"]:
-            coverage_path = Path(config["run"]["data_file"].strip())
-            if coverage_path.is_file():
-                logger.info("Found coverage db file: {}", coverage_path)
-                return coverage_path
-
-    # 遍历项目目录，查找 .coverage 文件
-    for root, _, files in os.walk(proj):
-        for f_name in files:
-            if f_name == ".coverage":
-                coverage_path = Path(root) / f_name
-                logger.info("Found coverage db file: {}", coverage_path)
-                return coverage_path
+    # 检查本次运行配置的db文件
+    candidates: List[Path] = [Path(proj) / cov_file]
+    env_data_file = os.environ.get("COVERAGE_FILE", "").strip()
+    if env_data_file:
+        env_path = Path(env_data_file)
+        candidates.append(env_path if env_path.is_absolute() else Path(proj) / env_path)
+
+    # 查找配置文件中的 data_file 配置
+    candidates.extend(_read_config_data_file(proj))
+
+    for coverage_path in candidates:
+        if coverage_path.is_file():
+            logger.info("Found coverage db file: {}", coverage_path)
+            return coverage_path
+
+    cached_path = _load_cached_coverage_db_path(proj, since)
+    if cached_path:
+        logger.info("Found cached coverage db file: {}", cached_path)
+        return cached_path
+
+    # 有限深度地遍历项目目录，查找 .coverage 文件
+    scanned_path = _scan_coverage_db_path(proj, max_depth, time_budget)
+    if scanned_path:
+        logger.info("Found coverage db file: {}", scanned_path)
+        _save_cached_coverage_db_path(proj, scanned_path)
+        return scanned_path
 
     # 如果未找到覆盖率数据库文件，返回空路径
     return Path("")
 
 
+def find_parallel_coverage_files(proj: str, coverage_db_path: Path) -> List[Path]:
+    """
+    查找并行模式（xdist、子进程）下生成的覆盖率数据文件。
+
+    并行模式下 coverage 会生成 `.coverage.<host>.<pid>.<rand>` 形式的文件，
+    这些文件与主数据库文件位于同一目录，没有主数据库文件时在项目根目录查找。
+
+    Args:
+        proj (str): 项目路径。
+        coverage_db_path (Path): 主覆盖率数据库文件路径，可以为空路径。
+
+    Returns:
+        List[Path]: 并行模式的覆盖率数据文件列表。
+    """
+    if coverage_db_path.is_file():
+        data_dir = coverage_db_path.parent
+        basename = coverage_db_path.name
+    else:
+        data_dir = Path(proj)
+        basename = ".coverage"
+
+    parallel_files: List[Path] = []
+    for data_file in sorted(data_dir.glob(f"{basename}.*")):
+        # 跳过 sqlite 的日志文件等非数据文件
+        if not data_file.is_file() or data_file.name.endswith(("-journal", "-wal", "-shm")):
+            continue
+        parallel_files.append(data_file)
+    return parallel_files
+
+
+def _merge_coverage_db(conn: "sqlite3.Connection", data_file: Path) -> None:
+    """
+    将一个覆盖率数据库以集合操作的方式合并到当前连接的主数据库中。
+
+    Args:
+        conn (sqlite3.Connection): 合并目标数据库的连接。
+        data_file (Path): 需要合并的覆盖率数据库文件。
+    """
+    conn.execute("ATTACH DATABASE ? AS src", (str(data_file),))
+    try:
+        main_schema = conn.execute("SELECT version FROM main.coverage_schema").fetchone()
+        src_schema = conn.execute("SELECT version FROM src.coverage_schema").fetchone()
+        if main_schema != src_schema:
+            raise ValueError(f"schema version {src_schema} does not match {main_schema}")
+
+        main_arcs = conn.execute("SELECT value FROM main.meta WHERE key = 'has_arcs'").fetchone()
+        src_arcs = conn.execute("SELECT value FROM src.meta WHERE key = 'has_arcs'").fetchone()
+        src_has_data = conn.execute(
+            "SELECT EXISTS(SELECT 1 FROM src.line_bits) OR EXISTS(SELECT 1 FROM src.arc)"
+        ).fetchone()[0]
+        if src_has_data and main_arcs and src_arcs and main_arcs != src_arcs:
+            raise ValueError("can not combine line data with arc data")
+
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO main.file (path) SELECT path FROM src.file")
+            conn.execute(
+                "INSERT OR IGNORE INTO main.context (context) SELECT context FROM src.context"
+            )
+            # 同一文件同一上下文的行号位图取并集
+            conn.execute(
+                """
+                INSERT INTO main.line_bits (file_id, context_id, numbits)
+                SELECT mf.id, mc.id, sl.numbits
+                FROM src.line_bits sl
+                JOIN src.file sf ON sf.id = sl.file_id
+                JOIN main.file mf ON mf.path = sf.path
+                JOIN src.context sc ON sc.id = sl.context_id
+                JOIN main.context mc ON mc.context = sc.context
+                WHERE true
+                ON CONFLICT (file_id, context_id)
+                DO UPDATE SET numbits = numbits_union(numbits, excluded.numbits)
+                """
+            )
+            conn.execute(
+                """
+                INSERT OR IGNORE INTO main.arc (file_id, context_id, fromno, tono)
+                SELECT mf.id, mc.id, sa.fromno, sa.tono
+                FROM src.arc sa
+                JOIN src.file sf ON sf.id = sa.file_id
+                JOIN main.file mf ON mf.path = sf.path
+                JOIN src.context sc ON sc.id = sa.context_id
+                JOIN main.context mc ON mc.context = sc.context
+                """
+            )
+            conn.execute(
+                """
+                INSERT OR IGNORE INTO main.tracer (file_id, tracer)
+                SELECT mf.id, st.tracer
+                FROM src.tracer st
+                JOIN src.file sf ON sf.id = st.file_id
+                JOIN main.file mf ON mf.path = sf.path
+                """
+            )
+            if src_has_data and src_arcs:
+                conn.execute(
+                    "INSERT OR REPLACE INTO main.meta (key, value) VALUES ('has_arcs', ?)",
+                    src_arcs,
+                )
+    finally:
+        conn.execute("DETACH DATABASE src")
+
+
+def combine_parallel_coverage_data(data_files: List[Path], combined_db_path: Path) -> Path:
+    """
+    将多个覆盖率数据库文件合并为一个数据库文件。
+
+    直接在 sqlite 中按集合批量插入合并，避免 `coverage combine` 逐文件逐行的串行处理。
+    无法合并的数据文件会被跳过并记录警告。
+
+    Args:
+        data_files (List[Path]): 需要合并的覆盖率数据库文件列表。
+        combined_db_path (Path): 合并后的数据库文件路径。
+
+    Returns:
+        Path: 合并后的数据库文件路径。
+    """
+    import sqlite3
+
+    from coverage.numbits import register_sqlite_functions
+
+    start_time: float = time.time()
+    combined_db_path.parent.mkdir(parents=True, exist_ok=True)
+    if combined_db_path.exists():
+        combined_db_path.unlink()
+
+    # 以第一个数据文件为基础，复用其表结构
+    shutil.copyfile(data_files[0], combined_db_path)
+
+    conn = sqlite3.connect(str(combined_db_path))
+    try:
+        register_sqlite_functions(conn)
+        for data_file in data_files[1:]:
+            try:
+                _merge_coverage_db(conn, data_file)
+            except (sqlite3.Error, ValueError) as e:
+                logger.warning(f"Skip combining coverage data file {data_file}: {e}")
+    finally:
+        conn.close()
+
+    logger.info(
+        f"Combined {len(data_files)} coverage data files into {combined_db_path}, "
+        f"cost time: {time.time() - start_time}"
+    )
+    return combined_db_path
+
+
+def compute_coverage_fingerprint(
+    root_path: str, files: Dict[str, List[int]], stat_cache: Optional[Dict[str, str]] = None
+) -> str:
+    """
+    计算用例覆盖率数据的指纹。
+
+    指纹由覆盖的文件及行号、以及这些文件当前的大小和修改时间组成，
+    被测代码变化后缓存的行号不再可信，指纹随之失效。
+
+    Args:
+        root_path (str): 覆盖率文件路径的根目录。
+        files (Dict[str, List[int]]): 文件与覆盖行号的映射。
+        stat_cache (Optional[Dict[str, str]]): 文件状态缓存，避免多个用例重复 stat 同一文件。
+
+    Returns:
+        str: 覆盖率数据指纹。
+    """
+    import hashlib
+
+    if stat_cache is None:
+        stat_cache = {}
+    digest = hashlib.md5()
+    for file_name in sorted(files):
+        if file_name not in stat_cache:
+            try:
+                st = (Path(root_path) / file_name).stat()
+                stat_cache[file_name] = f"{st.st_size}:{st.st_mtime_ns}"
+            except OSError:
+                stat_cache[file_name] = "missing"
+        digest.update(f"{file_name}|{stat_cache[file_name]}|".encode("utf-8"))
+        digest.update(",".join(str(line) for line in sorted(files[file_name])).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def merge_incremental_coverage_data(
+    cov_file_info: Dict[str, CoverageData],
+    executed_cases: Set[str],
+    cache_file: Path,
+    root_path: str,
+) -> Dict[str, CoverageData]:
+    """
+    将本次执行用例的覆盖率数据与上次缓存的覆盖率数据合并，并更新缓存。
+
+    本次执行过的用例使用新计算的数据，其余用例在指纹仍然有效时复用缓存数据。
+
+    Args:
+        cov_file_info (Dict[str, CoverageData]): 本次执行用例的覆盖率数据。
+        executed_cases (Set[str]): 本次执行的用例名称集合。
+        cache_file (Path): 覆盖率缓存文件路径。
+        root_path (str): 覆盖率文件路径的根目录。
+
+    Returns:
+        Dict[str, CoverageData]: 合并后的覆盖率数据。
+    """
+    cache: Dict[str, Any] = {}
+    if cache_file.is_file():
+        try:
+            with open(cache_file, "r") as f:
+                cache = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to load coverage cache {cache_file}: {e}")
+
+    stat_cache: Dict[str, str] = {}
+    result: Dict[str, CoverageData] = {}
+    reused, expired = 0, 0
+    for case_name, entry in cache.items():
+        if case_name in executed_cases:
+            continue
+        files = entry.get("files", {})
+        if compute_coverage_fingerprint(root_path, files, stat_cache) != entry.get("fingerprint"):
+            expired += 1
+            continue
+        result[case_name] = CoverageData(name=case_name, files=files)
+        reused += 1
+    result.update(cov_file_info)
+
+    logger.info(
+        f"Incremental coverage: {len(cov_file_info)} recomputed, {reused} reused, {expired} expired"
+    )
+
+    new_cache = {
+        case_name: {
+            "fingerprint": compute_coverage_fingerprint(root_path, data.files, stat_cache),
+            "files": data.files,
+        }
+        for case_name, data in result.items()
+    }
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_file, "w") as f:
+            json.dump(new_cache, f)
+    except OSError as e:
+        logger.warning(f"Failed to save coverage cache {cache_file}: {e}")
+
+    return result
+
+
 def generate_coverage_json_file(
     proj_path: str,
     coverage_file_path: Path,
@@ -364,17 +1096,25 @@ def generate_coverage_json_file(
     logger.info(f"Coverage data saved to {coverage_json_file}")
 
 
-def collect_coverage_report(proj_path: str, file_report_path: str, code_package: List[str]) -> None:
+def collect_coverage_report(
+    proj_path: str,
+    file_report_path: str,
+    code_package: List[str],
+    executed_nodeids: Optional[Set[str]] = None,
+    run_start: Optional[float] = None,
+) -> None:
     """
     处理覆盖率并生成覆盖率报告。
 
     Args:
         proj_path (str): 项目路径。
         code_package (List[str]): 被测代码包列表。
+        executed_nodeids (Optional[Set[str]]): 本次执行的用例 nodeid 集合，用于增量覆盖率采集。
+        run_start (Optional[float]): 本次运行的开始时间戳，用于排除之前运行遗留的覆盖率数据。
     """
     # 定义覆盖率文件路径和 JSON 文件路径
     coverage_file_path: Path = Path(proj_path) / file_report_path / "coverage.xml"
-    coverage_json_dir = Path(proj_path) / "testsolar_coverage"
+    coverage_json_dir = Path(proj_path) / COVERAGE_DIR
     if not coverage_json_dir.exists():
         coverage_json_dir.mkdir()
     unique_string = str(uuid.uuid4())
@@ -385,19 +1125,54 @@ def collect_coverage_report(proj_path: str, file_report_path: str, code_package:
         logger.error("File coverage.xml not exist", file=sys.stderr)
         return
 
-    # 过滤 coverage.xml 文件中的包信息
-    logger.info("filter coverage.xml packages")
-    filter_coverage_xml_packages(coverage_file_path, code_package)
+    # 过滤 coverage.xml 文件中的包信息，执行插件切换上下文时已在采集阶段限定了被测代码包，无需过滤
+    if get_coverage_context_mode() == COVERAGE_CONTEXT_TEST:
+        logger.info("filter coverage.xml packages")
+        filter_coverage_xml_packages(coverage_file_path, code_package)
 
     # 查找覆盖率数据库文件路径
-    coverage_db_path = find_coverage_db_path(proj_path, ".coverage")
+    coverage_db_path = find_coverage_db_path(proj_path, ".coverage", since=run_start)
+
+    # 合并并行模式下生成的覆盖率数据文件
+    # 合并后的数据库与原数据文件放在同一目录，保证文件路径按同一根目录计算相对路径
+    combined_db_path = None
+    parallel_files = find_parallel_coverage_files(proj_path, coverage_db_path)
+    if parallel_files:
+        data_files = [coverage_db_path] if coverage_db_path.is_file() else []
+        data_files.extend(parallel_files)
+        combined_db_path = combine_parallel_coverage_data(
+            data_files, parallel_files[0].parent / f"testsolar_combined_{os.getpid()}.db"
+        )
+        coverage_db_path = combined_db_path
 
     # 获取测试用例的覆盖率数据
-    if coverage_db_path:
-        cov_file_info = get_testcase_coverage_data(code_package, coverage_db_path)
-    else:
-        # 不存在覆盖率数据库文件，则不生成覆盖率文件行信息
-        cov_file_info = {}
+    incremental = check_incremental_coverage_enable() and executed_nodeids is not None
+    executed_cases: Set[str] = set()
+    if incremental and executed_nodeids is not None:
+        executed_cases = {context_to_case_name(nodeid) for nodeid in executed_nodeids}
+
+    try:
+        if not coverage_db_path:
+            # 不存在覆盖率数据库文件，则不生成覆盖率文件行信息
+            cov_file_info = {}
+        elif incremental:
+            # 增量模式下只计算本次执行过的用例
+            cov_file_info = get_testcase_coverage_data(
+                code_package, coverage_db_path, executed_cases
+            )
+        else:
+            cov_file_info = get_testcase_coverage_data(code_package, coverage_db_path)
+    finally:
+        if combined_db_path and combined_db_path.exists():
+            combined_db_path.unlink()
+
+    if incremental:
+        cov_file_info = merge_incremental_coverage_data(
+            cov_file_info,
+            executed_cases,
+            coverage_json_dir / COVERAGE_CACHE_FILE,
+            os.path.dirname(os.path.abspath(coverage_db_path)),
+        )
 
     # 生成覆盖率 JSON 文件
     generate_coverage_json_file(proj_path, coverage_file_path, cov_file_info, coverage_json_file)
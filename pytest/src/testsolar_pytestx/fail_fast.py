@@ -0,0 +1,136 @@
+import os
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from loguru import logger
+from testsolar_testtool_sdk.model.testresult import ResultType
+
+# 计算失败率的默认窗口大小（最近执行的用例数）
+FAIL_FAST_WINDOW = 50
+
+
+def _get_int(name: str, default: int = 0) -> int:
+    value = os.getenv(name, "")
+    try:
+        number = int(value) if value else default
+    except ValueError:
+        logger.warning(f"Invalid {name} {value}, use default {default}")
+        return default
+    return max(number, 0)
+
+
+def _get_rate(name: str) -> float:
+    value = os.getenv(name, "")
+    try:
+        rate = float(value) if value else 0.0
+    except ValueError:
+        logger.warning(f"Invalid {name} {value}, failure rate threshold is disabled")
+        return 0.0
+    return min(max(rate, 0.0), 1.0)
+
+
+class FailFastPolicy:
+    """
+    提前终止策略：按用例结果依次判断失败总数、连续 setup 失败数和最近窗口内的失败率，
+    任一条件满足时给出终止原因，之后不再执行剩余用例。
+
+    跳过的用例（IGNORED）不计入统计，也不会打断连续的 setup 失败。
+    窗口大小为 0 时无法计算失败率，不做失败率检查。
+    同一个策略对象在一次执行的所有 pytest 会话中共用，终止后剩余的批次也不再执行。
+    """
+
+    def __init__(
+        self,
+        max_failures: int = 0,
+        max_setup_errors: int = 0,
+        failure_rate: float = 0.0,
+        window: int = FAIL_FAST_WINDOW,
+    ) -> None:
+        self.max_failures = max_failures
+        self.max_setup_errors = max_setup_errors
+        if failure_rate and window <= 0:
+            logger.warning("Fail fast window is 0, failure rate check is disabled")
+            failure_rate = 0.0
+        self.failure_rate = failure_rate
+        self.failures = 0
+        self.consecutive_setup_errors = 0
+        self.recent: Deque[bool] = deque(maxlen=max(window, 1))
+        # 终止原因，未终止时为 None
+        self.reason: Optional[str] = None
+
+    def get_state(self) -> Dict[str, Any]:
+        """
+        获取统计状态，用于在崩溃隔离模式下从子进程传回父进程。
+        """
+        return {
+            "failures": self.failures,
+            "consecutive_setup_errors": self.consecutive_setup_errors,
+            "recent": list(self.recent),
+            "reason": self.reason,
+        }
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        """
+        恢复 get_state 获取的统计状态，之后启动的子进程继续按恢复后的状态判断是否终止。
+        """
+        self.failures = state["failures"]
+        self.consecutive_setup_errors = state["consecutive_setup_errors"]
+        self.recent.clear()
+        self.recent.extend(state["recent"])
+        self.reason = state["reason"]
+
+    def record(self, result_type: ResultType, setup_failed: bool) -> Optional[str]:
+        """
+        记录一个用例的结果。
+
+        Args:
+            result_type: 用例的最终结果
+            setup_failed: 用例是否在 setup 阶段失败
+
+        Returns:
+            需要终止时返回终止原因，否则返回 None
+        """
+        if self.reason or result_type == ResultType.IGNORED:
+            return self.reason
+        failed = result_type == ResultType.FAILED
+        self.failures += failed
+        self.consecutive_setup_errors = self.consecutive_setup_errors + 1 if setup_failed else 0
+        self.recent.append(failed)
+
+        if self.max_failures and self.failures >= self.max_failures:
+            self.reason = f"Aborted after {self.failures} failed testcases"
+        elif self.max_setup_errors and self.consecutive_setup_errors >= self.max_setup_errors:
+            self.reason = (
+                f"Aborted after {self.consecutive_setup_errors} consecutive setup errors, "
+                "the test environment may be broken"
+            )
+        elif self.failure_rate and len(self.recent) == self.recent.maxlen:
+            recent_failures = sum(self.recent)
+            if recent_failures >= self.failure_rate * len(self.recent):
+                self.reason = (
+                    f"Aborted because {recent_failures} of the last {len(self.recent)} "
+                    f"testcases failed (threshold {self.failure_rate:.0%})"
+                )
+        if self.reason:
+            logger.error(self.reason)
+        return self.reason
+
+
+def create_fail_fast_policy() -> Optional[FailFastPolicy]:
+    """
+    根据配置创建提前终止策略，没有配置任何条件时返回 None。
+
+    - TESTSOLAR_TTP_FAILFASTMAXFAILURES: 失败用例数达到该值时终止
+    - TESTSOLAR_TTP_FAILFASTMAXSETUPERRORS: 连续 setup 失败的用例数达到该值时终止
+    - TESTSOLAR_TTP_FAILFASTFAILURERATE: 最近窗口内失败用例的比例达到该值（0~1）时终止
+    - TESTSOLAR_TTP_FAILFASTWINDOW: 计算失败率的窗口大小，默认为 50
+    """
+    policy = FailFastPolicy(
+        max_failures=_get_int("TESTSOLAR_TTP_FAILFASTMAXFAILURES"),
+        max_setup_errors=_get_int("TESTSOLAR_TTP_FAILFASTMAXSETUPERRORS"),
+        failure_rate=_get_rate("TESTSOLAR_TTP_FAILFASTFAILURERATE"),
+        window=_get_int("TESTSOLAR_TTP_FAILFASTWINDOW", FAIL_FAST_WINDOW),
+    )
+    if not (policy.max_failures or policy.max_setup_errors or policy.failure_rate):
+        return None
+    return policy
@@ -0,0 +1,189 @@
+import builtins
+import contextlib
+import importlib
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# 导入耗时报告中输出的模块和文件数量
+IMPORT_PROFILE_TOP_LIMIT = 20
+
+# 导入耗时剖析文件名，写在加载报告旁边
+IMPORT_PROFILE_FILE = "load_testsolar_import_profile.json"
+
+# 不在任何收集节点中触发的导入，例如插件和根目录 conftest 的导入
+IMPORT_TRIGGER_STARTUP = "<startup>"
+
+
+def check_import_profile_enable() -> bool:
+    """
+    检查是否开启导入耗时剖析，通过 TESTSOLAR_TTP_IMPORTPROFILE 配置。
+    """
+    return os.getenv("TESTSOLAR_TTP_IMPORTPROFILE", "").lower() in ["1", "true"]
+
+
+@dataclass
+class ImportRecord:
+    module: str
+    cumulative: float = 0.0
+    self_time: float = 0.0
+    # 触发导入的收集节点路径，通常是用例文件或 conftest 所在目录
+    trigger: str = IMPORT_TRIGGER_STARTUP
+
+
+class ImportProfiler:
+    """
+    记录收集用例期间每个模块首次导入的累计耗时和自身耗时（累计耗时减去其中嵌套导入的耗时），
+    并归属到触发导入的收集节点。
+
+    通过替换 builtins.__import__ 和 importlib.import_module 实现，pytest 导入用例文件和 conftest、
+    用例文件中的 import 语句都会经过这两个入口；已经导入过的模块不会记录。
+    只记录开启剖析的线程中的导入。
+    """
+
+    def __init__(self) -> None:
+        self.records: Dict[str, ImportRecord] = {}
+        self._children: List[float] = []
+        self._triggers: List[str] = []
+        self._thread_id = threading.get_ident()
+        self._original_import: Optional[Callable[..., Any]] = None
+        self._original_import_module: Optional[Callable[..., Any]] = None
+
+    def install(self) -> None:
+        self._thread_id = threading.get_ident()
+        self._original_import = builtins.__import__
+        self._original_import_module = importlib.import_module
+        original_import = self._original_import
+        original_import_module = self._original_import_module
+
+        def profiled_import(
+            name: str,
+            globals: Optional[Dict[str, Any]] = None,
+            locals: Optional[Dict[str, Any]] = None,
+            fromlist: Any = (),
+            level: int = 0,
+        ) -> Any:
+            module = name
+            if level > 0:
+                package = (globals or {}).get("__package__") or ""
+                try:
+                    module = importlib.util.resolve_name("." * level + name, package)
+                except (ImportError, ValueError):
+                    pass
+            if fromlist and module in sys.modules:
+                # from package import submodule：包已经导入，实际导入的是其中尚未导入的子模块
+                package_module = sys.modules[module]
+                missing = [
+                    it
+                    for it in fromlist
+                    if it != "*"
+                    and not hasattr(package_module, it)
+                    and f"{module}.{it}" not in sys.modules
+                ]
+                if len(missing) == 1:
+                    module = f"{module}.{missing[0]}"
+                elif missing:
+                    module = f"{module}.{{{','.join(missing)}}}"
+            return self._profile(module, original_import, name, globals, locals, fromlist, level)
+
+        def profiled_import_module(name: str, package: Optional[str] = None) -> Any:
+            module = name
+            if name.startswith("."):
+                try:
+                    module = importlib.util.resolve_name(name, package)
+                except (ImportError, ValueError):
+                    pass
+            return self._profile(module, original_import_module, name, package)
+
+        builtins.__import__ = profiled_import  # type: ignore[assignment]
+        importlib.import_module = profiled_import_module
+
+    def uninstall(self) -> None:
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+        if self._original_import_module is not None:
+            importlib.import_module = self._original_import_module
+        self._original_import = None
+        self._original_import_module = None
+
+    def _profile(self, module: str, func: Callable[..., Any], *args: Any) -> Any:
+        if module in sys.modules or threading.get_ident() != self._thread_id:
+            return func(*args)
+
+        self._children.append(0.0)
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            cumulative = time.perf_counter() - start
+            children = self._children.pop()
+            if self._children:
+                self._children[-1] += cumulative
+            if module not in self.records:
+                self.records[module] = ImportRecord(
+                    module=module,
+                    cumulative=cumulative,
+                    self_time=cumulative - children,
+                    trigger=self._triggers[-1] if self._triggers else IMPORT_TRIGGER_STARTUP,
+                )
+
+    @contextlib.contextmanager
+    def trigger(self, path: str) -> Iterator[None]:
+        """
+        在上下文中发生的导入归属到指定的收集节点。
+        """
+        self._triggers.append(path)
+        try:
+            yield
+        finally:
+            self._triggers.pop()
+
+    def trigger_totals(self) -> Dict[str, float]:
+        """
+        按收集节点汇总导入耗时，只统计自身耗时以避免嵌套导入被重复计算。
+        """
+        totals: Dict[str, float] = defaultdict(float)
+        for record in self.records.values():
+            totals[record.trigger] += record.self_time
+        return dict(totals)
+
+    def report(self, limit: int = IMPORT_PROFILE_TOP_LIMIT) -> str:
+        """
+        生成按耗时排序的导入耗时报告。
+        """
+        lines = [f"Import time of {len(self.records)} modules during collection:"]
+        lines.append("Slowest modules (self / cumulative):")
+        records = sorted(self.records.values(), key=lambda it: it.self_time, reverse=True)
+        for record in records[:limit]:
+            lines.append(
+                f"  {record.self_time * 1000:10.1f}ms {record.cumulative * 1000:10.1f}ms  "
+                f"{record.module}  <- {record.trigger}"
+            )
+        lines.append("Slowest collection nodes by import time:")
+        totals = sorted(self.trigger_totals().items(), key=lambda it: it[1], reverse=True)
+        for trigger, total in totals[:limit]:
+            lines.append(f"  {total * 1000:10.1f}ms  {trigger}")
+        return "\n".join(lines)
+
+    def write_profile(self, path: Path) -> None:
+        """
+        将全部导入记录写入 JSON 文件。
+        """
+        records = sorted(self.records.values(), key=lambda it: it.self_time, reverse=True)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "modules": [asdict(it) for it in records],
+                    "triggers": self.trigger_totals(),
+                },
+                f,
+                indent=2,
+            )
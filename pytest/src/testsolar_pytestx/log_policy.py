@@ -0,0 +1,118 @@
+import os
+import sys
+import time
+from typing import Dict, Optional, Tuple
+
+from loguru import logger
+from testsolar_testtool_sdk.model.testresult import ResultType
+
+# 默认日志级别，单个用例生命周期内的日志为 DEBUG 级别，默认不输出
+DEFAULT_LOG_LEVEL = "INFO"
+
+# configure_logger 最近一次使用的日志级别和是否通过后台线程写入，未调用时为 None
+_logger_config: Optional[Tuple[str, bool]] = None
+
+# 进度日志默认每完成多少个用例输出一次
+PROGRESS_LOG_EVERY = 100
+
+# 进度日志默认的最长输出间隔（秒）
+PROGRESS_LOG_INTERVAL = 10.0
+
+
+def get_log_level() -> str:
+    """
+    获取日志级别，通过 TESTSOLAR_TTP_LOGLEVEL 配置，默认为 INFO。
+    """
+    level = os.getenv("TESTSOLAR_TTP_LOGLEVEL", "").strip().upper()
+    if not level:
+        return DEFAULT_LOG_LEVEL
+    try:
+        logger.level(level)
+    except ValueError:
+        logger.warning(f"Unknown log level {level}, use {DEFAULT_LOG_LEVEL} instead")
+        return DEFAULT_LOG_LEVEL
+    return level
+
+
+def configure_logger(level: Optional[str] = None, enqueue: bool = True) -> None:
+    """
+    替换 loguru 默认的 stderr 输出：按日志级别过滤，并通过队列在后台线程中写入，避免用例执行线程阻塞在 IO 上。
+
+    只应在 load/run 入口中调用，作为库使用时保留调用方自己的日志配置。
+
+    Args:
+        level: 日志级别，为 None 时使用 get_log_level 的结果
+        enqueue: 是否通过后台线程写入，需要 fork 的进程（如常驻进程）中不能有后台线程，应设置为 False
+    """
+    global _logger_config
+    level = level or get_log_level()
+    logger.remove()
+    logger.add(sys.stderr, level=level, enqueue=enqueue)
+    _logger_config = (level, enqueue)
+
+
+def configure_logger_after_fork() -> None:
+    """
+    在 fork 出的子进程（快照分批、崩溃隔离）中改为直接写入日志。
+
+    通过后台线程写入时，写入线程只存在于父进程中，子进程的日志经由共享的队列交给父进程写入：
+    不会经过子进程重定向后的标准错误，子进程被强制结束时还可能持有队列的锁，导致父进程无法再写日志。
+    没有调用过 configure_logger（作为库使用）时保留调用方自己的日志配置。
+    """
+    if _logger_config is None or not _logger_config[1]:
+        return
+    configure_logger(_logger_config[0], enqueue=False)
+
+
+class ProgressLogger:
+    """
+    聚合输出用例执行进度，每完成固定数量的用例或超过时间间隔输出一行，代替逐个用例的 INFO 日志。
+    """
+
+    def __init__(
+        self, every: int = PROGRESS_LOG_EVERY, interval: float = PROGRESS_LOG_INTERVAL
+    ) -> None:
+        self.every = every
+        self.interval = interval
+        self.count = 0
+        self.result_counts: Dict[ResultType, int] = {}
+        self.start_time = time.monotonic()
+        self.last_log_time = self.start_time
+        self.last_log_count = 0
+
+    def update(self, result_type: ResultType) -> None:
+        """
+        记录一个执行完成的用例，满足条件时输出进度。
+
+        Args:
+            result_type: 用例的结果类型
+        """
+        self.count += 1
+        self.result_counts[result_type] = self.result_counts.get(result_type, 0) + 1
+        now = time.monotonic()
+        if (self.every > 0 and self.count % self.every == 0) or (
+            now - self.last_log_time >= self.interval
+        ):
+            self._log(now)
+
+    def finish(self) -> None:
+        """
+        输出最终的执行进度。
+        """
+        if self.count > self.last_log_count:
+            self._log(time.monotonic())
+
+    def _log(self, now: float) -> None:
+        elapsed = now - self.start_time
+        recent = now - self.last_log_time
+        results = ", ".join(
+            f"{result_type.value} {count}" for result_type, count in self.result_counts.items()
+        )
+        total_rate = self.count / elapsed if elapsed > 0 else 0.0
+        recent_rate = (self.count - self.last_log_count) / recent if recent > 0 else 0.0
+        logger.info(
+            f"Progress: {self.count} testcases finished ({results}) in {elapsed:.1f}s, "
+            f"{total_rate:.1f} testcases/s overall, {recent_rate:.1f} testcases/s recently"
+        )
+        self.last_log_time = now
+        self.last_log_count = self.count
@@ -0,0 +1,130 @@
+import dataclasses
+import os
+from pathlib import Path
+from typing import BinaryIO, List, Optional
+
+import pytest
+from loguru import logger
+from pytest import Session
+from testsolar_testtool_sdk.model.load import LoadError, LoadResult
+from testsolar_testtool_sdk.model.param import EntryParam
+from testsolar_testtool_sdk.reporter import BaseReporter, FileReporter
+
+from .collector import PytestCollector, append_collected_testcases, collect_testcases
+from .executor import run_testcases
+from .filter import filter_invalid_selector_path
+
+# 加载结果文件名，写在执行报告目录中
+LOAD_RESULT_FILE = "load_result.json"
+
+
+def get_load_result_path(report_path: Path) -> Path:
+    """
+    获取加载执行一体模式下加载结果的文件路径。
+
+    Args:
+        report_path: 执行报告目录
+
+    Returns:
+        加载结果文件路径
+    """
+    return report_path / LOAD_RESULT_FILE
+
+
+class LoadResultEmitter:
+    """
+    在用例收集完成、开始执行之前生成并上报加载结果。
+
+    崩溃隔离模式下每个执行子进程都会收集一次，加载结果文件已经存在时不再重复上报，
+    避免重启后的子进程用剩余用例覆盖完整的加载结果。
+    """
+
+    def __init__(
+        self,
+        collector: PytestCollector,
+        load_result: LoadResult,
+        project_path: str,
+        load_result_path: Path,
+        case_comment_fields: Optional[List[str]] = None,
+    ) -> None:
+        self.collector = collector
+        self.load_result = load_result
+        self.project_path = project_path
+        self.load_result_path = load_result_path
+        self.reporter: BaseReporter = FileReporter(load_result_path)
+        self.case_comment_fields = case_comment_fields
+        self.emitted = False
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_collection_finish(self, session: Session) -> None:
+        if self.load_result_path.exists():
+            return
+        append_collected_testcases(
+            self.load_result,
+            self.collector.collected,
+            self.project_path,
+            self.case_comment_fields,
+        )
+        for k, v in self.collector.errors.items():
+            self.load_result.LoadErrors.append(LoadError(name=k, message=v))
+        self.emit()
+
+    def emit(self) -> None:
+        logger.info(f"[Load] collect testcase count: {len(self.load_result.Tests)}")
+        logger.info(f"[Load] collect load error count: {len(self.load_result.LoadErrors)}")
+        self.reporter.report_load_result(self.load_result)
+        self.emitted = True
+
+
+def load_and_run_testcases(
+    entry: EntryParam,
+    pipe_io: Optional[BinaryIO] = None,
+    case_comment_fields: Optional[List[str]] = None,
+) -> None:
+    """
+    在同一个pytest会话中加载并执行用例：收集完成后先上报加载结果，再直接执行收集到的用例，
+    用例文件和conftest只导入、收集一次。
+
+    加载结果写入执行报告目录中的load_result.json，执行结果和run.py一样按用例写入执行报告目录。
+    单命令运行全部用例和文件执行模式的加载不需要收集用例，依次执行加载和执行。
+
+    Args:
+        entry: 执行参数，FileReportPath为执行报告目录
+        pipe_io: 上报管道
+        case_comment_fields: 需要从用例注释中解析的属性字段
+    """
+    report_path = Path(entry.FileReportPath)
+    load_result_path = get_load_result_path(report_path)
+    report_path.mkdir(parents=True, exist_ok=True)
+
+    run_all_cases = os.getenv("TESTSOLAR_TTP_RUNALLCASES", "").lower() in ["1", "true"]
+    file_mode = os.getenv("TESTSOLAR_TTP_FILEEXECUTEMODE", "").lower() in ["1", "true"]
+    if run_all_cases or file_mode:
+        collect_testcases(
+            dataclasses.replace(entry, FileReportPath=str(load_result_path)),
+            case_comment_fields=case_comment_fields,
+        )
+        run_testcases(entry, pipe_io, case_comment_fields)
+        return
+
+    valid_selectors, load_errors = filter_invalid_selector_path(
+        workspace=entry.ProjectPath,
+        selectors=entry.TestSelectors,
+    )
+    load_result = LoadResult(Tests=[], LoadErrors=list(load_errors))
+    if load_result_path.exists():
+        load_result_path.unlink()
+    collector = PytestCollector(load_result_path)
+    emitter = LoadResultEmitter(
+        collector, load_result, entry.ProjectPath, load_result_path, case_comment_fields
+    )
+    try:
+        run_testcases(entry, pipe_io, case_comment_fields, extra_plugins=[collector, emitter])
+    finally:
+        if not emitter.emitted and not load_result_path.exists():
+            # pytest在收集完成之前就退出了，有效的用例选择器也作为加载错误上报
+            for selector in valid_selectors:
+                load_result.LoadErrors.append(
+                    LoadError(name=selector, message="Pytest exited before collection finished")
+                )
+            emitter.emit()
@@ -0,0 +1,209 @@
+import contextlib
+import os
+import sys
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+from .timing import get_report_dir
+
+if TYPE_CHECKING:
+    import pstats
+
+# 采样调用栈的间隔（秒）
+PROFILE_SAMPLE_INTERVAL = 0.005
+
+# 输出的最耗时项数量
+PROFILE_TOP_LIMIT = 10
+
+# pstats 中的函数标识：(文件名, 行号, 函数名)
+FuncKey = Tuple[str, int, str]
+
+
+def check_profile_enable() -> bool:
+    """
+    检查是否开启性能剖析，通过 TESTSOLAR_TTP_PROFILE 配置。
+    """
+    return os.getenv("TESTSOLAR_TTP_PROFILE", "").lower() in ["1", "true"]
+
+
+class StackSampler:
+    """
+    在后台线程中定时采样目标线程的调用栈，按 flamegraph.pl/speedscope 使用的折叠格式统计。
+    """
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL) -> None:
+        self.interval = interval
+        self.counts: Dict[str, int] = defaultdict(int)
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread_id = threading.get_ident()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack: List[str] = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def write_collapsed(self, path: Path) -> None:
+        """
+        写入折叠格式的调用栈，每行为 "栈帧1;栈帧2;... 采样次数"。
+        """
+        with open(path, "w") as f:
+            for stack, count in sorted(self.counts.items()):
+                f.write(f"{stack} {count}\n")
+
+
+_framework_dirs: Optional[Tuple[str, ...]] = None
+
+
+def _get_framework_dirs() -> Tuple[str, ...]:
+    """
+    获取统计 fixture 和用例耗时时排除的标准库和 pytest 目录，只在开启性能剖析后首次使用时计算。
+    """
+    global _framework_dirs
+    if _framework_dirs is None:
+        import sysconfig
+
+        import _pytest
+
+        _framework_dirs = (sysconfig.get_paths()["stdlib"], os.path.dirname(_pytest.__file__))
+    return _framework_dirs
+
+
+def _is_framework_func(func: FuncKey) -> bool:
+    """
+    判断函数是否属于内置函数、标准库或 pytest 自身，统计 fixture 和用例耗时时排除。
+    """
+    file_name = func[0]
+    if file_name == "~" or file_name.startswith("<"):
+        return True
+    return os.path.abspath(file_name).startswith(_get_framework_dirs())
+
+
+def _format_func(func: FuncKey) -> str:
+    file_name, line, name = func
+    if file_name == "~":
+        return name
+    return f"{name} ({file_name}:{line})"
+
+
+def _top_by_caller(
+    stats: Dict[
+        FuncKey, Tuple[int, int, float, float, Dict[FuncKey, Tuple[int, int, float, float]]]
+    ],
+    file_suffix: str,
+    caller_name: str,
+    limit: int,
+) -> List[Tuple[float, FuncKey]]:
+    """
+    统计由指定函数直接调用的用户函数的累计耗时。
+    """
+    result: List[Tuple[float, FuncKey]] = []
+    for func, (_, _, _, _, callers) in stats.items():
+        if _is_framework_func(func):
+            continue
+        cumulative = sum(
+            edge[3]
+            for caller, edge in callers.items()
+            if caller[2] == caller_name and caller[0].replace("\\", "/").endswith(file_suffix)
+        )
+        if cumulative > 0:
+            result.append((cumulative, func))
+    return sorted(result, reverse=True)[:limit]
+
+
+def summarize_profile(profile_stats: "pstats.Stats", limit: int = PROFILE_TOP_LIMIT) -> str:
+    """
+    汇总最耗时的函数、模块导入、fixture 和用例。
+
+    模块导入按模块级代码（<module>）的累计耗时统计；fixture 和用例分别按 pytest 的
+    call_fixture_func 和 pytest_pyfunc_call 直接调用的函数统计，yield 形式的 fixture 由 next() 驱动，不在统计范围内。
+
+    Args:
+        profile_stats: cProfile 的统计结果
+        limit: 每一类输出的数量
+
+    Returns:
+        可读的汇总文本
+    """
+    stats = profile_stats.stats  # type: ignore[attr-defined]
+    sections: List[Tuple[str, List[Tuple[float, FuncKey]]]] = [
+        (
+            "functions (cumulative)",
+            sorted(((v[3], k) for k, v in stats.items()), reverse=True)[:limit],
+        ),
+        (
+            "imports",
+            sorted(((v[3], k) for k, v in stats.items() if k[2] == "<module>"), reverse=True)[
+                :limit
+            ],
+        ),
+        ("fixtures", _top_by_caller(stats, "_pytest/fixtures.py", "call_fixture_func", limit)),
+        ("tests", _top_by_caller(stats, "_pytest/python.py", "pytest_pyfunc_call", limit)),
+    ]
+
+    lines: List[str] = []
+    for title, items in sections:
+        lines.append(f"Slowest {title}:")
+        if not items:
+            lines.append("  (none)")
+        for cumulative, func in items:
+            lines.append(f"  {cumulative * 1000:10.1f}ms  {_format_func(func)}")
+    return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def profile_session(report_path: Optional[str], phase: str) -> Iterator[None]:
+    """
+    开启性能剖析时，剖析上下文中的全部执行过程，在报告旁写入剖析结果并输出最耗时的部分：
+
+    - {phase}_testsolar_profile.pstats：cProfile 的确定性剖析结果，可用 snakeviz 等工具查看
+    - {phase}_testsolar_profile.collapsed.txt：采样得到的折叠调用栈，可用 flamegraph.pl/speedscope 生成火焰图
+
+    Args:
+        report_path: 报告路径，加载时为文件，执行时为目录
+        phase: 执行阶段，load、run 或 pipeline
+    """
+    if not check_profile_enable():
+        yield
+        return
+
+    # 只在开启剖析时使用，延迟导入以缩短启动耗时
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    sampler = StackSampler()
+    sampler.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        sampler.stop()
+
+        output_dir = get_report_dir(Path(report_path or "."), phase)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        pstats_path = output_dir / f"{phase}_testsolar_profile.pstats"
+        collapsed_path = output_dir / f"{phase}_testsolar_profile.collapsed.txt"
+        profiler.dump_stats(str(pstats_path))
+        sampler.write_collapsed(collapsed_path)
+        logger.info(f"Profile written to {pstats_path} and {collapsed_path}")
+        logger.info("\n" + summarize_profile(pstats.Stats(profiler)))
@@ -0,0 +1,188 @@
+import dataclasses
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from loguru import logger
+from testsolar_testtool_sdk.model.load import LoadResult
+from testsolar_testtool_sdk.model.param import EntryParam
+from testsolar_testtool_sdk.model.testresult import (
+    ResultType,
+    TestCaseStep,
+    TestResult,
+    deserialize_test_result,
+)
+from testsolar_testtool_sdk.reporter import BaseReporter, digest_file_name
+
+# 重新执行失败用例时使用的执行入口，每次重试都在新的进程中执行
+RUN_SCRIPT = Path(__file__).parent.parent.resolve() / "run.py"
+
+
+def get_rerun_attempts() -> int:
+    """
+    获取失败用例的重试次数，通过 TESTSOLAR_TTP_RERUNATTEMPTS 配置，默认为 0 即不重试。
+    """
+    value = os.getenv("TESTSOLAR_TTP_RERUNATTEMPTS", "")
+    try:
+        attempts = int(value) if value else 0
+    except ValueError:
+        logger.warning(f"Invalid TESTSOLAR_TTP_RERUNATTEMPTS {value}, rerun is disabled")
+        return 0
+    return max(attempts, 0)
+
+
+class FailedCaseRecorder(BaseReporter):
+    """
+    包装上报器，将最终结果为 FAILED 的用例名称和结果文件名逐行追加到记录文件中。
+
+    记录文件以追加方式写入，快照和崩溃隔离模式下子进程上报的失败用例也能被记录。
+    """
+
+    def __init__(self, reporter: BaseReporter, record_path: str) -> None:
+        self.reporter = reporter
+        self.record_path = record_path
+
+    def report_load_result(self, load_result: LoadResult) -> None:
+        self.reporter.report_load_result(load_result)
+
+    def report_case_result(self, case_result: TestResult) -> None:
+        self.reporter.report_case_result(case_result)
+        if case_result.ResultType == ResultType.FAILED:
+            record = {"name": case_result.Test.Name, "file": digest_file_name(case_result.Test)}
+            with open(self.record_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+
+
+def read_failed_cases(record_path: str) -> Dict[str, str]:
+    """
+    读取失败用例记录，同一个用例多次上报为失败时只保留一条。
+
+    Returns:
+        按上报顺序排列的用例名称到结果文件名的映射
+    """
+    failed: Dict[str, str] = {}
+    if not os.path.exists(record_path):
+        return failed
+    with open(record_path, "r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            failed[record["name"]] = record["file"]
+    return failed
+
+
+def read_case_result(report_path: Path, file_name: str) -> Optional[TestResult]:
+    result_path = report_path / file_name
+    if not result_path.exists():
+        return None
+    with result_path.open("r", encoding="utf-8") as f:
+        return deserialize_test_result(json.load(f))
+
+
+def merge_attempts(attempts: List[TestResult]) -> TestResult:
+    """
+    将同一个用例的多次执行结果合并为一个结果，每次执行的步骤标题加上执行序号，结果以最后一次为准。
+
+    Args:
+        attempts: 按执行顺序排列的执行结果，第一个为首次执行的结果
+
+    Returns:
+        合并后的用例结果
+    """
+    first, last = attempts[0], attempts[-1]
+    steps: List[TestCaseStep] = []
+    for index, attempt in enumerate(attempts, 1):
+        for step in attempt.Steps:
+            steps.append(dataclasses.replace(step, Title=f"Attempt {index}: {step.Title}"))
+    message = last.Message
+    if last.ResultType == ResultType.SUCCEED:
+        message = f"Flaky: passed on attempt {len(attempts)}, first failure: {first.Message}"
+    return TestResult(
+        Test=first.Test,
+        StartTime=first.StartTime,
+        EndTime=last.EndTime or datetime.utcnow(),
+        ResultType=last.ResultType,
+        Message=message[:1000],
+        Steps=steps,
+    )
+
+
+def _run_attempt(entry: EntryParam, selectors: List[str], report_path: Path) -> int:
+    report_path.mkdir(parents=True, exist_ok=True)
+    entry_file = report_path / "entry.json"
+    data = dataclasses.asdict(entry)
+    data.update(TestSelectors=selectors, FileReportPath=str(report_path))
+    with open(entry_file, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+    env = dict(os.environ)
+    # 重试进程中不再重试，也不采集覆盖率，避免覆盖首次执行的覆盖率数据
+    env["TESTSOLAR_TTP_RERUNATTEMPTS"] = "0"
+    env["TESTSOLAR_TTP_ENABLECOVERAGE"] = "false"
+    return subprocess.call([sys.executable, str(RUN_SCRIPT), str(entry_file)], env=env)
+
+
+def rerun_failed_cases(
+    entry: EntryParam,
+    record_path: str,
+    reporter: BaseReporter,
+    attempts: int,
+) -> Dict[str, TestResult]:
+    """
+    在新的进程中重新执行首次执行失败的用例，直到通过或达到重试次数，
+    每个用例的所有执行结果合并为一个结果重新上报，覆盖首次执行的结果。
+
+    Args:
+        entry: 首次执行的参数
+        record_path: 失败用例记录文件
+        reporter: 上报器
+        attempts: 重试次数
+
+    Returns:
+        用例名称到合并后结果的映射
+    """
+    report_path = Path(entry.FileReportPath)
+    failed = read_failed_cases(record_path)
+    history: Dict[str, List[TestResult]] = {}
+    for name, file_name in failed.items():
+        result = read_case_result(report_path, file_name)
+        if result and result.ResultType == ResultType.FAILED:
+            history[name] = [result]
+    if not history:
+        return {}
+
+    pending = list(history)
+    with tempfile.TemporaryDirectory(prefix="testsolar_rerun_") as rerun_dir:
+        for attempt in range(1, attempts + 1):
+            logger.info(f"Rerun {len(pending)} failed testcases, attempt {attempt}/{attempts}")
+            attempt_path = Path(rerun_dir) / str(attempt)
+            exit_code = _run_attempt(entry, pending, attempt_path)
+            still_failed: List[str] = []
+            for name in pending:
+                result = read_case_result(attempt_path, failed[name])
+                if result is None:
+                    now = datetime.utcnow()
+                    result = TestResult(
+                        Test=history[name][0].Test,
+                        StartTime=now,
+                        EndTime=now,
+                        ResultType=ResultType.FAILED,
+                        Message=f"Rerun process exited with code {exit_code} without a result",
+                    )
+                history[name].append(result)
+                if result.ResultType == ResultType.FAILED:
+                    still_failed.append(name)
+            pending = still_failed
+            if not pending:
+                break
+
+    merged = {name: merge_attempts(results) for name, results in history.items()}
+    for result in merged.values():
+        reporter.report_case_result(result)
+    recovered = len(merged) - len(pending)
+    logger.info(f"Rerun finished, {recovered} of {len(merged)} failed testcases passed on retry")
+    return merged
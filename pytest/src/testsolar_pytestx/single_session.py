@@ -0,0 +1,184 @@
+import os
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+
+import pytest
+from loguru import logger
+from pytest import Item, Session
+
+from .converter import CASE_DRIVE_SEPARATOR, match_pytest_nodeid, selector_to_pytest
+
+if TYPE_CHECKING:
+    from .executor import PytestExecutor
+
+
+def check_single_session_enable() -> bool:
+    """
+    检查单用例执行模式是否在同一个pytest会话中执行全部用例，通过 TESTSOLAR_TTP_SINGLESESSION 配置。
+    """
+    return os.getenv("TESTSOLAR_TTP_SINGLESESSION", "").lower() in ["1", "true"]
+
+
+@dataclass
+class SelectorRun:
+    selector: str
+    # 是否已经调用 extra_run_function 得到该选择器的参数
+    prepared: bool = False
+    # extra_run_function 为该选择器添加的除用例参数之外的选项
+    options: List[str] = field(default_factory=list)
+    # extra_run_function 为该选择器添加的用例参数
+    pytest_args: List[str] = field(default_factory=list)
+    # 相对于 rootdir 的用例参数，用于匹配收集到的用例
+    test_args: List[str] = field(default_factory=list)
+    data_drive_key: Optional[str] = None
+
+
+def _relative_test_arg(arg: str, project_path: str) -> str:
+    path, sep, rest = arg.partition("::")
+    if os.path.isabs(path):
+        path = os.path.relpath(path, project_path)
+    return path.replace(os.sep, "/") + sep + rest
+
+
+def _is_selector_test_arg(arg: str, selector: str, project_path: str) -> bool:
+    if arg.startswith("-"):
+        return False
+    selector_path = selector.split(CASE_DRIVE_SEPARATOR, 1)[0].partition("?")[0]
+    arg_path = _relative_test_arg(arg, project_path).partition("::")[0]
+    return arg_path == selector_path.rstrip("/")
+
+
+def selector_collect_arg(selector: str, project_path: str) -> str:
+    """
+    还没有调用 extra_run_function 的选择器在会话中收集用例时使用的参数，与批量执行模式相同。
+    """
+    case = selector.split(CASE_DRIVE_SEPARATOR, 1)[0]
+    return os.path.join(project_path, selector_to_pytest(case))
+
+
+def prepare_selector_run(
+    run: SelectorRun,
+    project_path: str,
+    base_args: List[str],
+    extra_run_function: Callable[[str, str, List[str]], str],
+) -> None:
+    """
+    调用 extra_run_function 得到选择器单独执行时的 pytest 参数和数据驱动标识，
+    将参数拆分为用例参数（选择器对应的路径或用例）和其他选项。每个选择器只调用一次。
+
+    Args:
+        run: 选择器的执行信息
+        project_path: 项目路径，即 rootdir
+        base_args: 所有选择器共用的 pytest 参数
+        extra_run_function: 为单个选择器添加 pytest 参数并返回数据驱动标识的函数
+    """
+    if run.prepared:
+        return
+    serial_args = base_args.copy()
+    data_drive_key = extra_run_function(run.selector, project_path, serial_args)
+    run.prepared = True
+    run.data_drive_key = data_drive_key or None
+    for arg in serial_args:
+        if _is_selector_test_arg(arg, run.selector, project_path):
+            run.pytest_args.append(arg)
+            run.test_args.append(_relative_test_arg(arg, project_path))
+        else:
+            run.options.append(arg)
+
+
+def build_session_args(runs: List[SelectorRun], project_path: str) -> List[str]:
+    """
+    生成从第一个选择器开始的会话参数：第一个选择器已经调用过 extra_run_function，
+    使用它的选项和用例参数，其余选择器按批量执行模式的方式收集用例。
+    """
+    first = runs[0]
+    test_args = first.pytest_args + [
+        selector_collect_arg(it.selector, project_path) for it in runs[1:]
+    ]
+    return first.options + list(dict.fromkeys(test_args))
+
+
+class SingleSessionScheduler:
+    """
+    在同一个 pytest 会话中依次执行每个选择器的用例，代替单用例模式下每个选择器一次 pytest.main。
+
+    每个选择器的 extra_run_function 在执行该选择器的用例之前才调用，避免提前调用带来的副作用叠加。
+    选择器的选项与会话不同，或者用例参数不在会话收集的范围内时，停止当前会话，
+    从该选择器开始的剩余选择器记录在 remaining 中，由调用方在新的会话中执行。
+
+    同一个用例可以属于多个选择器（例如不同的数据驱动标识），执行每个用例前将执行插件的数据驱动标识切换为该选择器的标识。
+    选择器之间只保留会话级 fixture，模块级和类级 fixture 在切换选择器时清理。
+    """
+
+    def __init__(
+        self,
+        executor: "PytestExecutor",
+        runs: List[SelectorRun],
+        project_path: str,
+        prepare: Callable[[SelectorRun], None],
+    ) -> None:
+        self.executor = executor
+        self.runs = runs
+        self.prepare = prepare
+        self.options = runs[0].options
+        # 会话收集用例时使用的相对用例参数
+        self.collected_args = {
+            _relative_test_arg(arg, project_path)
+            for arg in build_session_args(runs, project_path)[len(self.options) :]
+        }
+        # 没有在当前会话中执行的选择器
+        self.remaining: List[SelectorRun] = []
+
+    def _accepts(self, run: SelectorRun) -> bool:
+        return run.options == self.options and set(run.test_args) <= self.collected_args
+
+    def schedule(self, run: SelectorRun, items: List[Item]) -> List[Item]:
+        """
+        按选择器的用例参数顺序获取该选择器需要执行的用例。
+        """
+        file_items: Dict[str, List[Item]] = {}
+        for item in items:
+            file_items.setdefault(item.nodeid.partition("::")[0], []).append(item)
+
+        scheduled: Dict[str, Item] = {}
+        for arg in run.test_args:
+            # 用例参数是文件或文件中的用例时只需要检查该文件的用例，目录时检查全部用例
+            for item in file_items.get(arg.partition("::")[0], items):
+                if item.nodeid not in scheduled and match_pytest_nodeid(item.nodeid, arg):
+                    scheduled[item.nodeid] = item
+        return list(scheduled.values())
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_runtestloop(self, session: Session) -> Optional[bool]:
+        """
+        替换 pytest 默认的执行循环，返回 None 时仍由默认实现执行。
+        """
+        if session.config.option.collectonly or not session.items:
+            return None
+        if session.config.pluginmanager.has_plugin("dsession"):
+            logger.warning("Single session scheduling is disabled when running with pytest-xdist")
+            return None
+
+        all_items = list(session.items)
+        for index, run in enumerate(self.runs):
+            self.prepare(run)
+            if not self._accepts(run):
+                self.remaining = self.runs[index:]
+                logger.info(f"{run.selector} requires different pytest args, run in a new session")
+                break
+            items = self.schedule(run, all_items)
+            logger.info(f"Run {len(items)} testcases of {run.selector} in a single session")
+            # 会话提前终止时只上报当前选择器中没有执行的用例
+            session.items = items
+            self.executor.data_drive_key = run.data_drive_key
+            for item_index, item in enumerate(items):
+                # 下一个选择器的参数在执行它的用例前才确定，最后一个用例只保留会话级 fixture
+                next_item = items[item_index + 1] if item_index + 1 < len(items) else session
+                item.config.hook.pytest_runtest_protocol(item=item, nextitem=next_item)
+                if session.shouldfail or session.shouldstop:
+                    self.remaining = self.runs[index + 1 :]
+                if session.shouldfail:
+                    raise session.Failed(session.shouldfail)
+                if session.shouldstop:
+                    raise session.Interrupted(session.shouldstop)
+        return True
@@ -0,0 +1,262 @@
+import os
+import pickle
+import sys
+import tempfile
+import time
+import traceback
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, List, NoReturn, Optional
+
+import pytest
+from loguru import logger
+from pytest import Item, Session
+from testsolar_testtool_sdk.model.test import TestCase
+from testsolar_testtool_sdk.model.testresult import (
+    LogLevel,
+    ResultType,
+    TestCaseLog,
+    TestCaseStep,
+    TestResult,
+)
+
+from .converter import match_pytest_nodeid, selector_to_pytest
+from .log_policy import configure_logger_after_fork
+from .supervisor import (
+    JournalReporter,
+    JournalState,
+    RunJournal,
+    describe_exit_status,
+    read_journal,
+    report_unreported,
+)
+
+if TYPE_CHECKING:
+    from .executor import PytestExecutor
+
+# 默认每个分批包含的用例选择器数量
+SNAPSHOT_BATCH_SIZE = 1
+
+
+def check_snapshot_enable() -> bool:
+    """
+    检查是否开启收集快照模式，通过 TESTSOLAR_TTP_SNAPSHOT 配置。
+    """
+    return os.getenv("TESTSOLAR_TTP_SNAPSHOT", "").lower() in ["1", "true"]
+
+
+def is_snapshot_supported() -> bool:
+    """
+    收集快照依赖 fork，Windows 上不可用。
+    """
+    return hasattr(os, "fork")
+
+
+def get_snapshot_batch_size() -> int:
+    """
+    获取每个分批包含的用例选择器数量，通过 TESTSOLAR_TTP_SNAPSHOTBATCHSIZE 配置，默认为 1。
+    """
+    value = os.getenv("TESTSOLAR_TTP_SNAPSHOTBATCHSIZE", "")
+    try:
+        batch_size = int(value) if value else SNAPSHOT_BATCH_SIZE
+    except ValueError:
+        logger.warning(f"Invalid TESTSOLAR_TTP_SNAPSHOTBATCHSIZE {value}, use default")
+        return SNAPSHOT_BATCH_SIZE
+    return max(batch_size, 1)
+
+
+def split_items_by_selectors(
+    items: List[Item], selectors: List[str], batch_size: int
+) -> List[List[Item]]:
+    """
+    按用例选择器将已经收集的用例分批，只比较 nodeid，不会重新导入用例文件。
+
+    每个用例归属到第一个匹配的选择器，每 batch_size 个选择器的用例为一批，批内保持收集顺序；
+    没有匹配任何选择器的用例单独放在最后一批，避免遗漏。
+
+    Args:
+        items: 已经收集的用例
+        selectors: 用例选择器，nodeid 需要相对于 rootdir
+        batch_size: 每批包含的选择器数量
+
+    Returns:
+        非空的用例分批
+    """
+    selector_args = [selector_to_pytest(it) for it in selectors]
+    batch_count = (len(selectors) + batch_size - 1) // batch_size
+    batches: List[List[Item]] = [[] for _ in range(batch_count + 1)]
+    for item in items:
+        for index, selector_arg in enumerate(selector_args):
+            if match_pytest_nodeid(item.nodeid, selector_arg):
+                batches[index // batch_size].append(item)
+                break
+        else:
+            batches[-1].append(item)
+    return [it for it in batches if it]
+
+
+class SessionSnapshot:
+    """
+    收集快照插件：在当前进程中只收集一次用例，之后为每一批用例 fork 一个子进程执行。
+
+    子进程直接使用内存中已经收集好的用例树，不再重新导入用例文件和 conftest，
+    批与批之间的模块级状态和 fixture 互不影响。子进程通过管道将执行统计和进度返回给当前进程，
+    异常退出时按执行日志上报本批没有完成的用例，之后继续执行下一批。
+    """
+
+    def __init__(self, executor: "PytestExecutor", selectors: List[str], batch_size: int) -> None:
+        self.executor = executor
+        self.selectors = selectors
+        self.batch_size = batch_size
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_runtestloop(self, session: Session) -> Optional[bool]:
+        """
+        替换 pytest 默认的执行循环，返回 None 时仍由默认实现执行。
+        """
+        if session.config.option.collectonly or not session.items:
+            return None
+        if session.config.pluginmanager.has_plugin("dsession"):
+            logger.warning("Snapshot mode is disabled when running with pytest-xdist")
+            return None
+
+        batches = split_items_by_selectors(session.items, self.selectors, self.batch_size)
+        logger.info(
+            f"Run {len(session.items)} collected testcases in {len(batches)} forked batches"
+        )
+        for batch in batches:
+            self._run_batch(session, batch)
+            if session.shouldfail or session.shouldstop:
+                break
+        return True
+
+    def _run_batch(self, session: Session, items: List[Item]) -> None:
+        fd, journal_path = tempfile.mkstemp(prefix="testsolar_journal_", suffix=".jsonl")
+        os.close(fd)
+        try:
+            read_fd, write_fd = os.pipe()
+            sys.stdout.flush()
+            sys.stderr.flush()
+            with self.executor.timing.measure("helper.snapshot_fork"):
+                pid = os.fork()
+            if pid == 0:
+                os.close(read_fd)
+                self._run_child(session, items, journal_path, write_fd)
+
+            os.close(write_fd)
+            with os.fdopen(read_fd, "rb") as f:
+                output = f.read()
+            _, status = os.waitpid(pid, 0)
+            if not os.WIFEXITED(status) or os.WEXITSTATUS(status) != 0 or not output:
+                self._report_crashed_batch(session, items, status, read_journal(journal_path))
+                return
+        finally:
+            os.unlink(journal_path)
+
+        # 子进程的状态从 fork 时的状态累加而来，直接采用即可
+        state: Dict[str, Any] = pickle.loads(output)
+        session.testsfailed = state["testsfailed"]
+        session.shouldfail = state["shouldfail"]
+        session.shouldstop = state["shouldstop"]
+        self.executor.testcase_count = state["testcase_count"]
+        self.executor.executed_nodeids = state["executed_nodeids"]
+        self.executor.progress = state["progress"]
+        self.executor.fail_fast = state["fail_fast"]
+        self.executor.allure_processed_files = state["allure_processed_files"]
+
+    def _report_crashed_batch(
+        self, session: Session, items: List[Item], status: int, journal: JournalState
+    ) -> None:
+        """
+        子进程异常退出时，已经执行完成但没有上报的用例按执行日志中的结果上报，
+        其余没有执行完成的用例全部上报为失败，之后继续执行下一批。
+        """
+        executor = self.executor
+        message = f"Snapshot batch process exited abnormally with {describe_exit_status(status)}"
+        unfinished = [it.nodeid for it in items if it.nodeid not in journal.finished]
+        logger.error(f"{message}, unfinished testcases: {unfinished}")
+
+        def testcase_name(nodeid: str) -> str:
+            return executor._normalize_testcase_name(nodeid, executor.data_drive_key)
+
+        report_unreported(executor._report_case_result, journal, testcase_name)
+        for nodeid in unfinished:
+            end_time = datetime.utcnow()
+            start_time = datetime.utcfromtimestamp(journal.started.get(nodeid, time.time()))
+            executor._report_case_result(
+                TestResult(
+                    Test=TestCase(Name=testcase_name(nodeid)),
+                    ResultType=ResultType.FAILED,
+                    StartTime=start_time,
+                    EndTime=end_time,
+                    Message=message,
+                    Steps=[
+                        TestCaseStep(
+                            Title="Crash",
+                            StartTime=start_time,
+                            EndTime=end_time,
+                            ResultType=ResultType.FAILED,
+                            Logs=[
+                                TestCaseLog(Time=end_time, Level=LogLevel.ERROR, Content=message)
+                            ],
+                        )
+                    ],
+                )
+            )
+
+        # 子进程中的统计已经丢失，按执行日志和失败上报的用例重新记录
+        results = [journal.finished[it.nodeid] for it in items if it.nodeid in journal.finished]
+        results += [ResultType.FAILED] * len(unfinished)
+        session.testsfailed += results.count(ResultType.FAILED)
+        executor.testcase_count += len(items)
+        executor.executed_nodeids.update(it.nodeid for it in items)
+        for result_type in results:
+            executor.progress.update(result_type)
+            if executor.fail_fast and not executor.fail_fast.reason:
+                reason = executor.fail_fast.record(result_type, False)
+                if reason:
+                    session.shouldstop = reason
+
+    def _run_child(
+        self, session: Session, items: List[Item], journal_path: str, write_fd: int
+    ) -> NoReturn:
+        """
+        在 fork 出的子进程中按 pytest 默认执行循环执行一批用例，最后一个用例结束时清理全部 fixture。
+
+        用例开始、结束和上报事件写入执行日志，子进程异常退出时父进程据此上报未完成的用例。
+        """
+        exit_code = 1
+        try:
+            configure_logger_after_fork()
+            journal = RunJournal(journal_path)
+            session.config.pluginmanager.register(journal, "testsolar_snapshot_journal")
+            self.executor.set_reporter(JournalReporter(self.executor.reporter, journal))
+            for index, item in enumerate(items):
+                next_item = items[index + 1] if index + 1 < len(items) else None
+                item.config.hook.pytest_runtest_protocol(item=item, nextitem=next_item)
+                if session.shouldfail or session.shouldstop:
+                    break
+            # 子进程中的用例结果需要在子进程中完成 allure 处理和上报，只处理本批新生成的结果文件
+            self.executor.report_allure_results(session)
+            with os.fdopen(write_fd, "wb") as f:
+                pickle.dump(
+                    {
+                        "testsfailed": session.testsfailed,
+                        "shouldfail": session.shouldfail,
+                        "shouldstop": session.shouldstop,
+                        "testcase_count": self.executor.testcase_count,
+                        "executed_nodeids": self.executor.executed_nodeids,
+                        "progress": self.executor.progress,
+                        "fail_fast": self.executor.fail_fast,
+                        "allure_processed_files": self.executor.allure_processed_files,
+                    },
+                    f,
+                )
+            exit_code = 0
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(exit_code)
@@ -2,7 +2,7 @@ import io
 import sys
 import pytest
 import contextlib
-from typing import List, Tuple, TextIO, TypeVar, Union
+from typing import Any, List, Optional, Tuple, TextIO, TypeVar, Union
 
 T = TypeVar("T")
 
@@ -52,14 +52,16 @@ class TeeStream:
         return any(stream.isatty() for stream in self.streams)
 
 
-def pytest_main_with_output(args: List[str], plugin: T) -> Tuple[str, str, int]:
+def pytest_main_with_output(
+    args: List[str], plugin: T, extra_plugins: Optional[List[Any]] = None
+) -> Tuple[str, str, int]:
     exit_code = 0
     stdout_capture = io.StringIO()
     stderr_capture = io.StringIO()
     stdout_stream = TeeStream(sys.stdout, stdout_capture)
     stderr_stream = TeeStream(sys.stderr, stderr_capture)
     with contextlib.redirect_stdout(stdout_stream), contextlib.redirect_stderr(stderr_stream):  # type: ignore
-        exit_code = pytest.main(args, plugins=[plugin])
+        exit_code = pytest.main(args, plugins=[plugin, *(extra_plugins or [])])
     captured_stdout = stdout_capture.getvalue()
     captured_stderr = stderr_capture.getvalue()
     return captured_stdout, captured_stderr, int(exit_code)
@@ -0,0 +1,447 @@
+import codecs
+import json
+import os
+import signal
+import sys
+import tempfile
+import time
+import traceback
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import IO, Any, Callable, Dict, List, NoReturn, Optional, Set, Tuple
+
+import pytest
+from loguru import logger
+from pytest import Session
+from testsolar_testtool_sdk.model.load import LoadResult
+from testsolar_testtool_sdk.model.test import TestCase
+from testsolar_testtool_sdk.model.testresult import (
+    LogLevel,
+    ResultType,
+    TestCaseLog,
+    TestCaseStep,
+    TestResult,
+)
+from testsolar_testtool_sdk.reporter import BaseReporter
+
+from .converter import normalize_testcase_name
+from .fail_fast import FailFastPolicy
+from .log_policy import configure_logger_after_fork
+from .stream import pytest_main_with_output
+
+try:
+    from pytest import TestReport
+except ImportError:
+    from _pytest.reports import TestReport
+
+# 子进程异常退出时作为崩溃用例日志上报的输出末尾字节数
+CRASH_OUTPUT_TAIL_BYTES = 64 * 1024
+# 默认最多重新启动子进程的次数
+CRASH_MAX_RESTARTS = 10
+
+# 子进程中创建执行插件和其他插件的函数，参数为子进程使用的上报器
+PluginFactory = Callable[[BaseReporter], Tuple[Any, List[Any]]]
+
+
+def check_crash_isolation_enable() -> bool:
+    """
+    检查是否开启崩溃隔离模式，通过 TESTSOLAR_TTP_CRASHISOLATION 配置。
+    """
+    return os.getenv("TESTSOLAR_TTP_CRASHISOLATION", "").lower() in ["1", "true"]
+
+
+def is_crash_isolation_supported() -> bool:
+    """
+    崩溃隔离依赖 fork，Windows 上不可用。
+    """
+    return hasattr(os, "fork")
+
+
+def get_crash_max_restarts() -> int:
+    """
+    获取子进程崩溃后最多重新启动的次数，通过 TESTSOLAR_TTP_CRASHMAXRESTARTS 配置，默认为 10。
+    """
+    value = os.getenv("TESTSOLAR_TTP_CRASHMAXRESTARTS", "")
+    try:
+        max_restarts = int(value) if value else CRASH_MAX_RESTARTS
+    except ValueError:
+        logger.warning(f"Invalid TESTSOLAR_TTP_CRASHMAXRESTARTS {value}, use default")
+        return CRASH_MAX_RESTARTS
+    return max(max_restarts, 0)
+
+
+class RunJournal:
+    """
+    执行日志插件：在子进程中将收集、用例开始、用例结束和会话结束事件逐行写入日志文件，
+    每行写入后立即刷新，子进程崩溃时父进程仍能知道哪些用例已经执行完成。
+
+    配置了提前终止策略时，用例结束事件中同时记录策略的统计状态，父进程据此恢复策略后再启动新的子进程。
+    """
+
+    def __init__(self, path: str, fail_fast: Optional[FailFastPolicy] = None) -> None:
+        self.file: IO[str] = open(path, "a", encoding="utf-8")
+        self.outcomes: Dict[str, ResultType] = {}
+        self.fail_fast = fail_fast
+
+    def write(self, event: Dict[str, Any]) -> None:
+        self.file.write(json.dumps(event) + "\n")
+        self.file.flush()
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_collection_finish(self, session: Session) -> None:
+        self.write({"event": "collected", "nodeids": [it.nodeid for it in session.items]})
+
+    def pytest_runtest_logstart(self, nodeid: str, location: Any) -> None:
+        self.write({"event": "start", "nodeid": nodeid, "time": time.time()})
+
+    def pytest_runtest_logreport(self, report: TestReport) -> None:
+        if report.failed or report.outcome == "rerun":  # type: ignore
+            self.outcomes[report.nodeid] = ResultType.FAILED
+        elif report.skipped and self.outcomes.get(report.nodeid) != ResultType.FAILED:
+            self.outcomes[report.nodeid] = ResultType.IGNORED
+        else:
+            self.outcomes.setdefault(report.nodeid, ResultType.SUCCEED)
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_runtest_logfinish(self, nodeid: str, location: Any) -> None:
+        # 在执行插件记录提前终止策略之后执行，记录的状态包含当前用例
+        result = self.outcomes.pop(nodeid, ResultType.SUCCEED)
+        event: Dict[str, Any] = {"event": "finish", "nodeid": nodeid, "result": result.value}
+        if self.fail_fast:
+            event["fail_fast"] = self.fail_fast.get_state()
+        self.write(event)
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_sessionfinish(self, session: Session, exitstatus: int) -> None:
+        self.write({"event": "sessionfinish"})
+
+
+class JournalReporter(BaseReporter):
+    """
+    包装子进程中的上报器，最终结果上报后记录到执行日志中。
+    """
+
+    def __init__(self, reporter: BaseReporter, journal: RunJournal) -> None:
+        self.reporter = reporter
+        self.journal = journal
+
+    def report_load_result(self, load_result: LoadResult) -> None:
+        self.reporter.report_load_result(load_result)
+
+    def report_case_result(self, case_result: TestResult) -> None:
+        self.reporter.report_case_result(case_result)
+        if case_result.is_final():
+            self.journal.write({"event": "reported", "name": case_result.Test.Name})
+
+
+@dataclass
+class JournalState:
+    collected: Optional[List[str]] = None
+    started: Dict[str, float] = field(default_factory=dict)
+    finished: Dict[str, ResultType] = field(default_factory=dict)
+    reported: Set[str] = field(default_factory=set)
+    session_finished: bool = False
+    # 最后一个执行完成的用例之后提前终止策略的统计状态
+    fail_fast: Optional[Dict[str, Any]] = None
+
+
+def read_journal(path: str) -> JournalState:
+    """
+    读取执行日志，子进程崩溃时最后一行可能不完整，直接忽略。
+
+    Args:
+        path: 执行日志文件路径
+
+    Returns:
+        执行日志中记录的状态
+    """
+    state = JournalState()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                event: Dict[str, Any] = json.loads(line)
+            except ValueError:
+                continue
+            kind = event["event"]
+            if kind == "collected":
+                state.collected = event["nodeids"]
+            elif kind == "start":
+                state.started[event["nodeid"]] = event["time"]
+            elif kind == "finish":
+                state.finished[event["nodeid"]] = ResultType(event["result"])
+                if "fail_fast" in event:
+                    state.fail_fast = event["fail_fast"]
+            elif kind == "reported":
+                state.reported.add(event["name"])
+            elif kind == "sessionfinish":
+                state.session_finished = True
+    return state
+
+
+def report_unreported(
+    report: Callable[[TestResult], None],
+    state: JournalState,
+    testcase_name: Callable[[str], str],
+) -> None:
+    """
+    已经执行完成但还没有上报的用例（例如等待 allure 结果）按执行日志中的结果上报。
+
+    Args:
+        report: 上报用例结果的函数
+        state: 子进程的执行日志状态
+        testcase_name: 将 nodeid 转换为用例名称的函数
+    """
+    for nodeid, result_type in state.finished.items():
+        name = testcase_name(nodeid)
+        if name in state.reported:
+            continue
+        now = datetime.utcnow()
+        report(
+            TestResult(
+                Test=TestCase(Name=name),
+                ResultType=result_type,
+                StartTime=datetime.utcfromtimestamp(state.started.get(nodeid, time.time())),
+                EndTime=now,
+                Message="Test process exited abnormally before the result was reported",
+            )
+        )
+
+
+def describe_exit_status(status: int) -> str:
+    if os.WIFSIGNALED(status):
+        sig = os.WTERMSIG(status)
+        try:
+            return f"signal {signal.Signals(sig).name}"
+        except ValueError:
+            return f"signal {sig}"
+    return f"exit code {os.WEXITSTATUS(status)}"
+
+
+@dataclass
+class SupervisedResult:
+    exit_code: int = 0
+    # 最后一个子进程输出的末尾部分
+    captured_output: str = ""
+    testcase_count: int = 0
+    executed_nodeids: Set[str] = field(default_factory=set)
+    crash_count: int = 0
+
+
+class CrashSupervisor:
+    """
+    崩溃隔离执行：在 fork 出的子进程中执行 pytest，父进程通过执行日志跟踪已经完成的用例。
+
+    子进程异常退出（段错误、os._exit 等）时，将正在执行的用例上报为 FAILED，
+    并附带子进程输出的末尾部分，然后启动新的子进程继续执行剩余的用例。
+
+    提前终止策略的统计状态从执行日志中恢复，崩溃的用例同样计为失败，满足终止条件时不再重新启动子进程。
+    """
+
+    def __init__(
+        self,
+        reporter: BaseReporter,
+        create_plugins: PluginFactory,
+        project_path: str,
+        data_drive_key: Optional[str] = None,
+        max_restarts: int = CRASH_MAX_RESTARTS,
+        tail_bytes: int = CRASH_OUTPUT_TAIL_BYTES,
+        fail_fast: Optional[FailFastPolicy] = None,
+    ) -> None:
+        self.reporter = reporter
+        self.create_plugins = create_plugins
+        self.project_path = project_path
+        self.data_drive_key = data_drive_key
+        self.max_restarts = max_restarts
+        self.tail_bytes = tail_bytes
+        # 与子进程中的执行插件共用的策略对象，fork 后子进程中的修改需要通过执行日志传回
+        self.fail_fast = fail_fast
+
+    def run(self, options: List[str], test_args: List[str]) -> SupervisedResult:
+        """
+        执行用例，子进程崩溃后在新的子进程中继续执行剩余用例。
+
+        Args:
+            options: pytest 选项参数
+            test_args: 用例参数
+
+        Returns:
+            所有子进程的汇总执行结果
+        """
+        result = SupervisedResult()
+        restarts = 0
+        while True:
+            args = options + test_args
+            if (
+                restarts
+                and "--cov-append" not in args
+                and any(it.startswith("--cov=") for it in args)
+            ):
+                # 重启后的子进程追加覆盖率数据，保留之前子进程的覆盖率
+                args = options + ["--cov-append"] + test_args
+            status, state, result.captured_output = self._run_child(args)
+
+            result.testcase_count += len(state.finished)
+            result.executed_nodeids.update(state.finished)
+            crashed = [it for it in state.started if it not in state.finished]
+            self._report_crashed(crashed, state, status, result.captured_output)
+            self._restore_fail_fast(state, crashed)
+
+            if state.session_finished:
+                # 会话正常结束，子进程中派生的进程崩溃的用例已经在上面上报
+                code = os.WEXITSTATUS(status) if os.WIFEXITED(status) else 1
+                result.exit_code = code or (1 if crashed else 0)
+                return result
+
+            result.crash_count += 1
+            result.exit_code = 1
+            logger.error(
+                f"Test process exited abnormally with {describe_exit_status(status)}, "
+                f"crashed testcases: {crashed}"
+            )
+            self._report_unreported(state)
+            if state.collected is None:
+                # 收集阶段崩溃，由调用方将用例选择器上报为失败
+                return result
+
+            remaining = [
+                it for it in state.collected if it not in state.finished and it not in crashed
+            ]
+            if not remaining:
+                return result
+            if self.fail_fast and self.fail_fast.reason:
+                # 与执行插件一致，提前终止后没有执行的用例上报为IGNORED
+                self._report_not_executed(
+                    remaining, f"Not executed: {self.fail_fast.reason}", ResultType.IGNORED
+                )
+                return result
+            if restarts >= self.max_restarts:
+                logger.error(
+                    f"Test process crashed {result.crash_count} times, "
+                    f"{len(remaining)} testcases are not executed"
+                )
+                self._report_not_executed(
+                    remaining,
+                    "Test process crashed too many times, testcase was not executed\n"
+                    + result.captured_output[-1000:],
+                )
+                return result
+            restarts += 1
+            logger.info(f"Restart test process for {len(remaining)} remaining testcases")
+            test_args = [os.path.join(self.project_path, it) for it in remaining]
+
+    def _run_child(self, args: List[str]) -> Tuple[int, JournalState, str]:
+        fd, journal_path = tempfile.mkstemp(prefix="testsolar_journal_", suffix=".jsonl")
+        os.close(fd)
+        try:
+            read_fd, write_fd = os.pipe()
+            sys.stdout.flush()
+            sys.stderr.flush()
+            pid = os.fork()
+            if pid == 0:
+                os.close(read_fd)
+                self._child_main(args, journal_path, write_fd)
+
+            os.close(write_fd)
+            tail = self._tee_output(read_fd)
+            _, status = os.waitpid(pid, 0)
+            return status, read_journal(journal_path), tail
+        finally:
+            os.unlink(journal_path)
+
+    def _tee_output(self, read_fd: int) -> str:
+        """
+        将子进程的输出转发到当前进程的标准输出，并保留末尾部分。
+        """
+        tail = bytearray()
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        with os.fdopen(read_fd, "rb", buffering=0) as f:
+            while True:
+                chunk = f.read(65536)
+                if not chunk:
+                    break
+                sys.stdout.write(decoder.decode(chunk))
+                sys.stdout.flush()
+                tail += chunk
+                del tail[: -self.tail_bytes]
+        return tail.decode("utf-8", errors="replace")
+
+    def _child_main(self, args: List[str], journal_path: str, write_fd: int) -> NoReturn:
+        exit_code = 1
+        try:
+            os.dup2(write_fd, 1)
+            os.dup2(write_fd, 2)
+            os.close(write_fd)
+            sys.stdout = open(1, "w", buffering=1, encoding="utf-8", closefd=False)
+            sys.stderr = open(2, "w", buffering=1, encoding="utf-8", closefd=False)
+            # 日志写入重定向后的标准错误，随子进程输出一起转发并作为崩溃日志
+            configure_logger_after_fork()
+            journal = RunJournal(journal_path, self.fail_fast)
+            plugin, extra_plugins = self.create_plugins(JournalReporter(self.reporter, journal))
+            _, _, exit_code = pytest_main_with_output(
+                args=args, plugin=plugin, extra_plugins=[journal, *extra_plugins]
+            )
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(exit_code)
+
+    def _testcase_name(self, nodeid: str) -> str:
+        return normalize_testcase_name(nodeid, self.data_drive_key)
+
+    def _report_crashed(
+        self, crashed: List[str], state: JournalState, status: int, output: str
+    ) -> None:
+        message = f"Test process exited abnormally with {describe_exit_status(status)}"
+        for nodeid in crashed:
+            start_time = datetime.utcfromtimestamp(state.started[nodeid])
+            end_time = datetime.utcnow()
+            self.reporter.report_case_result(
+                TestResult(
+                    Test=TestCase(Name=self._testcase_name(nodeid)),
+                    ResultType=ResultType.FAILED,
+                    StartTime=start_time,
+                    EndTime=end_time,
+                    Message=message,
+                    Steps=[
+                        TestCaseStep(
+                            Title="Crash",
+                            StartTime=start_time,
+                            EndTime=end_time,
+                            ResultType=ResultType.FAILED,
+                            Logs=[TestCaseLog(Time=end_time, Level=LogLevel.ERROR, Content=output)],
+                        )
+                    ],
+                )
+            )
+
+    def _restore_fail_fast(self, state: JournalState, crashed: List[str]) -> None:
+        """
+        按执行日志恢复提前终止策略的统计状态，并将崩溃的用例计为失败。
+        """
+        if not self.fail_fast:
+            return
+        if state.fail_fast is not None:
+            self.fail_fast.set_state(state.fail_fast)
+        for _ in crashed:
+            self.fail_fast.record(ResultType.FAILED, False)
+
+    def _report_unreported(self, state: JournalState) -> None:
+        report_unreported(self.reporter.report_case_result, state, self._testcase_name)
+
+    def _report_not_executed(
+        self, nodeids: List[str], message: str, result_type: ResultType = ResultType.FAILED
+    ) -> None:
+        for nodeid in nodeids:
+            self.reporter.report_case_result(
+                TestResult(
+                    Test=TestCase(Name=self._testcase_name(nodeid)),
+                    ResultType=result_type,
+                    StartTime=datetime.utcnow(),
+                    EndTime=datetime.utcnow(),
+                    Message=message,
+                )
+            )
@@ -0,0 +1,194 @@
+import contextlib
+import functools
+import json
+import os
+import platform
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Dict, List, TypeVar, cast
+
+import pytest
+from loguru import logger
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# 耗时剖析文件名，写在报告文件旁边
+TIMING_PROFILE_FILE = "testsolar_timing_profile.json"
+
+# 输出的分位数
+TIMING_PERCENTILES = (50, 95, 99)
+
+
+def check_timing_profile_enable() -> bool:
+    """
+    检查是否开启插件耗时剖析，通过 TESTSOLAR_TTP_TIMINGPROFILE 配置。
+    """
+    return os.getenv("TESTSOLAR_TTP_TIMINGPROFILE", "").lower() in ["1", "true"]
+
+
+def get_report_dir(report_path: Path, phase: str) -> Path:
+    """
+    获取存放剖析文件的目录：执行时报告路径是目录，直接使用；加载时报告路径是文件，使用其所在目录。
+
+    Args:
+        report_path: 报告路径
+        phase: 执行阶段，load、run 或 pipeline
+
+    Returns:
+        剖析文件目录
+    """
+    if phase == "load":
+        return report_path.parent
+    return report_path
+
+
+def get_timing_profile_path(report_path: Path, phase: str) -> Path:
+    """
+    获取耗时剖析文件路径，写在报告旁边。
+
+    Args:
+        report_path: 报告路径
+        phase: 执行阶段，load、run 或 pipeline
+
+    Returns:
+        耗时剖析文件路径
+    """
+    return get_report_dir(report_path, phase) / f"{phase}_{TIMING_PROFILE_FILE}"
+
+
+def _percentile(sorted_samples: List[float], percent: int) -> float:
+    # 最近秩法，样本较少时结果仍是真实出现过的耗时
+    index = max(0, -(-len(sorted_samples) * percent // 100) - 1)
+    return sorted_samples[index]
+
+
+class _Measure:
+    __slots__ = ("samples", "start")
+
+    def __init__(self, samples: List[float]) -> None:
+        self.samples = samples
+        self.start = 0.0
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.samples.append(time.perf_counter() - self.start)
+
+
+class TimingRecorder:
+    """
+    记录插件在各个 hook 和辅助函数中的耗时，用于区分 pytest 自身和插件带来的开销。
+
+    hook 的耗时包含其中调用的辅助函数耗时，名称分别以 hook. 和 helper. 开头；
+    pytest.main 记录整个 pytest 会话的耗时，用于计算插件开销占比。
+    """
+
+    def __init__(self) -> None:
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    def measure(self, name: str) -> ContextManager[None]:
+        """
+        返回记录一次耗时的上下文管理器。
+        """
+        return _Measure(self.samples[name])
+
+    def wrap(self, name: str, func: F) -> F:
+        """
+        包装辅助函数，每次调用都记录耗时。
+        """
+        samples = self.samples[name]
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+
+        return cast(F, wrapper)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        汇总各项耗时，时间单位为毫秒。
+        """
+        result: Dict[str, Dict[str, float]] = {}
+        for name, samples in sorted(self.samples.items()):
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            total = sum(ordered)
+            stats: Dict[str, float] = {
+                "count": len(ordered),
+                "total_ms": total * 1000,
+                "mean_ms": total / len(ordered) * 1000,
+            }
+            for percent in TIMING_PERCENTILES:
+                stats[f"p{percent}_ms"] = _percentile(ordered, percent) * 1000
+            stats["max_ms"] = ordered[-1] * 1000
+            result[name] = stats
+        return result
+
+    def write_profile(self, path: Path) -> None:
+        """
+        将耗时汇总写入 JSON 文件。
+
+        Args:
+            path: 耗时剖析文件路径
+        """
+        try:
+            from importlib.metadata import version, PackageNotFoundError
+        except ImportError:  # Python 3.7
+            from importlib_metadata import version, PackageNotFoundError  # type: ignore
+
+        timings = self.summary()
+        hook_total = sum(v["total_ms"] for k, v in timings.items() if k.startswith("hook."))
+        wall_ms = timings.get("pytest.main", {}).get("total_ms", 0.0)
+        try:
+            tool_version = version("testsolar-pytestx")
+        except PackageNotFoundError:
+            tool_version = "unknown"
+        profile = {
+            "created": datetime.now().isoformat(),
+            "tool_version": tool_version,
+            "pytest_version": pytest.__version__,
+            "python_version": platform.python_version(),
+            "wall_ms": wall_ms,
+            "plugin_hook_ms": hook_total,
+            "plugin_overhead_ratio": hook_total / wall_ms if wall_ms > 0 else 0.0,
+            "timings": timings,
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(profile, f, indent=2)
+        logger.info(
+            f"Timing profile written to {path}: plugin hooks took {hook_total:.1f}ms "
+            f"of {wall_ms:.1f}ms pytest wall time"
+        )
+
+
+class NullTimingRecorder(TimingRecorder):
+    """
+    未开启耗时剖析时使用，不记录任何数据，几乎没有额外开销。
+    """
+
+    def measure(self, name: str) -> ContextManager[None]:
+        return contextlib.nullcontext()
+
+    def wrap(self, name: str, func: F) -> F:
+        return func
+
+    def write_profile(self, path: Path) -> None:
+        return
+
+
+def create_timing_recorder() -> TimingRecorder:
+    """
+    按配置创建耗时记录器。
+    """
+    if check_timing_profile_enable():
+        return TimingRecorder()
+    return NullTimingRecorder()
@@ -1,10 +1,17 @@
+import contextlib
 import os
 import shlex
-from typing import List
+from typing import Dict, Iterator, List
 from loguru import logger
 from pathlib import Path
 
-from .extend.coverage_extend import check_coverage_enable, collect_code_packages
+from .extend.coverage_extend import (
+    COVERAGE_CONTEXT_TEST,
+    check_coverage_enable,
+    collect_code_packages,
+    get_coverage_context_mode,
+    select_coverage_core,
+)
 
 
 def append_coverage_args(
@@ -28,7 +35,20 @@ def append_coverage_args(
     if enable_coverage:
         # 自动计算和识别项目中的代码包
         code_package = collect_code_packages(valid_selectors)
-        if code_package:
+        if code_package and get_coverage_context_mode() != COVERAGE_CONTEXT_TEST:
+            # 只跟踪被测代码包，由执行插件在用例边界切换上下文，避免跟踪用例和第三方代码
+            args.extend([f"--cov={it}" for it in code_package])
+            args.append(f"--cov-report=xml:{coverage_file_path}")
+            if is_xdist_enabled(args):
+                # xdist 下用例在子进程中执行，执行插件只运行在主进程中，无法在子进程中切换上下文，
+                # 改为由子进程中的 pytest-cov 按 --cov-context=test 记录上下文。
+                # 必须在启动 pytest 前通过命令行指定，pytest-cov 和 xdist 子进程都只读取命令行参数
+                logger.warning(
+                    "Coverage context mode call/all is not supported with pytest-xdist, "
+                    "fall back to --cov-context=test"
+                )
+                args.append("--cov-context=test")
+        elif code_package:
             # 如果找到了代码包，添加覆盖率相关的参数
             args.extend(
                 [
@@ -44,6 +64,63 @@ def append_coverage_args(
     return code_package
 
 
+def is_xdist_enabled(args: List[str]) -> bool:
+    """
+    检查命令行参数或 TESTSOLAR_TTP_EXTRAARGS 中配置的额外参数是否开启了 pytest-xdist 分布式执行
+
+    Args:
+        args (List[str]): 命令行参数列表
+
+    Returns:
+        bool: 是否开启了分布式执行，`-n 0` 和 `--dist=no` 视为未开启
+    """
+    all_args = list(args) + shlex.split(os.environ.get("TESTSOLAR_TTP_EXTRAARGS", ""))
+    for index, arg in enumerate(all_args):
+        name, sep, value = arg.partition("=")
+        if name in ["-n", "--numprocesses", "--dist"]:
+            if not sep:
+                value = all_args[index + 1] if index + 1 < len(all_args) else ""
+        elif arg.startswith("-n"):
+            # -n4、-nauto 形式
+            value = arg[2:]
+        else:
+            continue
+        if value not in ["0", "no"]:
+            return True
+    return False
+
+
+def get_coverage_environ(code_packages: List[str]) -> Dict[str, str]:
+    """
+    获取执行 pytest 时需要设置的覆盖率环境变量，pytest-cov 启动的 coverage 通过 COVERAGE_CORE 使用选中的内核。
+
+    Args:
+        code_packages (List[str]): 被测代码包列表，为空时不采集覆盖率
+
+    Returns:
+        Dict[str, str]: 环境变量
+    """
+    coverage_core = select_coverage_core() if code_packages else None
+    return {"COVERAGE_CORE": coverage_core} if coverage_core else {}
+
+
+@contextlib.contextmanager
+def scoped_environ(env: Dict[str, str]) -> Iterator[None]:
+    """
+    只在上下文中设置环境变量，退出时恢复原值，避免泄漏到之后启动的重试进程等子进程中。
+    """
+    previous = {key: os.environ.get(key) for key in env}
+    os.environ.update(env)
+    try:
+        yield
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
 def append_extra_args(args: List[str]) -> None:
     """
     将用户配置的额外参数作为命令行数组传递给pytest
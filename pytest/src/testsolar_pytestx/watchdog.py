@@ -0,0 +1,323 @@
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+from types import FrameType
+from types import CodeType
+from typing import Any, Dict, Optional
+
+from loguru import logger
+from pytest import Item, Session
+
+# 会话预算耗尽后，正在执行的用例仍然保留的 teardown 时间，保证 fixture 能够清理
+TIMEOUT_TEARDOWN_GRACE = 30.0
+
+
+class TestTimeoutError(BaseException):
+    """
+    用例超时后在执行用例的线程中抛出。继承 BaseException，避免被用例中的 except Exception 吞掉。
+    """
+
+    __test__ = False
+
+
+def _get_seconds(name: str) -> float:
+    value = os.getenv(name, "")
+    try:
+        seconds = float(value) if value else 0.0
+    except ValueError:
+        logger.warning(f"Invalid {name} {value}, timeout is disabled")
+        return 0.0
+    return max(seconds, 0.0)
+
+
+def get_testcase_timeout() -> float:
+    """
+    获取单个用例的超时时间（秒），通过 TESTSOLAR_TTP_TIMEOUT 配置，0 表示不限制。
+    """
+    return _get_seconds("TESTSOLAR_TTP_TIMEOUT")
+
+
+def get_session_timeout() -> float:
+    """
+    获取整个 pytest 会话的超时时间（秒），通过 TESTSOLAR_TTP_SESSIONTIMEOUT 配置，0 表示不限制。
+    """
+    return _get_seconds("TESTSOLAR_TTP_SESSIONTIMEOUT")
+
+
+_phase_call_code: Optional[CodeType] = None
+
+
+def _get_phase_call_code() -> Optional[CodeType]:
+    global _phase_call_code
+    if _phase_call_code is None:
+        try:
+            from _pytest.runner import CallInfo
+
+            _phase_call_code = CallInfo.from_call.__func__.__code__  # type: ignore[attr-defined]
+        except (ImportError, AttributeError):
+            return None
+    return _phase_call_code
+
+
+def in_phase_call(frame: Optional[FrameType]) -> bool:
+    """
+    判断调用栈是否处于 pytest 执行用例阶段的 CallInfo.from_call 中。
+
+    只有在其中抛出的 TestTimeoutError 才会被记录为该阶段的异常，
+    在 pytest 自身生成报告等逻辑中抛出会中断整个会话。无法判断时按处于阶段中处理。
+    """
+    code = _get_phase_call_code()
+    if code is None:
+        return True
+    while frame is not None:
+        if frame.f_code is code:
+            return True
+        frame = frame.f_back
+    return False
+
+
+def is_trace_active() -> bool:
+    """
+    当前线程是否有跟踪或剖析函数（sys.settrace/sys.setprofile/sys.monitoring），例如开启覆盖率采集时。
+
+    有跟踪函数时向线程异步抛出异常后再清除，解释器会在该线程中空转，因此不再异步抛出。
+    """
+    if sys.gettrace() is not None or sys.getprofile() is not None:
+        return True
+    monitoring = getattr(sys, "monitoring", None)
+    if monitoring is None:
+        return False
+    return any(monitoring.get_tool(tool_id) is not None for tool_id in range(6))
+
+
+def dump_thread_stacks() -> str:
+    """
+    导出当前进程中所有线程的调用栈。
+    """
+    names = {it.ident: it.name for it in threading.enumerate()}
+    blocks = []
+    for ident, frame in sys._current_frames().items():
+        stack = "".join(traceback.format_stack(frame))
+        blocks.append(f"Thread {names.get(ident, 'unknown')} ({ident}):\n{stack}")
+    return "\n".join(blocks)
+
+
+class TimeoutWatchdog:
+    """
+    用例超时看门狗，由执行插件在用例的各个阶段开始时启动计时，阶段结束上报时停止计时。
+
+    在主线程中执行且平台支持 SIGALRM 时使用定时器信号，超时后在信号处理函数中抛出 TestTimeoutError；
+    否则使用整个会话共用的一个后台线程计时，超时后向执行用例的线程异步抛出 TestTimeoutError；
+    执行用例的线程有跟踪函数（例如开启覆盖率采集）时无法可靠地异步抛出，只记录超时信息并将用例置为失败。
+    两种方式都不会为每个用例创建线程。超时时导出所有线程的调用栈，由执行插件写入用例日志并将用例置为失败。
+
+    setup 和 call 阶段共用单个用例的预算，teardown 阶段单独计时，保证超时后仍然能清理 fixture。
+    计时只覆盖各阶段的 CallInfo，阶段结束生成报告前停止计时；超时发生在阶段之外时只记录超时信息，
+    不抛出异常，避免打断 pytest 自身的逻辑。
+    会话预算耗尽时停止执行剩余用例。
+    """
+
+    def __init__(self, testcase_timeout: float, session_timeout: float) -> None:
+        self.testcase_timeout = testcase_timeout
+        self.session_timeout = session_timeout
+        self.session_deadline: Optional[float] = None
+        self.session: Optional[Session] = None
+        # 超时用例的 nodeid 到超时信息和调用栈的映射
+        self.expired: Dict[str, str] = {}
+        self._nodeid = ""
+        self._test_start = 0.0
+        self._previous_handler: Any = None
+        self._signal_installed = False
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._deadline: Optional[float] = None
+        self._target_thread = 0
+        # 只在阶段执行期间（arm 释放锁之后、disarm 开始之前）允许异步抛出，用例线程在 arm/disarm 中时不会抛出
+        self._raisable = False
+        self._tracing = False
+        # 看门狗线程正在判断并异步抛出异常
+        self._delivering = False
+        # 已经异步抛出但还没有在用例线程中实例化的异常
+        self._pending_exc = False
+
+        watchdog = self
+
+        class AsyncTestTimeoutError(TestTimeoutError):
+            """
+            异步抛出的异常在用例线程中实例化时，表示已经抛出，不再需要清除。
+            """
+
+            def __init__(self, *args: Any) -> None:
+                super().__init__(*args)
+                watchdog._pending_exc = False
+
+        self._async_exc_type = AsyncTestTimeoutError
+
+    def start_session(self, session: Session) -> None:
+        self.session = session
+        if self.session_timeout:
+            self.session_deadline = time.monotonic() + self.session_timeout
+        if hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread():
+            previous = signal.getsignal(signal.SIGALRM)
+            if previous in (signal.SIG_DFL, signal.SIG_IGN, None):
+                self._previous_handler = previous
+                signal.signal(signal.SIGALRM, self._on_alarm)
+                self._signal_installed = True
+            else:
+                logger.info("SIGALRM is already handled, use thread based timeout watchdog")
+
+    def start_test(self, nodeid: str) -> None:
+        self._nodeid = nodeid
+        self._test_start = time.monotonic()
+
+    def _phase_deadline(self, when: str) -> Optional[float]:
+        now = time.monotonic()
+        deadlines = []
+        if when == "teardown":
+            if self.testcase_timeout:
+                deadlines.append(now + self.testcase_timeout)
+            if self.session_deadline is not None:
+                deadlines.append(max(self.session_deadline, now + TIMEOUT_TEARDOWN_GRACE))
+        else:
+            if self.testcase_timeout:
+                deadlines.append(self._test_start + self.testcase_timeout)
+            if self.session_deadline is not None:
+                deadlines.append(self.session_deadline)
+        return min(deadlines) if deadlines else None
+
+    def arm(self, item: Item, when: str) -> None:
+        """
+        用例阶段开始时启动计时，预算已经耗尽时立即超时。
+        """
+        deadline = self._phase_deadline(when)
+        if deadline is None:
+            return
+        self.session = item.session
+        if self._signal_installed and threading.current_thread() is threading.main_thread():
+            # setitimer 的时间为 0 时表示取消定时器，预算已经耗尽时使用一个极短的时间
+            signal.setitimer(signal.ITIMER_REAL, max(deadline - time.monotonic(), 1e-6))
+            return
+        self._tracing = is_trace_active()
+        with self._condition:
+            self._deadline = deadline
+            self._target_thread = threading.get_ident()
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._watch, name="testcase-timeout-watchdog", daemon=True
+                )
+                self._thread.start()
+            self._condition.notify()
+        self._raisable = True
+
+    def disarm(self) -> None:
+        if self._signal_installed:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        if self._deadline is None and not self._raisable and not self._pending_exc:
+            return
+        # 获取锁之前停止异步抛出，并清除还没有抛出的异常，异常不会在持有锁时抛出
+        try:
+            self._raisable = False
+            while self._delivering:
+                time.sleep(0.001)
+            if self._pending_exc:
+                self._pending_exc = False
+                self._set_async_exc(None)
+        except TestTimeoutError:
+            # 计时恰好在阶段结束时到期，异常在这里抛出，超时信息已经记录
+            self._pending_exc = False
+        with self._condition:
+            self._deadline = None
+            self._condition.notify()
+
+    def finish_test(self, nodeid: str) -> Optional[str]:
+        """
+        用例结束时获取超时信息，用例没有超时时返回 None。
+        """
+        self.disarm()
+        return self.expired.pop(nodeid, None)
+
+    def close(self) -> None:
+        self.disarm()
+        if self._signal_installed:
+            signal.signal(signal.SIGALRM, self._previous_handler)
+            self._signal_installed = False
+        if self._thread is not None:
+            with self._condition:
+                self._thread = None
+                self._condition.notify()
+
+    def is_session_expired(self) -> bool:
+        """
+        会话预算是否已经耗尽。time.monotonic 在 fork 出的子进程中同样有效，快照模式下父进程也能判断。
+        """
+        return self.session_deadline is not None and time.monotonic() >= self.session_deadline
+
+    def _expire(self) -> str:
+        if self.is_session_expired():
+            message = f"Session exceeded timeout of {self.session_timeout}s"
+            if self.session is not None:
+                self.session.shouldstop = message
+        else:
+            message = f"Testcase exceeded timeout of {self.testcase_timeout}s"
+        logger.error(f"{self._nodeid}: {message}")
+        self.expired[self._nodeid] = f"{message}\n\n{dump_thread_stacks()}"
+        return message
+
+    def _on_alarm(self, signum: int, frame: Optional[FrameType]) -> None:
+        message = self._expire()
+        if in_phase_call(frame):
+            raise TestTimeoutError(message)
+
+    def _watch(self) -> None:
+        while True:
+            with self._condition:
+                if self._thread is not threading.current_thread():
+                    return
+                if self._deadline is None:
+                    self._condition.wait()
+                    continue
+                remaining = self._deadline - time.monotonic()
+                if remaining > 0:
+                    self._condition.wait(remaining)
+                    continue
+                self._deadline = None
+            # 不持有锁导出调用栈，用例线程在 arm/disarm 中不需要等待
+            self._expire()
+            self._raise_in_target()
+
+    def _raise_in_target(self) -> None:
+        if self._tracing:
+            logger.warning(
+                f"{self._nodeid}: trace function is active, mark the testcase failed without raising"
+            )
+            return
+        self._delivering = True
+        try:
+            if self._raisable and in_phase_call(sys._current_frames().get(self._target_thread)):
+                # 只能在执行 Python 字节码时抛出，阻塞在 C 代码中的用例会在返回后抛出
+                self._pending_exc = True
+                self._set_async_exc(self._async_exc_type)
+        finally:
+            self._delivering = False
+
+    def _set_async_exc(self, exc: Any) -> None:
+        # 只有不支持 SIGALRM 的平台或非主线程中才需要，延迟导入以缩短启动耗时
+        import ctypes
+
+        ctypes.pythonapi.PyThreadState_SetAsyncExc(
+            ctypes.c_ulong(self._target_thread), ctypes.py_object(exc) if exc else None
+        )
+
+
+def create_timeout_watchdog() -> Optional[TimeoutWatchdog]:
+    """
+    根据配置创建用例超时看门狗，没有配置超时时间时返回 None。
+    """
+    testcase_timeout = get_testcase_timeout()
+    session_timeout = get_session_timeout()
+    if not testcase_timeout and not session_timeout:
+        return None
+    return TimeoutWatchdog(testcase_timeout, session_timeout)
@@ -0,0 +1,557 @@
+import array
+import errno
+import hashlib
+import importlib
+import json
+import os
+import random
+import select
+import signal
+import socket
+import stat
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, NoReturn, Optional, Tuple
+
+from loguru import logger
+
+# 常驻进程入口脚本，与 load.py/run.py 位于同一目录
+WORKER_SCRIPT = Path(__file__).parent.parent.resolve() / "worker.py"
+
+# 常驻进程空闲多久后自动退出（秒）
+WORKER_IDLE_TIMEOUT = 600.0
+
+# 客户端等待常驻进程启动的最长时间（秒）
+WORKER_START_TIMEOUT = 30.0
+
+# 常驻进程等待客户端发送请求的最长时间（秒）
+WORKER_REQUEST_TIMEOUT = 10.0
+
+# 常驻进程检查新请求和子进程退出的间隔（秒）
+WORKER_POLL_INTERVAL = 0.1
+
+# 客户端断开后，子进程收到 SIGTERM 多久仍未退出时强制结束（秒）
+WORKER_KILL_TIMEOUT = 5.0
+
+# 转交给子进程的客户端标准输入、输出和错误
+WORKER_STDIO_FDS = [0, 1, 2]
+
+# 客户端收到后转发给子进程的信号
+WORKER_FORWARD_SIGNALS = [signal.SIGTERM, signal.SIGINT]
+
+# 默认预先导入的可选依赖，未安装时忽略
+WORKER_OPTIONAL_PRELOAD = ["coverage", "xml.dom.minidom"]
+
+# 请求和响应都是一行 JSON
+_MESSAGE_MAX_BYTES = 16 * 1024 * 1024
+
+WorkerCommand = Callable[[List[str]], None]
+
+
+@dataclass
+class _WorkerJob:
+    # 客户端连接，客户端断开后为 None
+    conn: Optional[socket.socket]
+    started: float
+    # 已发送 SIGTERM 的子进程在该时间之后仍未退出时发送 SIGKILL
+    kill_deadline: Optional[float] = None
+
+
+def check_worker_enable() -> bool:
+    """
+    检查是否开启常驻进程模式，通过 TESTSOLAR_TTP_WORKER 配置。
+    """
+    return os.getenv("TESTSOLAR_TTP_WORKER", "").lower() in ["1", "true"]
+
+
+def is_worker_supported() -> bool:
+    """
+    常驻进程依赖 fork 和 Unix socket，Windows 上不可用。
+    """
+    return hasattr(os, "fork") and hasattr(socket, "AF_UNIX")
+
+
+def get_worker_runtime_dir() -> str:
+    """
+    获取存放常驻进程 socket、锁和日志文件的目录，只有当前用户可以访问。
+
+    优先使用 XDG_RUNTIME_DIR，未设置时使用临时目录下按用户区分的子目录。目录不存在时以 0700 权限创建，
+    已经存在时必须是当前用户所有、不是符号链接且其他用户无权访问，否则抛出 PermissionError，
+    避免其他用户预先创建同名目录后监听 socket 获取请求中的环境变量和标准输入输出。
+    """
+    uid = os.getuid()
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR", "").strip()
+    if runtime_dir and os.path.isdir(runtime_dir):
+        path = os.path.join(runtime_dir, "testsolar_pytestx")
+    else:
+        path = os.path.join(tempfile.gettempdir(), f"testsolar_pytestx_{uid}")
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != uid or info.st_mode & 0o077:
+        raise PermissionError(f"Worker runtime dir {path} is not private to current user")
+    return path
+
+
+def get_worker_socket_path() -> str:
+    """
+    获取常驻进程监听的 Unix socket 路径，通过 TESTSOLAR_TTP_WORKERSOCKET 配置。
+
+    默认路径位于 get_worker_runtime_dir 返回的私有目录中，按 Python 解释器和插件目录区分，
+    插件或解释器变化后会启动新的常驻进程。
+    """
+    socket_path = os.getenv("TESTSOLAR_TTP_WORKERSOCKET", "").strip()
+    if socket_path:
+        return socket_path
+    key = hashlib.sha1(f"{sys.executable}:{sys.version}:{WORKER_SCRIPT}".encode()).hexdigest()
+    return os.path.join(get_worker_runtime_dir(), f"worker_{key[:12]}.sock")
+
+
+def check_peer_uid(conn: socket.socket) -> None:
+    """
+    检查 Unix socket 对端进程是否属于当前用户，不属于时抛出 PermissionError。
+
+    常驻进程和客户端在交换环境变量和文件描述符之前都需要检查。不支持 SO_PEERCRED 的平台上
+    依赖 socket 所在目录的权限限制访问。
+    """
+    if not hasattr(socket, "SO_PEERCRED"):
+        return
+    creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    _, uid, _ = struct.unpack("3i", creds)
+    if uid != os.getuid():
+        raise PermissionError(f"Worker peer uid {uid} does not match current uid {os.getuid()}")
+
+
+def get_worker_idle_timeout() -> float:
+    """
+    获取常驻进程的空闲超时时间（秒），通过 TESTSOLAR_TTP_WORKERIDLETIMEOUT 配置。
+    """
+    value = os.getenv("TESTSOLAR_TTP_WORKERIDLETIMEOUT", "")
+    try:
+        return float(value) if value else WORKER_IDLE_TIMEOUT
+    except ValueError:
+        logger.warning(f"Invalid TESTSOLAR_TTP_WORKERIDLETIMEOUT {value}, use default")
+        return WORKER_IDLE_TIMEOUT
+
+
+def get_worker_preload_modules() -> List[str]:
+    """
+    获取常驻进程启动时额外预先导入的模块，通过 TESTSOLAR_TTP_WORKERPRELOAD 配置，多个模块使用逗号分隔。
+
+    只应配置项目中不会随用例变化的稳定依赖，预先导入的模块在常驻进程退出前不会重新加载。
+    """
+    value = os.getenv("TESTSOLAR_TTP_WORKERPRELOAD", "")
+    return [it.strip() for it in value.split(",") if it.strip()]
+
+
+def _send_message(conn: socket.socket, message: Dict[str, Any], fds: Iterable[int] = ()) -> None:
+    data = json.dumps(message).encode() + b"\n"
+    fd_list = list(fds)
+    if fd_list:
+        ancillary = [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", fd_list))]
+        sent = conn.sendmsg([data], ancillary)
+        data = data[sent:]
+    if data:
+        conn.sendall(data)
+
+
+def _recv_message(conn: socket.socket, max_fds: int = 0) -> Tuple[Dict[str, Any], List[int]]:
+    buffer = b""
+    fds = array.array("i")
+    while not buffer.endswith(b"\n"):
+        if len(buffer) > _MESSAGE_MAX_BYTES:
+            raise ValueError("Worker message is too large")
+        if max_fds and not fds:
+            data, ancdata, _, _ = conn.recvmsg(65536, socket.CMSG_SPACE(max_fds * fds.itemsize))
+            for level, kind, cmsg_data in ancdata:
+                if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+                    fds.frombytes(cmsg_data[: len(cmsg_data) - len(cmsg_data) % fds.itemsize])
+        else:
+            data = conn.recv(65536)
+        if not data:
+            raise ConnectionError("Worker connection closed")
+        buffer += data
+    return json.loads(buffer.decode()), list(fds)
+
+
+def _exit_code_from_status(status: int) -> int:
+    if os.WIFSIGNALED(status):
+        return 128 + os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def preload_modules(extra_modules: Iterable[str] = ()) -> None:
+    """
+    预先导入 pytest 内置插件、通过 pytest11 入口注册的第三方插件、可选依赖和配置的稳定依赖，
+    fork 出的子进程直接复用这些模块。
+
+    Args:
+        extra_modules: 额外预先导入的模块
+    """
+    from _pytest.config import default_plugins
+
+    modules = [f"_pytest.{name}" for name in default_plugins]
+    try:
+        from importlib.metadata import distributions
+    except ImportError:  # Python 3.7
+        from importlib_metadata import distributions  # type: ignore
+
+    for dist in distributions():
+        for entry_point in dist.entry_points:
+            if entry_point.group == "pytest11":
+                modules.append(entry_point.value.split(":")[0].strip())
+
+    for name in modules + list(extra_modules):
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            logger.warning(f"Preload module {name} failed: {e}")
+    for name in WORKER_OPTIONAL_PRELOAD:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+
+def _run_request(
+    request: Dict[str, Any], fds: List[int], commands: Dict[str, WorkerCommand]
+) -> NoReturn:
+    """
+    在 fork 出的子进程中执行一次请求：接管客户端的标准输入输出，恢复客户端的工作目录、环境变量和命令行参数，
+    执行完成后直接退出，不返回常驻进程的主循环。
+    """
+    # 客户端只需要转发请求，延迟导入以缩短客户端启动耗时
+    from .log_policy import configure_logger
+
+    exit_code = 1
+    try:
+        # 子进程及其派生的进程在单独的进程组中，客户端断开时常驻进程结束整个进程组。
+        # 常驻进程没有控制终端，进程组变化不会影响对客户端终端的读写
+        os.setpgid(0, 0)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        for target, fd in zip(WORKER_STDIO_FDS, fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        os.chdir(request["cwd"])
+        os.environ.clear()
+        os.environ.update(request["env"])
+        sys.argv = list(request["args"])
+        # fork 出的子进程共享父进程的随机数状态，重新播种避免每次执行结果相同
+        random.seed()
+        configure_logger()
+
+        commands[request["command"]](sys.argv)
+        exit_code = 0
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            exit_code = e.code or 0
+        else:
+            print(e.code, file=sys.stderr)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        try:
+            logger.remove()
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(exit_code)
+
+
+def _kill_job(pid: int, sig: int) -> None:
+    try:
+        os.killpg(pid, sig)
+    except OSError:
+        pass
+
+
+def _acquire_lock(lock_path: str) -> Optional[int]:
+    import fcntl
+
+    try:
+        # 不跟随符号链接，其他用户预先创建的锁文件无法打开时视为无法获取锁
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+    except OSError as e:
+        logger.warning(f"Open worker lock {lock_path} failed: {e}")
+        return None
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def serve(
+    socket_path: str,
+    commands: Dict[str, WorkerCommand],
+    idle_timeout: Optional[float] = None,
+    preload: Optional[Iterable[str]] = None,
+) -> None:
+    """
+    启动常驻进程：预先导入依赖后监听 Unix socket，为每个请求 fork 一个子进程执行，
+    子进程退出后将退出码返回给客户端。空闲超过 idle_timeout 秒后退出。
+
+    客户端在子进程退出前断开（例如被超时强制结束）时，向子进程所在的进程组发送 SIGTERM，
+    超过 WORKER_KILL_TIMEOUT 秒仍未退出时发送 SIGKILL，避免子进程在没有客户端的情况下继续执行。
+
+    同一个 socket 路径只会有一个常驻进程，已有常驻进程时直接退出。
+
+    Args:
+        socket_path: 监听的 Unix socket 路径
+        commands: 请求命令（load/run/pipeline）到入口函数的映射
+        idle_timeout: 空闲超时时间（秒），为 None 时使用 get_worker_idle_timeout 的结果
+        preload: 额外预先导入的模块，为 None 时使用 get_worker_preload_modules 的结果
+    """
+    if idle_timeout is None:
+        idle_timeout = get_worker_idle_timeout()
+
+    lock_fd = _acquire_lock(socket_path + ".lock")
+    if lock_fd is None:
+        logger.info(f"Worker for {socket_path} is already running or cannot be locked")
+        return
+
+    start = time.perf_counter()
+    preload_modules(get_worker_preload_modules() if preload is None else preload)
+    logger.info(
+        f"Worker preloaded {len(sys.modules)} modules in {time.perf_counter() - start:.2f}s"
+    )
+
+    def handle_sigterm(signum: int, frame: Any) -> None:
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    children: Dict[int, _WorkerJob] = {}
+    try:
+        # socket 文件在 bind 时以 0600 权限创建，不存在其他用户可以连接的时间窗口
+        previous_umask = os.umask(0o177)
+        try:
+            listener.bind(socket_path)
+        finally:
+            os.umask(previous_umask)
+        listener.listen(16)
+        logger.info(f"Worker listening on {socket_path}")
+
+        last_active = time.monotonic()
+        while True:
+            for pid, job in list(children.items()):
+                waited_pid, status = os.waitpid(pid, os.WNOHANG)
+                if waited_pid == 0:
+                    if job.kill_deadline is not None and time.monotonic() > job.kill_deadline:
+                        logger.warning(f"Worker child {pid} did not exit after SIGTERM, kill it")
+                        _kill_job(pid, signal.SIGKILL)
+                        job.kill_deadline = None
+                    continue
+                exit_code = _exit_code_from_status(status)
+                logger.info(
+                    f"Worker child {pid} exited with {exit_code} in "
+                    f"{time.monotonic() - job.started:.2f}s"
+                )
+                if job.conn is not None:
+                    try:
+                        _send_message(job.conn, {"exit_code": exit_code})
+                    except OSError as e:
+                        logger.warning(f"Send exit code of {pid} failed: {e}")
+                    job.conn.close()
+                del children[pid]
+
+            now = time.monotonic()
+            if children:
+                last_active = now
+            elif idle_timeout > 0 and now - last_active > idle_timeout:
+                logger.info(f"Worker idle for {idle_timeout}s, exit")
+                break
+
+            # 请求发送之后客户端不会再发送数据，客户端连接可读说明客户端已经断开
+            job_conns = {job.conn: pid for pid, job in children.items() if job.conn is not None}
+            ready, _, _ = select.select([listener, *job_conns], [], [], WORKER_POLL_INTERVAL)
+            for ready_conn in ready:
+                if ready_conn is listener:
+                    continue
+                pid = job_conns[ready_conn]
+                logger.warning(f"Client of worker child {pid} disconnected, terminate it")
+                ready_conn.close()
+                children[pid].conn = None
+                children[pid].kill_deadline = time.monotonic() + WORKER_KILL_TIMEOUT
+                _kill_job(pid, signal.SIGTERM)
+            if listener not in ready:
+                continue
+            conn, _ = listener.accept()
+            fds: List[int] = []
+            try:
+                check_peer_uid(conn)
+                conn.settimeout(WORKER_REQUEST_TIMEOUT)
+                request, fds = _recv_message(conn, max_fds=len(WORKER_STDIO_FDS))
+                conn.settimeout(None)
+                if request.get("command") not in commands:
+                    raise ValueError(f"Unknown worker command {request.get('command')}")
+                if len(fds) != len(WORKER_STDIO_FDS):
+                    raise ValueError(f"Expect {len(WORKER_STDIO_FDS)} stdio fds, got {len(fds)}")
+            except (OSError, ValueError) as e:
+                # PermissionError 是 OSError 的子类，其他用户的连接同样直接关闭
+                logger.warning(f"Invalid worker request: {e}")
+                for fd in fds:
+                    os.close(fd)
+                conn.close()
+                continue
+
+            sys.stdout.flush()
+            sys.stderr.flush()
+            pid = os.fork()
+            if pid == 0:
+                listener.close()
+                conn.close()
+                _run_request(request, fds, commands)
+            for fd in fds:
+                os.close(fd)
+            try:
+                # 在父进程中同样设置进程组，保证客户端收到 pid 时已经可以向进程组发送信号
+                os.setpgid(pid, pid)
+            except OSError:
+                pass
+            logger.info(f"Worker forked child {pid} for {request['command']} {request['args']}")
+            try:
+                _send_message(conn, {"pid": pid})
+            except OSError as e:
+                logger.warning(f"Send pid of {pid} failed: {e}")
+            children[pid] = _WorkerJob(conn, time.monotonic())
+            last_active = time.monotonic()
+    finally:
+        listener.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        for job in children.values():
+            if job.conn is not None:
+                job.conn.close()
+        os.close(lock_fd)
+
+
+def _connect(socket_path: str) -> Optional[socket.socket]:
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(socket_path)
+    except OSError as e:
+        conn.close()
+        if e.errno in (errno.ENOENT, errno.ECONNREFUSED):
+            return None
+        raise
+    try:
+        check_peer_uid(conn)
+    except OSError:
+        conn.close()
+        raise
+    return conn
+
+
+def start_worker(socket_path: str) -> None:
+    """
+    在后台启动常驻进程，继承当前的工作目录和环境变量，日志写入 socket 路径旁的 .log 文件。
+    """
+    log_fd = os.open(
+        socket_path + ".log", os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_NOFOLLOW, 0o600
+    )
+    with os.fdopen(log_fd, "ab") as log_file:
+        subprocess.Popen(
+            [sys.executable, str(WORKER_SCRIPT), socket_path],
+            stdin=subprocess.DEVNULL,
+            stdout=log_file,
+            stderr=log_file,
+            close_fds=True,
+            start_new_session=True,
+        )
+
+
+def _forward_signals(pid: int) -> Dict[int, Any]:
+    """
+    将当前进程收到的 SIGTERM 和 SIGINT 转发给常驻进程中执行请求的子进程所在的进程组。
+
+    Returns:
+        原来的信号处理函数，请求结束后需要恢复
+    """
+
+    def forward(signum: int, frame: Any) -> None:
+        logger.warning(f"Forward signal {signum} to worker child {pid}")
+        _kill_job(pid, signum)
+
+    previous: Dict[int, Any] = {}
+    for signum in WORKER_FORWARD_SIGNALS:
+        try:
+            previous[signum] = signal.signal(signum, forward)
+        except ValueError:
+            # 只能在主线程中设置信号处理函数，其他线程中由常驻进程在客户端断开时结束子进程
+            break
+    return previous
+
+
+def run_in_worker(command: str, args: List[str]) -> Optional[int]:
+    """
+    将 load/run 请求交给常驻进程执行，常驻进程不存在时先在后台启动。
+
+    子进程直接使用当前进程的标准输入输出，工作目录、环境变量和命令行参数与当前进程一致。
+    等待期间当前进程收到的 SIGTERM 和 SIGINT 会转发给子进程。
+
+    Args:
+        command: 请求命令，load、run 或 pipeline
+        args: 命令行参数
+
+    Returns:
+        子进程的退出码；常驻进程不可用且请求未被执行时返回 None，调用方应在当前进程中执行
+    """
+    if not is_worker_supported():
+        logger.warning("Worker mode requires fork and Unix socket, run in current process")
+        return None
+
+    try:
+        socket_path = get_worker_socket_path()
+        conn = _connect(socket_path)
+        if conn is None:
+            logger.info(f"Start worker on {socket_path}")
+            start_worker(socket_path)
+            deadline = time.monotonic() + WORKER_START_TIMEOUT
+            while conn is None and time.monotonic() < deadline:
+                time.sleep(WORKER_POLL_INTERVAL)
+                conn = _connect(socket_path)
+            if conn is None:
+                raise TimeoutError(f"Worker did not start in {WORKER_START_TIMEOUT}s")
+
+        with conn:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            _send_message(
+                conn,
+                {
+                    "command": command,
+                    "args": args,
+                    "cwd": os.getcwd(),
+                    "env": dict(os.environ),
+                },
+                WORKER_STDIO_FDS,
+            )
+            response, _ = _recv_message(conn)
+            pid = response["pid"]
+            previous_handlers = _forward_signals(pid)
+            try:
+                response, _ = _recv_message(conn)
+                return int(response["exit_code"])
+            except (OSError, ValueError, KeyError) as e:
+                # 请求已经开始执行，不能再回退到当前进程
+                logger.error(f"Lost worker child {pid}: {e}")
+                return 1
+            finally:
+                for signum, handler in previous_handlers.items():
+                    signal.signal(signum, handler)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Worker unavailable, run in current process: {e}")
+        return None
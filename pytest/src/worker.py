@@ -0,0 +1,29 @@
+import sys
+from pathlib import Path
+
+# 将pytestx加入path
+parent = str(Path(__file__).parent.resolve())
+if parent not in sys.path:
+    sys.path.append(parent)
+
+from load import collect_testcases_from_args  # type: ignore[import] # noqa: E402
+from pipeline import load_and_run_testcases_from_args  # type: ignore[import] # noqa: E402
+from run import run_testcases_from_args  # type: ignore[import] # noqa: E402
+from testsolar_pytestx.log_policy import configure_logger  # type: ignore[import] # noqa: E402
+from testsolar_pytestx.worker import serve  # type: ignore[import] # noqa: E402
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        raise SystemExit("Usage: python worker.py <socket_path>")
+
+    # 常驻进程需要 fork，不能使用后台线程写日志
+    configure_logger(enqueue=False)
+    serve(
+        sys.argv[1],
+        {
+            "load": collect_testcases_from_args,
+            "run": run_testcases_from_args,
+            "pipeline": load_and_run_testcases_from_args,
+        },
+    )
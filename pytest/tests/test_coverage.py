@@ -1,15 +1,19 @@
+import importlib.util
 import json
 import logging
 import os
 import shutil
+import subprocess
 import sys
 import tempfile
+import time
 from dataclasses import asdict
 from pathlib import Path
 from unittest.mock import MagicMock
 from xml.dom import minidom
 
 import pytest
+from coverage import CoverageData as CoverageDataFile
 
 from src.testsolar_pytestx.extend.coverage_extend import (
     ProjectPath,
@@ -24,8 +28,25 @@ from src.testsolar_pytestx.extend.coverage_extend import (
     prepare_file_path,
     get_testcase_coverage_data,
     find_coverage_db_path,
+    _scan_coverage_db_path,
     generate_coverage_json_file,
     collect_coverage_report,
+    find_parallel_coverage_files,
+    combine_parallel_coverage_data,
+    context_to_case_name,
+    merge_incremental_coverage_data,
+    get_coverage_context_mode,
+    is_coverage_core_supported,
+    probe_coverage_core,
+    select_coverage_core,
+)
+from src.testsolar_pytestx.executor import PytestExecutor, measure_pytest_main
+from src.testsolar_pytestx.timing import TimingRecorder
+from src.testsolar_pytestx.util import (
+    append_coverage_args,
+    get_coverage_environ,
+    is_xdist_enabled,
+    scoped_environ,
 )
 
 testdata_dir = Path(__file__).parent.parent.absolute().joinpath("testdata/testsolar_coverage")
@@ -255,15 +276,382 @@ class TestCoverageFinder:
         result = find_coverage_db_path(str(testdata_dir), ".coverage_db")
         assert result == Path(testdata_dir) / ".coverage_db"
 
-        # 测试根目录不存在 cov_file，测试使用 .coverage 文件
+        # 测试根目录不存在 cov_file，使用 .coveragerc 中相对于项目路径的 data_file 配置
         test_dir = Path(testdata_dir).parent
         result = find_coverage_db_path(str(test_dir), "")
-        assert result == Path(testdata_dir) / ".coverage"
+        assert result == test_dir / "testsolar_coverage" / ".coverage_db"
 
         test_dir = Path(testdata_dir).parent / "aa"
         result = find_coverage_db_path(str(test_dir), "")
         assert result == Path("")
 
+    def test_find_coverage_db_path_from_env_and_config(self, tmp_path, monkeypatch):
+        db_file = tmp_path / "data" / "cov.db"
+        db_file.parent.mkdir()
+        db_file.touch()
+
+        monkeypatch.setenv("COVERAGE_FILE", "data/cov.db")
+        assert find_coverage_db_path(str(tmp_path), ".coverage") == db_file
+        monkeypatch.delenv("COVERAGE_FILE")
+
+        (tmp_path / "setup.cfg").write_text(f"[coverage:run]\ndata_file = {db_file}\n")
+        assert find_coverage_db_path(str(tmp_path), ".coverage") == db_file
+
+        # 配置中的相对路径按项目路径解析，与当前工作目录无关
+        (tmp_path / "setup.cfg").write_text("[coverage:run]\ndata_file = data/cov.db\n")
+        monkeypatch.chdir(db_file.parent)
+        assert find_coverage_db_path(str(tmp_path), ".coverage") == db_file
+
+    def test_find_coverage_db_path_scan_is_bounded(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(
+            "src.testsolar_pytestx.extend.coverage_extend.tempfile.gettempdir",
+            lambda: str(tmp_path),
+        )
+        proj = tmp_path / "proj"
+        deep_dir = proj / "a" / "b" / "c"
+        deep_dir.mkdir(parents=True)
+        (deep_dir / ".coverage").touch()
+        venv_dir = proj / "node_modules"
+        venv_dir.mkdir()
+        (venv_dir / ".coverage").touch()
+
+        assert find_coverage_db_path(str(proj), "", max_depth=2) == Path("")
+        assert find_coverage_db_path(str(proj), "", max_depth=3) == deep_dir / ".coverage"
+
+        # 扫描结果被缓存，后续阶段无需再次扫描
+        monkeypatch.setattr(
+            "src.testsolar_pytestx.extend.coverage_extend._scan_coverage_db_path",
+            MagicMock(side_effect=AssertionError("should use cached path")),
+        )
+        assert find_coverage_db_path(str(proj), "") == deep_dir / ".coverage"
+
+    def test_find_coverage_db_path_ignores_stale_cache(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(
+            "src.testsolar_pytestx.extend.coverage_extend.tempfile.gettempdir",
+            lambda: str(tmp_path),
+        )
+        proj = tmp_path / "proj"
+        stale_dir = proj / "old"
+        stale_dir.mkdir(parents=True)
+        (stale_dir / ".coverage").touch()
+        assert find_coverage_db_path(str(proj), "") == stale_dir / ".coverage"
+
+        # 之前运行缓存的路径早于本次运行开始时间，重新扫描得到本次运行生成的文件
+        os.utime(stale_dir / ".coverage", (1, 1))
+        build_dir = proj / "build"
+        build_dir.mkdir()
+        (build_dir / ".coverage").touch()
+        assert find_coverage_db_path(str(proj), "") == stale_dir / ".coverage"
+        assert find_coverage_db_path(str(proj), "", since=time.time() - 60) == (
+            build_dir / ".coverage"
+        )
+
+    def test_scan_skips_virtualenv_but_not_generic_dirs(self, tmp_path):
+        proj = tmp_path / "proj"
+        venv_dir = proj / "aa_env"
+        venv_dir.mkdir(parents=True)
+        (venv_dir / "pyvenv.cfg").touch()
+        (venv_dir / ".coverage").touch()
+        assert _scan_coverage_db_path(str(proj), 3, 5.0) is None
+
+        env_dir = proj / "env"
+        env_dir.mkdir()
+        (env_dir / ".coverage").touch()
+        assert _scan_coverage_db_path(str(proj), 3, 5.0) == env_dir / ".coverage"
+
+
+class TestParallelCoverage:
+    def _write_data_file(self, data_dir, suffix, context, lines):
+        data = CoverageDataFile(basename=str(data_dir / ".coverage"), suffix=suffix)
+        data.set_context(context)
+        data.add_lines(lines)
+        data.write()
+
+    def test_combine_parallel_coverage_data(self, tmp_path):
+        self._write_data_file(tmp_path, "host.1.a", "test_a.py::test_one|run", {"/p/m.py": [1, 2]})
+        self._write_data_file(tmp_path, "host.2.b", "test_a.py::test_one|run", {"/p/m.py": [3]})
+        self._write_data_file(tmp_path, "host.3.c", "test_b.py::test_two|run", {"/p/n.py": [5]})
+
+        parallel_files = find_parallel_coverage_files(str(tmp_path), Path(""))
+        assert [it.name for it in parallel_files] == [
+            ".coverage.host.1.a",
+            ".coverage.host.2.b",
+            ".coverage.host.3.c",
+        ]
+
+        combined = combine_parallel_coverage_data(parallel_files, tmp_path / "out" / "combined.db")
+        result = get_testcase_coverage_data(["/p"], combined)
+        assert result == {
+            "test_a.test_one": CoverageData(name="test_a.test_one", files={"/p/m.py": [1, 2, 3]}),
+            "test_b.test_two": CoverageData(name="test_b.test_two", files={"/p/n.py": [5]}),
+        }
+
+    def test_get_testcase_coverage_data_queries_executed_contexts(self, tmp_path, monkeypatch):
+        data = CoverageDataFile(basename=str(tmp_path / ".coverage"))
+        for context, lines in [
+            ("test_a.py::test_one|setup", {"/p/m.py": [1]}),
+            ("test_a.py::test_one|run", {"/p/m.py": [2]}),
+            ("test_a.py::test_one_more|run", {"/p/m.py": [3]}),
+            ("test_b.py::test_two|run", {"/p/n.py": [5]}),
+        ]:
+            data.set_context(context)
+            data.add_lines(lines)
+        data.write()
+
+        queried = []
+        original = CoverageDataFile.set_query_contexts
+
+        def set_query_contexts(self, contexts):
+            queried.append(contexts)
+            original(self, contexts)
+
+        monkeypatch.setattr(CoverageDataFile, "set_query_contexts", set_query_contexts)
+        result = get_testcase_coverage_data(
+            ["/p"], tmp_path / ".coverage", {"test_a.test_one", "test_c.test_none"}
+        )
+        # 在数据库中只查询执行过的用例的上下文，前缀相同的其他用例不受影响
+        assert len(queried) == 1
+        assert result == {
+            "test_a.test_one": CoverageData(name="test_a.test_one", files={"/p/m.py": [1, 2]}),
+        }
+
+        assert get_testcase_coverage_data(["/p"], tmp_path / ".coverage", {"test_c.none"}) == {}
+
+
+class TestIncrementalCoverage:
+    def test_context_to_case_name(self):
+        assert context_to_case_name("uttest/test_add.py::TestAdd::test_one|run") == (
+            "uttest.test_add.TestAdd.test_one"
+        )
+        assert context_to_case_name("test_case4") == "test_case4"
+
+    def test_merge_incremental_coverage_data(self, tmp_path):
+        (tmp_path / "mod.py").write_text("a = 1\n")
+        (tmp_path / "other.py").write_text("b = 1\n")
+        cache_file = tmp_path / "cache" / ".coverage_cache"
+
+        first_run = {
+            "test_a": CoverageData(name="test_a", files={"mod.py": [1]}),
+            "test_b": CoverageData(name="test_b", files={"other.py": [1]}),
+        }
+        result = merge_incremental_coverage_data(
+            first_run, {"test_a", "test_b"}, cache_file, str(tmp_path)
+        )
+        assert result == first_run
+
+        # 只重跑 test_a，test_b 的覆盖率数据来自缓存
+        rerun = {"test_a": CoverageData(name="test_a", files={"mod.py": [1, 2]})}
+        result = merge_incremental_coverage_data(rerun, {"test_a"}, cache_file, str(tmp_path))
+        assert result == {
+            "test_a": CoverageData(name="test_a", files={"mod.py": [1, 2]}),
+            "test_b": CoverageData(name="test_b", files={"other.py": [1]}),
+        }
+
+        # 被测代码变化后缓存失效
+        (tmp_path / "other.py").write_text("b = 2\nc = 3\n")
+        result = merge_incremental_coverage_data({}, set(), cache_file, str(tmp_path))
+        assert result == {"test_a": CoverageData(name="test_a", files={"mod.py": [1, 2]})}
+
+
+class TestCoverageContextMode:
+    def test_get_coverage_context_mode(self, monkeypatch):
+        assert get_coverage_context_mode() == "test"
+        monkeypatch.setenv("TESTSOLAR_TTP_COVERAGECONTEXT", "Call")
+        assert get_coverage_context_mode() == "call"
+        monkeypatch.setenv("TESTSOLAR_TTP_COVERAGECONTEXT", "unknown")
+        assert get_coverage_context_mode() == "test"
+
+    def test_append_coverage_args_with_plugin_context(self, monkeypatch):
+        monkeypatch.setenv("TESTSOLAR_TTP_ENABLECOVERAGE", "1")
+        monkeypatch.setenv("TESTSOLAR_TTP_COVERAGECODEPACKAGES", "pkg_a;pkg_b")
+
+        args = []
+        assert append_coverage_args(args, [], "/report") == ["pkg_a", "pkg_b"]
+        assert "--cov=." in args
+        assert "--cov-context=test" in args
+
+        monkeypatch.setenv("TESTSOLAR_TTP_COVERAGECONTEXT", "call")
+        args = []
+        assert append_coverage_args(args, [], "/report") == ["pkg_a", "pkg_b"]
+        assert args == [
+            "--cov=pkg_a",
+            "--cov=pkg_b",
+            f"--cov-report=xml:{Path('/report') / 'coverage.xml'}",
+        ]
+
+    @pytest.mark.parametrize(
+        "args, extra_args, expected",
+        [
+            ([], "", False),
+            (["-n", "2"], "", True),
+            (["-n4"], "", True),
+            (["-n", "0"], "", False),
+            ([], "--numprocesses=auto", True),
+            ([], "-m 'not slow' --dist load", True),
+            ([], "--dist=no", False),
+        ],
+    )
+    def test_is_xdist_enabled(self, monkeypatch, args, extra_args, expected):
+        monkeypatch.setenv("TESTSOLAR_TTP_EXTRAARGS", extra_args)
+        assert is_xdist_enabled(args) is expected
+
+    def test_xdist_falls_back_to_test_context(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("TESTSOLAR_TTP_ENABLECOVERAGE", "1")
+        monkeypatch.setenv("TESTSOLAR_TTP_COVERAGECODEPACKAGES", "pkg_a")
+        monkeypatch.setenv("TESTSOLAR_TTP_COVERAGECONTEXT", "call")
+        monkeypatch.setenv("TESTSOLAR_TTP_EXTRAARGS", "-n 2")
+
+        # 在启动 pytest 前就通过命令行交给 pytest-cov，xdist 子进程同样按命令行参数记录上下文
+        args = []
+        assert append_coverage_args(args, [], str(tmp_path)) == ["pkg_a"]
+        assert args == [
+            "--cov=pkg_a",
+            f"--cov-report=xml:{tmp_path / 'coverage.xml'}",
+            "--cov-context=test",
+        ]
+
+        (tmp_path / "pkg_a").mkdir()
+        (tmp_path / "pkg_a" / "__init__.py").write_text("def add(a, b):\n    return a + b\n")
+        (tmp_path / "test_a.py").write_text(
+            "from pkg_a import add\n\n\ndef test_add():\n    assert add(1, 2) == 3\n"
+        )
+        if importlib.util.find_spec("xdist"):
+            args.extend(["-n", "2"])
+        # 去掉外层 pytest-cov 传递给子进程的环境变量，避免子进程被外层覆盖率采集
+        env = {key: value for key, value in os.environ.items() if not key.startswith("COV_CORE_")}
+        proc = subprocess.run(
+            [sys.executable, "-m", "pytest", "-p", "no:cacheprovider", *args],
+            cwd=tmp_path,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        assert proc.returncode == 0, proc.stdout.decode()
+
+        data = CoverageDataFile(basename=str(tmp_path / ".coverage"))
+        data.read()
+        assert "test_a.py::test_add|run" in data.measured_contexts()
+
+    @pytest.mark.parametrize(
+        "mode, expected",
+        [
+            ("call", ["", "a.py::test_a|run", "", ""]),
+            ("all", ["a.py::test_a|setup", "a.py::test_a|run", "a.py::test_a|teardown", ""]),
+            (None, []),
+        ],
+    )
+    def test_executor_switch_coverage_context(self, monkeypatch, mode, expected):
+        contexts = []
+        monkeypatch.setattr(
+            "src.testsolar_pytestx.executor.switch_coverage_context", contexts.append
+        )
+        executor = PytestExecutor(reporter=MagicMock(), coverage_context_mode=mode)
+        item = MagicMock(nodeid="a.py::test_a")
+
+        executor.pytest_runtest_logstart(item.nodeid, None)
+        executor.pytest_runtest_setup(item)
+        executor.pytest_runtest_call(item)
+        executor.pytest_runtest_teardown(item)
+        executor.pytest_runtest_logfinish(item.nodeid, None)
+
+        assert contexts == expected
+
+
+class TestCoverageCore:
+    @pytest.fixture(autouse=True)
+    def cache_file(self, monkeypatch, tmp_path):
+        cache_file = tmp_path / "coverage_core.json"
+        monkeypatch.setattr(
+            "src.testsolar_pytestx.extend.coverage_extend.get_coverage_core_cache_file",
+            lambda: cache_file,
+        )
+        return cache_file
+
+    def test_probe_coverage_core(self):
+        # 探测在独立进程中执行，当前进程被 pytest-cov 等跟踪时结果不受影响
+        assert probe_coverage_core("pytrace") is True
+
+    def test_select_coverage_core(self, monkeypatch):
+        assert select_coverage_core() is None
+
+        probe = MagicMock(side_effect=lambda core: core != "sysmon")
+        monkeypatch.setattr(
+            "src.testsolar_pytestx.extend.coverage_extend.probe_coverage_core", probe
+        )
+        monkeypatch.setattr(
+            "src.testsolar_pytestx.extend.coverage_extend.is_coverage_core_available",
+            lambda core: True,
+        )
+
+        # sysmon 不支持按用例记录上下文时，选择下一个开销最低的内核
+        monkeypatch.setenv("TESTSOLAR_TTP_COVERAGECORE", "auto")
+        assert select_coverage_core() == "ctrace"
+
+        monkeypatch.setenv("TESTSOLAR_TTP_COVERAGECORE", "pytrace")
+        assert select_coverage_core() == "pytrace"
+
+        monkeypatch.setenv("TESTSOLAR_TTP_COVERAGECORE", "sysmon")
+        assert select_coverage_core() == "ctrace"
+
+        # 每个内核只探测一次，之后使用缓存的结果
+        assert sorted(call[0][0] for call in probe.call_args_list) == [
+            "ctrace",
+            "pytrace",
+            "sysmon",
+        ]
+
+    def test_coverage_core_probe_cache(self, monkeypatch, cache_file):
+        probe = MagicMock(return_value=True)
+        monkeypatch.setattr(
+            "src.testsolar_pytestx.extend.coverage_extend.probe_coverage_core", probe
+        )
+        assert is_coverage_core_supported("pytrace") is True
+        assert is_coverage_core_supported("pytrace") is True
+        assert probe.call_count == 1
+        assert json.loads(cache_file.read_text()) == {"pytrace": True}
+
+        # 缓存文件损坏时重新探测
+        cache_file.write_text("not json")
+        assert is_coverage_core_supported("pytrace") is True
+        assert probe.call_count == 2
+
+    def test_measure_pytest_main(self, monkeypatch):
+        monkeypatch.delenv("COVERAGE_CORE", raising=False)
+        timing = TimingRecorder()
+        with measure_pytest_main(timing, {"COVERAGE_CORE": "pytrace"}):
+            assert os.environ["COVERAGE_CORE"] == "pytrace"
+        assert "COVERAGE_CORE" not in os.environ
+        # 实际执行耗时按选中的内核单独记录
+        summary = timing.summary()
+        assert summary["pytest.main"]["count"] == 1
+        assert summary["pytest.main.coverage_core.pytrace"]["count"] == 1
+
+        timing = TimingRecorder()
+        with measure_pytest_main(timing, {}):
+            pass
+        assert list(timing.summary()) == ["pytest.main"]
+
+    def test_coverage_core_does_not_leak_into_environ(self, monkeypatch):
+        monkeypatch.setenv("TESTSOLAR_TTP_ENABLECOVERAGE", "1")
+        monkeypatch.setenv("TESTSOLAR_TTP_COVERAGECODEPACKAGES", "pkg_a")
+        monkeypatch.setenv("TESTSOLAR_TTP_COVERAGECORE", "pytrace")
+        monkeypatch.delenv("COVERAGE_CORE", raising=False)
+
+        code_packages = append_coverage_args([], [], "/report")
+        assert "COVERAGE_CORE" not in os.environ
+        env = get_coverage_environ(code_packages)
+        assert env == {"COVERAGE_CORE": "pytrace"}
+
+        # 只在执行 pytest 期间设置，结束后恢复，不会泄漏到之后启动的子进程
+        with scoped_environ(env):
+            assert os.environ["COVERAGE_CORE"] == "pytrace"
+        assert "COVERAGE_CORE" not in os.environ
+
+        monkeypatch.setenv("COVERAGE_CORE", "ctrace")
+        with scoped_environ(env):
+            assert os.environ["COVERAGE_CORE"] == "pytrace"
+        assert os.environ["COVERAGE_CORE"] == "ctrace"
+
 
 class TestGenerateCoverageJsonFile:
     @pytest.fixture
@@ -388,7 +776,7 @@ class TestCollectCoverageReport:
         filter_coverage_xml_packages.assert_called_once_with(
             coverage_file_path, ["package1", "package2"]
         )
-        find_coverage_db_path.assert_called_once_with(proj_path, ".coverage")
+        find_coverage_db_path.assert_called_once_with(proj_path, ".coverage", since=None)
         get_testcase_coverage_data.assert_called_once_with(
             ["package1", "package2"], coverage_db_path
         )
@@ -0,0 +1,156 @@
+import os
+import tempfile
+from pathlib import Path
+from typing import List
+from unittest import mock
+
+from testsolar_testtool_sdk.file_reader import read_file_test_result
+from testsolar_testtool_sdk.model.param import EntryParam
+from testsolar_testtool_sdk.model.test import TestCase
+from testsolar_testtool_sdk.model.testresult import ResultType
+
+from src.testsolar_pytestx.executor import RunMode, run_testcases
+from src.testsolar_pytestx.fail_fast import FailFastPolicy, create_fail_fast_policy
+
+BROKEN_ENV_TESTS = """
+import pytest
+
+
+@pytest.fixture
+def env():
+    raise RuntimeError("database is not reachable")
+
+
+def test_skipped():
+    pytest.skip("not relevant")
+
+
+{}
+"""
+
+
+def _write_project(tmpdir: str, module: str, count: int) -> Path:
+    # 每个用例使用不同的模块名，避免同名模块在同一个进程中重复导入冲突
+    project = Path(tmpdir) / "project"
+    project.mkdir()
+    cases = "\n".join(f"def test_{i}(env):\n    pass\n\n" for i in range(count))
+    (project / f"{module}.py").write_text(BROKEN_ENV_TESTS.format(cases))
+    return project
+
+
+def _read_result(report: str, name: str):
+    return read_file_test_result(Path(report), TestCase(Name=name, Attributes={}))
+
+
+def test_create_fail_fast_policy():
+    assert create_fail_fast_policy() is None
+    with mock.patch.dict(
+        os.environ,
+        {"TESTSOLAR_TTP_FAILFASTFAILURERATE": "1.5", "TESTSOLAR_TTP_FAILFASTWINDOW": "x"},
+    ):
+        policy = create_fail_fast_policy()
+        assert policy is not None
+        assert policy.failure_rate == 1.0
+        assert policy.recent.maxlen == 50
+
+
+def test_policy_max_failures():
+    policy = FailFastPolicy(max_failures=2)
+    assert policy.record(ResultType.FAILED, False) is None
+    assert policy.record(ResultType.SUCCEED, False) is None
+    assert policy.record(ResultType.FAILED, False) == "Aborted after 2 failed testcases"
+    assert policy.record(ResultType.SUCCEED, False) == "Aborted after 2 failed testcases"
+
+
+def test_policy_state():
+    policy = FailFastPolicy(max_failures=2, window=3)
+    policy.record(ResultType.FAILED, True)
+    restored = FailFastPolicy(max_failures=2, window=3)
+    restored.set_state(policy.get_state())
+    assert restored.get_state() == {
+        "failures": 1,
+        "consecutive_setup_errors": 1,
+        "recent": [True],
+        "reason": None,
+    }
+    assert restored.record(ResultType.FAILED, False) == "Aborted after 2 failed testcases"
+
+
+def test_policy_consecutive_setup_errors():
+    policy = FailFastPolicy(max_setup_errors=3)
+    for setup_failed in [True, True, False, True, True]:
+        assert policy.record(ResultType.FAILED, setup_failed) is None
+    # 跳过的用例不会打断连续的setup失败
+    assert policy.record(ResultType.IGNORED, False) is None
+    reason = policy.record(ResultType.FAILED, True)
+    assert reason is not None and "3 consecutive setup errors" in reason
+
+
+def test_policy_failure_rate():
+    policy = FailFastPolicy(failure_rate=0.5, window=4)
+    for result_type in [ResultType.FAILED, ResultType.FAILED, ResultType.SUCCEED]:
+        assert policy.record(result_type, False) is None
+    assert policy.record(ResultType.SUCCEED, False) is not None
+
+
+def test_policy_zero_window_disables_failure_rate():
+    policy = FailFastPolicy(failure_rate=0.5, window=0)
+    assert policy.failure_rate == 0.0
+    for _ in range(10):
+        assert policy.record(ResultType.FAILED, False) is None
+
+    with mock.patch.dict(
+        os.environ,
+        {"TESTSOLAR_TTP_FAILFASTFAILURERATE": "0.5", "TESTSOLAR_TTP_FAILFASTWINDOW": "0"},
+    ):
+        assert create_fail_fast_policy() is None
+
+
+def test_run_testcases_abort_on_setup_errors():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        module = "test_batch_broken_env"
+        project = _write_project(tmpdir, module, 10)
+        entry = EntryParam(
+            TaskId="aa",
+            ProjectPath=str(project),
+            TestSelectors=[f"{module}.py"],
+            FileReportPath=tmpdir,
+        )
+        with mock.patch.dict(os.environ, {"TESTSOLAR_TTP_FAILFASTMAXSETUPERRORS": "3"}):
+            run_testcases(entry)
+
+        assert _read_result(tmpdir, f"{module}.py?test_skipped").ResultType == ResultType.IGNORED
+        for i in range(3):
+            result = _read_result(tmpdir, f"{module}.py?test_{i}")
+            assert result.ResultType == ResultType.FAILED
+        for i in range(3, 10):
+            result = _read_result(tmpdir, f"{module}.py?test_{i}")
+            assert result.ResultType == ResultType.IGNORED
+            assert result.Message.startswith("Not executed: Aborted after 3 consecutive setup")
+
+
+def test_run_testcases_abort_remaining_single_runs():
+    def extra_run(selector: str, project_path: str, args: List[str]) -> str:
+        path, _, name = selector.partition("?")
+        args.append(os.path.join(project_path, f"{path}::{name}"))
+        return ""
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        module = "test_single_broken_env"
+        project = _write_project(tmpdir, module, 5)
+        selectors = [f"{module}.py?test_{i}" for i in range(5)]
+        entry = EntryParam(
+            TaskId="aa",
+            ProjectPath=str(project),
+            TestSelectors=selectors,
+            FileReportPath=tmpdir,
+        )
+        with mock.patch.dict(os.environ, {"TESTSOLAR_TTP_FAILFASTMAXFAILURES": "2"}):
+            run_testcases(entry, run_mode=RunMode.SINGLE, extra_run_function=extra_run)
+
+        for selector in selectors[:2]:
+            assert _read_result(tmpdir, selector).ResultType == ResultType.FAILED
+        for selector in selectors[2:]:
+            result = _read_result(tmpdir, selector)
+            assert result.ResultType == ResultType.IGNORED
+            assert result.Message == "Not executed: Aborted after 2 failed testcases"
@@ -0,0 +1,62 @@
+import importlib
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from src.load import collect_testcases_from_args
+from src.testsolar_pytestx.import_profiler import ImportProfiler
+
+
+def test_import_profiler(tmp_path, monkeypatch):
+    (tmp_path / "slow_pkg").mkdir()
+    (tmp_path / "slow_pkg" / "__init__.py").write_text("from . import inner\n")
+    (tmp_path / "slow_pkg" / "inner.py").write_text("import time\ntime.sleep(0.05)\n")
+    (tmp_path / "outer_mod.py").write_text("import slow_pkg\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    profiler = ImportProfiler()
+    profiler.install()
+    try:
+        with profiler.trigger("test_outer.py"):
+            importlib.import_module("outer_mod")
+        importlib.import_module("json")
+    finally:
+        profiler.uninstall()
+        for name in ("outer_mod", "slow_pkg", "slow_pkg.inner"):
+            sys.modules.pop(name, None)
+
+    records = profiler.records
+    assert set(records) == {"outer_mod", "slow_pkg", "slow_pkg.inner"}
+    inner = records["slow_pkg.inner"]
+    assert inner.self_time >= 0.05
+    assert inner.trigger == "test_outer.py"
+    # 嵌套导入的耗时计入外层模块的累计耗时，但不计入自身耗时
+    assert records["outer_mod"].cumulative >= inner.cumulative
+    assert records["outer_mod"].self_time < inner.self_time
+    assert profiler.trigger_totals()["test_outer.py"] >= 0.05
+    assert "slow_pkg.inner  <- test_outer.py" in profiler.report()
+
+
+def test_collect_testcases_with_import_profile():
+    testdata_dir = str(Path(__file__).parent.parent.absolute().joinpath("testdata"))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        report_file = Path(tmpdir) / "result.json"
+        entry_file = Path(tmpdir) / "entry.json"
+        with open(Path(testdata_dir) / "entry.json", "r") as f:
+            entry_data = json.load(f)
+        entry_data["FileReportPath"] = str(report_file)
+        with open(entry_file, "w") as f:
+            json.dump(entry_data, f)
+
+        with mock.patch.dict(os.environ, {"TESTSOLAR_TTP_IMPORTPROFILE": "1"}):
+            collect_testcases_from_args(args=["load.py", str(entry_file)], workspace=testdata_dir)
+
+        # 收集结束后恢复原始的导入函数
+        assert importlib.import_module.__module__ == "importlib"
+        with open(Path(tmpdir) / "load_testsolar_import_profile.json") as f:
+            profile = json.load(f)
+        assert all(it["module"] and it["trigger"] for it in profile["modules"])
+        assert isinstance(profile["triggers"], dict)
@@ -0,0 +1,69 @@
+import os
+from typing import List
+from unittest import mock
+
+from loguru import logger
+from testsolar_testtool_sdk.model.testresult import ResultType
+
+from src.testsolar_pytestx import log_policy
+from src.testsolar_pytestx.log_policy import (
+    ProgressLogger,
+    configure_logger,
+    configure_logger_after_fork,
+    get_log_level,
+)
+
+
+def test_progress_logger():
+    messages: List[str] = []
+    handler_id = logger.add(lambda msg: messages.append(msg.record["message"]), level="INFO")
+    try:
+        progress = ProgressLogger(every=2, interval=3600)
+        progress.update(ResultType.SUCCEED)
+        assert messages == []
+        progress.update(ResultType.FAILED)
+        assert len(messages) == 1
+        assert messages[0].startswith("Progress: 2 testcases finished (SUCCEED 1, FAILED 1)")
+
+        # 没有新完成的用例时结束不再重复输出
+        progress.finish()
+        assert len(messages) == 1
+        progress.update(ResultType.SUCCEED)
+        progress.finish()
+        assert len(messages) == 2
+        assert messages[1].startswith("Progress: 3 testcases finished (SUCCEED 2, FAILED 1)")
+
+        # 超过时间间隔时即使数量未达到也输出
+        progress = ProgressLogger(every=0, interval=0)
+        progress.update(ResultType.IGNORED)
+        assert messages[-1].startswith("Progress: 1 testcases finished (IGNORED 1)")
+    finally:
+        logger.remove(handler_id)
+
+
+def test_get_log_level():
+    with mock.patch.dict(os.environ, {"TESTSOLAR_TTP_LOGLEVEL": "debug"}):
+        assert get_log_level() == "DEBUG"
+    with mock.patch.dict(os.environ, {"TESTSOLAR_TTP_LOGLEVEL": "verbose"}):
+        assert get_log_level() == "INFO"
+    with mock.patch.dict(os.environ, {"TESTSOLAR_TTP_LOGLEVEL": ""}):
+        assert get_log_level() == "INFO"
+
+
+def test_configure_logger_after_fork():
+    with mock.patch.object(log_policy, "_logger_config", None), mock.patch.object(
+        log_policy, "logger"
+    ) as mock_logger:
+        # 没有调用过 configure_logger 时保留调用方的日志配置
+        configure_logger_after_fork()
+        mock_logger.add.assert_not_called()
+
+        configure_logger("DEBUG")
+        assert mock_logger.add.call_args[1] == {"level": "DEBUG", "enqueue": True}
+        configure_logger_after_fork()
+        assert mock_logger.add.call_args[1] == {"level": "DEBUG", "enqueue": False}
+        assert mock_logger.remove.call_count == 2
+
+        # 已经直接写入时不需要重新配置
+        configure_logger_after_fork()
+        assert mock_logger.add.call_count == 2
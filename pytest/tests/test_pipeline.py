@@ -0,0 +1,44 @@
+import json
+import tempfile
+from pathlib import Path
+
+from testsolar_testtool_sdk.file_reader import read_file_load_result, read_file_test_result
+from testsolar_testtool_sdk.model.test import TestCase
+from testsolar_testtool_sdk.model.testresult import ResultType
+
+from src.pipeline import load_and_run_testcases_from_args
+from src.testsolar_pytestx.pipeline import get_load_result_path
+
+testdata_dir = Path(__file__).parent.parent.absolute() / "testdata"
+
+
+def test_load_and_run_testcases_from_args():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        report_dir = Path(tmpdir) / "report"
+        entry_file = Path(tmpdir) / "entry.json"
+        with open(testdata_dir / "entry.json", "r") as f:
+            entry_data = json.load(f)
+        entry_data["FileReportPath"] = str(report_dir)
+        with open(entry_file, "w") as f:
+            json.dump(entry_data, f)
+
+        load_and_run_testcases_from_args(
+            args=["pipeline.py", str(entry_file)],
+            workspace=str(testdata_dir),
+        )
+
+        re = read_file_load_result(get_load_result_path(report_dir))
+        assert len(re.Tests) == 7
+        assert sorted(it.name for it in re.LoadErrors) == [
+            "errors/test_import_error.py",
+            "errors/test_load_error.py",
+        ]
+
+        for test in re.Tests:
+            result = read_file_test_result(report_dir, TestCase(Name=test.Name, Attributes={}))
+            assert result.ResultType in [ResultType.SUCCEED, ResultType.FAILED]
+        result = read_file_test_result(
+            report_dir, TestCase(Name="test_normal_case.py?test_success", Attributes={})
+        )
+        assert result.ResultType == ResultType.SUCCEED
+        assert result.Test.Attributes["owner"] == "foo"
@@ -0,0 +1,100 @@
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+from testsolar_testtool_sdk.file_reader import read_file_test_result
+from testsolar_testtool_sdk.model.param import EntryParam
+from testsolar_testtool_sdk.model.test import TestCase
+from testsolar_testtool_sdk.model.testresult import ResultType, TestCaseStep, TestResult
+
+from src.testsolar_pytestx.executor import run_testcases
+from src.testsolar_pytestx.rerun import merge_attempts
+
+FLAKY_TESTS = """
+from pathlib import Path
+
+
+def test_ok():
+    pass
+
+
+def test_flaky():
+    marker = Path(__file__).with_name("flaky_ran")
+    if not marker.exists():
+        marker.write_text("1")
+        assert False, "first run fails"
+
+
+def test_broken():
+    assert False, "always fails"
+"""
+
+
+def _result(result_type: ResultType, message: str, title: str) -> TestResult:
+    now = datetime.utcnow()
+    return TestResult(
+        Test=TestCase(Name="test_a.py?test_one"),
+        StartTime=now,
+        EndTime=now,
+        ResultType=result_type,
+        Message=message,
+        Steps=[TestCaseStep(StartTime=now, Title=title, ResultType=result_type)],
+    )
+
+
+def test_merge_attempts():
+    merged = merge_attempts(
+        [
+            _result(ResultType.FAILED, "boom", "Run TestCase"),
+            _result(ResultType.FAILED, "boom again", "Setup"),
+            _result(ResultType.SUCCEED, "", "Run TestCase"),
+        ]
+    )
+    assert merged.ResultType == ResultType.SUCCEED
+    assert merged.Message == "Flaky: passed on attempt 3, first failure: boom"
+    assert [it.Title for it in merged.Steps] == [
+        "Attempt 1: Run TestCase",
+        "Attempt 2: Setup",
+        "Attempt 3: Run TestCase",
+    ]
+
+
+def test_run_testcases_rerun_failed():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project = Path(tmpdir) / "project"
+        project.mkdir()
+        (project / "test_rerun_flaky.py").write_text(FLAKY_TESTS)
+        report = Path(tmpdir) / "report"
+        report.mkdir()
+        entry = EntryParam(
+            TaskId="aa",
+            ProjectPath=str(project),
+            TestSelectors=["test_rerun_flaky.py"],
+            FileReportPath=str(report),
+        )
+        with mock.patch.dict(os.environ, {"TESTSOLAR_TTP_RERUNATTEMPTS": "2"}):
+            run_testcases(entry)
+
+        def read(name: str) -> TestResult:
+            return read_file_test_result(
+                report, TestCase(Name=f"test_rerun_flaky.py?{name}", Attributes={})
+            )
+
+        ok = read("test_ok")
+        assert ok.ResultType == ResultType.SUCCEED
+        assert not any(it.Title.startswith("Attempt") for it in ok.Steps)
+
+        flaky = read("test_flaky")
+        assert flaky.ResultType == ResultType.SUCCEED
+        assert flaky.Message.startswith("Flaky: passed on attempt 2")
+        titles = [it.Title for it in flaky.Steps]
+        assert "Attempt 1: Run TestCase" in titles
+        assert "Attempt 2: Run TestCase" in titles
+        assert not any(it.startswith("Attempt 3") for it in titles)
+
+        broken = read("test_broken")
+        assert broken.ResultType == ResultType.FAILED
+        assert "always fails" in broken.Message
+        assert "Attempt 3: Run TestCase" in [it.Title for it in broken.Steps]
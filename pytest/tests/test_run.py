@@ -1,8 +1,9 @@
 import json
 import os
+import pstats
 import tempfile
 from pathlib import Path
-from unittest import TestCase
+from unittest import TestCase, mock
 
 import dacite.exceptions
 import pytest
@@ -46,6 +47,37 @@ class TestExecuteEntry(TestCase):
             # 由于FileReporter会覆盖，我们只能检查最终状态
             self.assertIn(start.ResultType, [ResultType.RUNNING, ResultType.SUCCEED])
 
+    @mock.patch.dict(os.environ, {"TESTSOLAR_TTP_PROFILE": "1"})
+    def test_run_testcases_from_args_with_profile(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            report_dir = Path(tmpdir)
+
+            entry_file = Path(tmpdir) / "entry.json"
+            with open(Path(self.testdata_dir) / "entry.json", "r") as f:
+                entry_data = json.load(f)
+            entry_data["FileReportPath"] = str(report_dir)
+            with open(entry_file, "w") as f:
+                json.dump(entry_data, f)
+
+            run_testcases_from_args(
+                args=[
+                    "run.py",
+                    str(entry_file),
+                ],
+                workspace=str(self.testdata_dir),
+            )
+
+            # 剖析结果写在报告目录中
+            stats = pstats.Stats(str(report_dir / "run_testsolar_profile.pstats"))
+            self.assertTrue(
+                any(func[2] == "run_testcases" for func in stats.stats)  # type: ignore
+            )
+            collapsed = (report_dir / "run_testsolar_profile.collapsed.txt").read_text()
+            for line in collapsed.splitlines():
+                stack, _, count = line.rpartition(" ")
+                self.assertTrue(stack)
+                self.assertGreater(int(count), 0)
+
     def test_raise_error_when_param_is_invalid(self):
         with self.assertRaises(dacite.exceptions.MissingValueError):
             run_testcases_from_args(
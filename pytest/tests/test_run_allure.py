@@ -1,11 +1,15 @@
 import json
 import os
+import shutil
 import tempfile
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
-from unittest import TestCase
+from unittest import TestCase, mock
 
 import pytest
+from dacite import from_dict
 from testsolar_testtool_sdk.model.test import TestCase as TestSolar_TestCase
 from testsolar_testtool_sdk.model.testresult import (
     TestResult,
@@ -20,6 +24,15 @@ from src.testsolar_pytestx.extend.allure_extend import (
     ResultType,
     Step,
     Attachments,
+    build_allure_name_index,
+    match_allure_testcases,
+    process_allure_results,
+    decode_allure_data,
+    read_allure_attachments,
+    create_allure_results_dir,
+    purge_stale_allure_dirs,
+    get_allure_results_base_dir,
+    AllureData,
 )
 
 
@@ -64,6 +77,98 @@ class TestAllureResults:
             in test_data["test_module.test_case_1"].Steps[-1].Logs[0].Content
         )
 
+    def test_process_allure_results(self, test_data, tmp_path, monkeypatch):
+        test_attachments_path = (
+            Path(__file__).parent.parent.absolute().joinpath("testdata/allure_attachments")
+        )
+        for it in test_attachments_path.iterdir():
+            shutil.copy(it, tmp_path / it.name)
+        shutil.move(str(tmp_path / "results.json"), str(tmp_path / "case1-result.json"))
+
+        processed = process_allure_results(test_data, str(tmp_path), max_workers=2)
+        assert processed == ["case1-result.json"]
+        steps = test_data["test_module.test_case_1"].Steps
+        assert len(steps) == 4
+        assert "This is the content of 创建仓库 attachment." in steps[0].Logs[0].Content
+        assert "This is the content of stdout attachment." in steps[-1].Logs[0].Content
+        assert test_data["test_module.test_case_2"].Steps == []
+
+        # 超出单个用例附件字节上限的内容被截断
+        monkeypatch.setenv("TESTSOLAR_TTP_ALLUREATTACHMENTMAXBYTES", "10")
+        process_allure_results(test_data, str(tmp_path))
+        steps = test_data["test_module.test_case_1"].Steps
+        assert "attachment truncated" in steps[0].Logs[0].Content
+        assert "stdout attachment" not in steps[-1].Logs[0].Content
+
+        # 已经处理过的结果文件不再解析
+        test_data["test_module.test_case_1"].Steps = []
+        assert process_allure_results(test_data, str(tmp_path), skip_files=set(processed)) == []
+        assert test_data["test_module.test_case_1"].Steps == []
+
+    def test_read_allure_attachments(self, tmp_path):
+        (tmp_path / "log.txt").write_bytes(b"HEAD" + b"x" * 100 + b"TAIL")
+        (tmp_path / "screen.png").write_bytes(b"\x89PNG\r\n\x1a\n" + b"\0" * 100)
+        (tmp_path / "dump.bin").write_bytes(b"\0\1\2" * 10)
+        (tmp_path / "other.txt").write_text("other content")
+        allure_data = AllureData(
+            name="test_case_1",
+            status="passed",
+            start=1622547800000,
+            stop=1622547810000,
+            uuid="",
+            historyId="",
+            testCaseId="",
+            fullName="test_module#test_case_1",
+            attachments=[
+                Attachments(name="log", source="log.txt", type="text/plain"),
+                Attachments(name="screen", source="screen.png", type="image/png"),
+                Attachments(name="dump", source="dump.bin", type=""),
+                Attachments(name="other", source="other.txt", type="text/plain"),
+            ],
+        )
+
+        # 单个附件超出上限时保留首尾内容，二进制附件只引用路径
+        contents = read_allure_attachments(allure_data, str(tmp_path), 0, 20)
+        assert contents["log.txt"].startswith("HEAD")
+        assert contents["log.txt"].endswith("TAIL")
+        assert "attachment truncated, 88 bytes omitted" in contents["log.txt"]
+        assert contents["screen.png"] == (
+            f"[binary attachment image/png, 108 bytes: {tmp_path / 'screen.png'}]"
+        )
+        assert contents["dump.bin"].startswith("[binary attachment unknown, 30 bytes")
+        assert contents["other.txt"] == "other content"
+
+        # 二进制附件不占用单个用例的字节预算
+        contents = read_allure_attachments(allure_data, str(tmp_path), 30, 20)
+        assert "attachment truncated, 88 bytes omitted" in contents["log.txt"]
+        assert contents["screen.png"].startswith("[binary attachment image/png")
+        assert contents["other.txt"] == (
+            "other\n...[attachment truncated, 3 bytes omitted]...\nntent"
+        )
+
+        # 二进制附件保存到报告目录中，删除 Allure 结果目录后引用的路径仍然有效
+        binary_dir = tmp_path / "report" / "allure_attachments"
+        contents = read_allure_attachments(allure_data, str(tmp_path), 0, 20, str(binary_dir))
+        assert contents["screen.png"] == (
+            f"[binary attachment image/png, 108 bytes: {binary_dir / 'screen.png'}]"
+        )
+        assert (binary_dir / "screen.png").read_bytes() == (tmp_path / "screen.png").read_bytes()
+        assert (binary_dir / "dump.bin").is_file()
+        assert not (binary_dir / "log.txt").exists()
+
+    def test_decode_allure_data(self):
+        test_attachments_path = (
+            Path(__file__).parent.parent.absolute().joinpath("testdata/allure_attachments")
+        )
+        with open(test_attachments_path / "results.json") as f:
+            data = json.load(f)
+        data["labels"] = [{"name": "suite", "value": "test_module"}]
+
+        # 与 dacite 的解码结果一致，只是不再解码转换时用不到的 labels
+        expected = from_dict(data_class=AllureData, data=data)
+        expected.labels = []
+        assert decode_allure_data(data) == expected
+
     def test_gen_allure_step_info(self):
         steps = [
             Step(
@@ -88,6 +193,104 @@ class TestAllureResults:
         assert result[0].Title == "1: step1"
         assert result[0].ResultType == ResultType.SUCCEED
 
+    def test_gen_allure_step_info_numbering(self):
+        def make_step(name, steps=None):
+            return Step(
+                name=name,
+                status="passed",
+                start=1622547800000,
+                stop=1622547810000,
+                steps=steps or [],
+            )
+
+        children = [make_step(f"child{i}") for i in range(1, 13)]
+        children[1].steps = [make_step("grandchild")]
+        steps = [make_step("step1"), make_step("step2", children)]
+
+        titles = [it.Title for it in gen_allure_step_info(steps, "", max_depth=0)]
+        assert titles[:4] == ["1: step1", "2: step2", "2.1: child1", "2.2: child2"]
+        assert titles[4] == "2.2.1: grandchild"
+        assert titles[-3:] == ["2.10: child10", "2.11: child11", "2.12: child12"]
+
+        # 超出层数限制的子步骤不再展开，只在父步骤中提示
+        result = gen_allure_step_info(steps, "", max_depth=1)
+        assert [it.Title for it in result] == ["1: step1", "2: step2"]
+        assert "13 nested steps omitted" in result[1].Logs[0].Content
+
+    def test_match_allure_testcases(self):
+        index = build_allure_name_index(
+            [
+                "aa/test_a.py?test_one",
+                "aa/test_a.py?test_param/[data0]",
+                "aa/test_a.py?test_param/[data1]",
+                "sub/aa/test_b.py?TestB/test_two",
+                "aa/test_c.py?test_drive→key1",
+                "aa/test_c.py?test_drive→key2",
+            ]
+        )
+
+        assert match_allure_testcases(index, "aa.test_a.test_one", "test_one") == [
+            "aa/test_a.py?test_one"
+        ]
+        # 参数化用例按参数精确匹配
+        assert match_allure_testcases(index, "aa.test_a.test_param", "test_param[data1]") == [
+            "aa/test_a.py?test_param/[data1]"
+        ]
+        # 无法按参数匹配时按基础名称匹配全部参数化用例
+        assert match_allure_testcases(index, "aa.test_a.test_param", "test_param") == [
+            "aa/test_a.py?test_param/[data0]",
+            "aa/test_a.py?test_param/[data1]",
+        ]
+        # Allure fullName 缺少目录前缀时按后缀匹配
+        assert match_allure_testcases(index, "aa.test_b.TestB.test_two", "test_two") == [
+            "sub/aa/test_b.py?TestB/test_two"
+        ]
+        # 数据驱动用例按基础名称查找，再按 Allure name 匹配驱动数据
+        assert match_allure_testcases(index, "aa.test_c.test_drive", "key1") == [
+            "aa/test_c.py?test_drive→key1"
+        ]
+        assert match_allure_testcases(index, "aa.test_a.test_none", "test_none") == []
+
+        # 用例开始时增量加入索引，重复加入不会产生重复的匹配结果
+        index.add("aa/test_a.py?test_new")
+        index.add("aa/test_a.py?test_new")
+        assert match_allure_testcases(index, "aa.test_a.test_new", "test_new") == [
+            "aa/test_a.py?test_new"
+        ]
+
+    def test_purge_stale_allure_dirs(self, tmp_path):
+        current = create_allure_results_dir(str(tmp_path))
+        assert Path(current).name.startswith(f"allure_results_{os.getpid()}_")
+
+        stale = tmp_path / "allure_results_1"
+        fresh = tmp_path / "allure_results_2"
+        other = tmp_path / "other_results"
+        for it in (stale, fresh, other):
+            it.mkdir()
+        past = time.time() - 7200
+        for it in (stale, other, Path(current)):
+            os.utime(it, (past, past))
+
+        removed = purge_stale_allure_dirs([str(tmp_path)], 3600, exclude=[current])
+        assert removed == [str(stale)]
+        assert fresh.exists() and other.exists() and Path(current).exists()
+
+        assert purge_stale_allure_dirs([str(tmp_path)], 0) == []
+
+    def test_create_allure_results_dir_under_own_root(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("TESTSOLAR_TTP_ALLURERESULTSDIR", str(tmp_path))
+        allure_dir = create_allure_results_dir()
+        # 结果目录位于本工具自己的根目录下，清理过期目录时不会触及用户的其他目录
+        assert Path(allure_dir).parent == tmp_path / "testsolar_allure"
+
+    def test_allure_results_base_dir_requires_free_space(self, monkeypatch):
+        monkeypatch.delenv("TESTSOLAR_TTP_ALLURERESULTSDIR", raising=False)
+        monkeypatch.setattr(
+            "src.testsolar_pytestx.extend.allure_extend._has_free_space",
+            lambda path, min_free_bytes: False,
+        )
+        assert get_allure_results_base_dir() == tempfile.gettempdir()
+
     def test_format_allure_time(self):
         timestamp = 1622547800000
         result = format_allure_time(timestamp)
@@ -131,3 +334,77 @@ class TestExecuteEntry(TestCase):
             self.assertEqual(len(stop.Steps), 6)
             self.assertEqual(stop.Steps[0].Title, "1: First step")
             self.assertEqual(stop.Steps[0].ResultType, ResultType.SUCCEED)
+
+    def test_run_testcases_from_args_cleanup_allure_dir(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            report_dir = Path(tmpdir) / "report"
+            results_dir = Path(tmpdir) / "results"
+            report_dir.mkdir()
+
+            entry_file = Path(tmpdir) / "entry.json"
+            with open(Path.joinpath(Path(self.testdata_dir), "allure_entry.json"), "r") as f:
+                entry_data = json.load(f)
+            entry_data["FileReportPath"] = str(report_dir)
+            with open(entry_file, "w") as f:
+                json.dump(entry_data, f)
+
+            with mock.patch.dict(
+                os.environ,
+                {
+                    "TESTSOLAR_TTP_ENABLEALLURE": "1",
+                    "TESTSOLAR_TTP_ALLURERESULTSDIR": str(results_dir),
+                },
+            ):
+                run_testcases_from_args(
+                    args=[
+                        "run.py",
+                        str(entry_file),
+                    ],
+                    workspace=self.testdata_dir,
+                )
+
+            test_case = TestSolar_TestCase(
+                Name="allure/allure_step_test.py?test_step/[data0]", Attributes={}
+            )
+            stop = read_file_test_result(report_dir, test_case)
+            self.assertEqual(len(stop.Steps), 6)
+
+            # 结果处理完成后后台删除本次执行的allure结果目录
+            for thread in threading.enumerate():
+                if thread.name == "allure-cleanup":
+                    thread.join()
+            self.assertEqual(list((results_dir / "testsolar_allure").iterdir()), [])
+
+    @mock.patch.dict(
+        os.environ, {"TESTSOLAR_TTP_ENABLEALLURE": "1", "TESTSOLAR_TTP_ALLURESTREAMING": "1"}
+    )
+    @mock.patch("src.testsolar_pytestx.executor.process_allure_results")
+    def test_run_testcases_from_args_with_streaming(self, process_allure_results):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            report_dir = Path(tmpdir)
+
+            entry_file = Path(tmpdir) / "entry.json"
+            with open(Path.joinpath(Path(self.testdata_dir), "allure_entry.json"), "r") as f:
+                entry_data = json.load(f)
+            entry_data["FileReportPath"] = str(report_dir)
+            with open(entry_file, "w") as f:
+                json.dump(entry_data, f)
+
+            run_testcases_from_args(
+                args=[
+                    "run.py",
+                    str(entry_file),
+                ],
+                workspace=self.testdata_dir,
+            )
+
+            # 全部用例在执行过程中已经上报，会话结束时无需再处理allure结果目录
+            process_allure_results.assert_not_called()
+
+            test_case = TestSolar_TestCase(
+                Name="allure/allure_step_test.py?test_step/[data0]", Attributes={}
+            )
+            stop = read_file_test_result(report_dir, test_case)
+            self.assertEqual(stop.ResultType, ResultType.SUCCEED)
+            self.assertEqual(len(stop.Steps), 6)
+            self.assertEqual(stop.Steps[0].Title, "1: First step")
@@ -0,0 +1,161 @@
+import os
+import tempfile
+from pathlib import Path
+from typing import List
+from unittest import mock
+
+from testsolar_testtool_sdk.file_reader import read_file_test_result
+from testsolar_testtool_sdk.model.param import EntryParam
+from testsolar_testtool_sdk.model.test import TestCase
+from testsolar_testtool_sdk.model.testresult import ResultType
+
+from src.testsolar_pytestx import executor
+from src.testsolar_pytestx.converter import CASE_DRIVE_SEPARATOR, selector_to_pytest
+from src.testsolar_pytestx.executor import RunMode, run_testcases
+from src.testsolar_pytestx.single_session import (
+    SelectorRun,
+    build_session_args,
+    prepare_selector_run,
+)
+
+testdata_dir = Path(__file__).parent.parent.absolute() / "testdata"
+
+
+def extra_run(selector: str, project_path: str, args: List[str]) -> str:
+    case, _, drive_key = selector.partition(CASE_DRIVE_SEPARATOR)
+    args.append(os.path.join(project_path, selector_to_pytest(case)))
+    if case.startswith("aa/"):
+        args.append("-s")
+    return drive_key
+
+
+def test_prepare_selector_run():
+    calls = []
+
+    def recording_extra_run(selector: str, project_path: str, args: List[str]) -> str:
+        calls.append(selector)
+        return extra_run(selector, project_path, args)
+
+    runs = [
+        SelectorRun(selector=it)
+        for it in ["test_a.py?test_one→k1", "aa/test_b.py", "test_a.py?test_two"]
+    ]
+    prepare_selector_run(runs[0], "/proj", ["-v"], recording_extra_run)
+    prepare_selector_run(runs[0], "/proj", ["-v"], recording_extra_run)
+    assert calls == ["test_a.py?test_one→k1"]
+    assert (runs[0].options, runs[0].test_args, runs[0].data_drive_key) == (
+        ["-v"],
+        ["test_a.py::test_one"],
+        "k1",
+    )
+    assert build_session_args(runs, "/proj") == [
+        "-v",
+        "/proj/test_a.py::test_one",
+        "/proj/aa/test_b.py",
+        "/proj/test_a.py::test_two",
+    ]
+
+    prepare_selector_run(runs[1], "/proj", ["-v"], recording_extra_run)
+    assert runs[1].options == ["-v", "-s"]
+    assert runs[1].test_args == ["aa/test_b.py"]
+
+
+def test_run_testcases_single_session():
+    selectors = [
+        "test_normal_case.py?test_success→k1",
+        "test_normal_case.py?test_success→k2",
+        "test_normal_case.py?test_failed",
+        "test_data_drive.py",
+    ]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        entry = EntryParam(
+            TaskId="aa",
+            ProjectPath=str(testdata_dir),
+            TestSelectors=selectors,
+            FileReportPath=tmpdir,
+        )
+        with mock.patch.dict(os.environ, {"TESTSOLAR_TTP_SINGLESESSION": "1"}), mock.patch.object(
+            executor, "pytest_main_with_output", wraps=executor.pytest_main_with_output
+        ) as main:
+            run_testcases(entry, run_mode=RunMode.SINGLE, extra_run_function=extra_run)
+        assert main.call_count == 1
+
+        expected = {
+            "test_normal_case.py?test_success→k1": ResultType.SUCCEED,
+            "test_normal_case.py?test_success→k2": ResultType.SUCCEED,
+            "test_normal_case.py?test_failed": ResultType.FAILED,
+            "test_data_drive.py?test_eval/[2+4-6]": ResultType.SUCCEED,
+            "test_data_drive.py?test_eval/[6*9-42]": ResultType.FAILED,
+        }
+        for name, result_type in expected.items():
+            result = read_file_test_result(Path(tmpdir), TestCase(Name=name, Attributes={}))
+            assert result.ResultType == result_type
+        # 同一个用例连续执行两次时，第二次也会重新执行setup
+        result = read_file_test_result(
+            Path(tmpdir), TestCase(Name="test_normal_case.py?test_success→k2", Attributes={})
+        )
+        assert "this is setup" in result.Steps[0].Logs[0].Content
+
+
+ORDER_TESTS = """
+import os
+
+
+def test_one():
+    with open(os.environ["ORDER_LOG"], "a") as f:
+        f.write("run test_one\\n")
+
+
+def test_two():
+    with open(os.environ["ORDER_LOG"], "a") as f:
+        f.write("run test_two\\n")
+"""
+
+
+def test_run_testcases_single_session_prepares_lazily():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project = Path(tmpdir) / "project"
+        (project / "aa").mkdir(parents=True)
+        (project / "test_lazy_order.py").write_text(ORDER_TESTS)
+        (project / "aa" / "test_lazy_order_s.py").write_text(ORDER_TESTS)
+        order_log = Path(tmpdir) / "order.log"
+
+        def logging_extra_run(selector: str, project_path: str, args: List[str]) -> str:
+            with order_log.open("a") as f:
+                f.write(f"prepare {selector}\n")
+            return extra_run(selector, project_path, args)
+
+        selectors = [
+            "test_lazy_order.py?test_one",
+            "test_lazy_order.py?test_two",
+            "aa/test_lazy_order_s.py?test_one",
+        ]
+        entry = EntryParam(
+            TaskId="aa",
+            ProjectPath=str(project),
+            TestSelectors=selectors,
+            FileReportPath=tmpdir,
+        )
+        env = {"TESTSOLAR_TTP_SINGLESESSION": "1", "ORDER_LOG": str(order_log)}
+        with mock.patch.dict(os.environ, env), mock.patch.object(
+            executor, "pytest_main_with_output", wraps=executor.pytest_main_with_output
+        ) as main:
+            run_testcases(entry, run_mode=RunMode.SINGLE, extra_run_function=logging_extra_run)
+
+        # 每个选择器的 extra_run_function 在执行它的用例前才调用，选项不同的选择器在新的会话中执行
+        assert order_log.read_text().splitlines() == [
+            "prepare test_lazy_order.py?test_one",
+            "run test_one",
+            "prepare test_lazy_order.py?test_two",
+            "run test_two",
+            "prepare aa/test_lazy_order_s.py?test_one",
+            "run test_one",
+        ]
+        assert main.call_count == 2
+        assert main.call_args_list[1][1]["args"][-2:] == [
+            "-s",
+            os.path.join(str(project), "aa/test_lazy_order_s.py::test_one"),
+        ]
+        for selector in selectors:
+            result = read_file_test_result(Path(tmpdir), TestCase(Name=selector, Attributes={}))
+            assert result.ResultType == ResultType.SUCCEED
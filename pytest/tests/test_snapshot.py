@@ -0,0 +1,120 @@
+import os
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from testsolar_testtool_sdk.file_reader import read_file_test_result
+from testsolar_testtool_sdk.model.param import EntryParam
+from testsolar_testtool_sdk.model.test import TestCase
+from testsolar_testtool_sdk.model.testresult import ResultType
+
+from src.testsolar_pytestx.executor import run_testcases
+from src.testsolar_pytestx.snapshot import is_snapshot_supported, split_items_by_selectors
+
+testdata_dir = Path(__file__).parent.parent.absolute() / "testdata"
+
+
+def test_split_items_by_selectors():
+    items = [
+        SimpleNamespace(nodeid=it)
+        for it in [
+            "test_a.py::test_one",
+            "test_a.py::test_two[1]",
+            "test_b.py::TestB::test_three",
+            "sub/test_c.py::test_four",
+            "test_d.py::test_five",
+        ]
+    ]
+    selectors = ["test_a.py?test_two", "test_a.py", "test_b.py?TestB", "sub"]
+
+    batches = split_items_by_selectors(items, selectors, 1)  # type: ignore[arg-type]
+    assert [[it.nodeid for it in batch] for batch in batches] == [
+        ["test_a.py::test_two[1]"],
+        ["test_a.py::test_one"],
+        ["test_b.py::TestB::test_three"],
+        ["sub/test_c.py::test_four"],
+        ["test_d.py::test_five"],
+    ]
+
+    batches = split_items_by_selectors(items, selectors, 3)  # type: ignore[arg-type]
+    assert [len(it) for it in batches] == [3, 1, 1]
+
+
+@pytest.mark.skipif(not is_snapshot_supported(), reason="snapshot requires fork")
+def test_run_testcases_with_snapshot():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        entry = EntryParam(
+            TaskId="aa",
+            ProjectPath=str(testdata_dir),
+            TestSelectors=[
+                "test_normal_case.py?test_success",
+                "test_normal_case.py?test_failed",
+                "test_data_drive.py",
+                "test_skipped.py",
+            ],
+            FileReportPath=tmpdir,
+        )
+        with mock.patch.dict(os.environ, {"TESTSOLAR_TTP_SNAPSHOT": "1"}):
+            run_testcases(entry)
+
+        expected = {
+            "test_normal_case.py?test_success": ResultType.SUCCEED,
+            "test_normal_case.py?test_failed": ResultType.FAILED,
+            "test_data_drive.py?test_eval/[2+4-6]": ResultType.SUCCEED,
+            "test_data_drive.py?test_eval/[6*9-42]": ResultType.FAILED,
+            "test_skipped.py?test_filtered": ResultType.IGNORED,
+        }
+        for name, result_type in expected.items():
+            result = read_file_test_result(Path(tmpdir), TestCase(Name=name, Attributes={}))
+            assert result.ResultType == result_type
+
+
+CRASH_TESTS = """
+import os
+import signal
+
+
+def test_ok():
+    pass
+
+
+def test_crash():
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+def test_after():
+    pass
+"""
+
+
+@pytest.mark.skipif(not is_snapshot_supported(), reason="snapshot requires fork")
+def test_run_testcases_with_snapshot_crashed_batch():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project = Path(tmpdir) / "project"
+        project.mkdir()
+        (project / "test_snapshot_crash.py").write_text(CRASH_TESTS)
+        (project / "test_snapshot_next.py").write_text("def test_next():\n    pass\n")
+        report = Path(tmpdir) / "report"
+        report.mkdir()
+        entry = EntryParam(
+            TaskId="aa",
+            ProjectPath=str(project),
+            TestSelectors=["test_snapshot_crash.py", "test_snapshot_next.py"],
+            FileReportPath=str(report),
+        )
+        with mock.patch.dict(os.environ, {"TESTSOLAR_TTP_SNAPSHOT": "1"}):
+            run_testcases(entry)
+
+        def read(name: str):
+            return read_file_test_result(report, TestCase(Name=name, Attributes={}))
+
+        assert read("test_snapshot_crash.py?test_ok").ResultType == ResultType.SUCCEED
+        for name in ["test_crash", "test_after"]:
+            result = read(f"test_snapshot_crash.py?{name}")
+            assert result.ResultType == ResultType.FAILED
+            assert "signal SIGKILL" in result.Message
+            assert result.Steps[-1].Title == "Crash"
+        # 崩溃后继续执行下一批
+        assert read("test_snapshot_next.py?test_next").ResultType == ResultType.SUCCEED
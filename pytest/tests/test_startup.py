@@ -0,0 +1,62 @@
+import logging
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict
+
+import pytest
+
+src_dir = Path(__file__).parent.parent.resolve() / "src"
+logger = logging.getLogger(__name__)
+
+# 只在开启对应功能时才需要的模块，入口启动时不应导入
+LAZY_MODULES = [
+    "coverage",
+    "xml.dom.minidom",
+    "cProfile",
+    "pstats",
+    "ctypes",
+    "sqlite3",
+    "tomllib",
+    "tomli",
+    "testsolar_pytestx.rerun",
+    "testsolar_pytestx.snapshot",
+    "testsolar_pytestx.supervisor",
+    "testsolar_pytestx.watchdog",
+]
+
+
+def _import_self_times(entry: str) -> Dict[str, int]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {entry}"],
+        cwd=src_dir,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    result: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, module = line[len("import time:") :].split("|")
+        result[module.strip()] = int(self_us)
+    return result
+
+
+def _own_import_time(entry: str, self_times: Dict[str, int]) -> int:
+    return sum(
+        us
+        for module, us in self_times.items()
+        if module == entry or module.startswith("testsolar_pytestx")
+    )
+
+
+@pytest.mark.parametrize("entry", ["run", "load"])
+def test_entry_startup_skips_lazy_modules(entry: str):
+    self_times = _import_self_times(entry)
+
+    for module in LAZY_MODULES:
+        assert module not in self_times
+
+    # 导入耗时受机器负载影响，只记录入口模块自身（不含 pytest、loguru 等第三方依赖）的耗时作为参考
+    logger.info(f"{entry} self import time: {_own_import_time(entry, self_times)}us")
@@ -0,0 +1,132 @@
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+import pytest
+from testsolar_testtool_sdk.file_reader import read_file_test_result
+from testsolar_testtool_sdk.model.param import EntryParam
+from testsolar_testtool_sdk.model.test import TestCase
+from testsolar_testtool_sdk.model.testresult import ResultType
+
+from src.testsolar_pytestx.executor import run_testcases
+from src.testsolar_pytestx.supervisor import is_crash_isolation_supported, read_journal
+
+pytestmark = pytest.mark.skipif(
+    not is_crash_isolation_supported(), reason="crash isolation requires fork"
+)
+
+CRASH_TESTS = """
+import os
+import signal
+
+
+def test_before():
+    pass
+
+
+def test_exit():
+    os._exit(3)
+
+
+def test_middle():
+    pass
+
+
+def test_kill():
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+def test_after():
+    assert False
+"""
+
+
+def _run_crash_project(tmpdir: str, env: dict) -> Path:
+    project = Path(tmpdir) / "project"
+    project.mkdir()
+    (project / "test_crash.py").write_text(CRASH_TESTS)
+    report = Path(tmpdir) / "report"
+    report.mkdir()
+    entry = EntryParam(
+        TaskId="aa",
+        ProjectPath=str(project),
+        TestSelectors=["test_crash.py"],
+        FileReportPath=str(report),
+    )
+    with mock.patch.dict(os.environ, {"TESTSOLAR_TTP_CRASHISOLATION": "1", **env}):
+        run_testcases(entry)
+    return report
+
+
+def _read_result(report: Path, name: str):
+    return read_file_test_result(report, TestCase(Name=f"test_crash.py?{name}", Attributes={}))
+
+
+def test_run_testcases_resume_after_crash():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        report = _run_crash_project(tmpdir, {})
+
+        expected = {
+            "test_before": ResultType.SUCCEED,
+            "test_exit": ResultType.FAILED,
+            "test_middle": ResultType.SUCCEED,
+            "test_kill": ResultType.FAILED,
+            "test_after": ResultType.FAILED,
+        }
+        for name, result_type in expected.items():
+            assert _read_result(report, name).ResultType == result_type
+
+        exited = _read_result(report, "test_exit")
+        assert "exit code 3" in exited.Message
+        assert "test_crash.py::test_exit" in exited.Steps[0].Logs[0].Content
+        assert "SIGKILL" in _read_result(report, "test_kill").Message
+
+
+def test_run_testcases_stop_after_max_restarts():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        report = _run_crash_project(tmpdir, {"TESTSOLAR_TTP_CRASHMAXRESTARTS": "0"})
+
+        assert _read_result(report, "test_before").ResultType == ResultType.SUCCEED
+        assert _read_result(report, "test_exit").ResultType == ResultType.FAILED
+        not_executed = _read_result(report, "test_middle")
+        assert not_executed.ResultType == ResultType.FAILED
+        assert "not executed" in not_executed.Message
+
+
+def test_run_testcases_fail_fast_across_restarts():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        report = _run_crash_project(tmpdir, {"TESTSOLAR_TTP_FAILFASTMAXFAILURES": "2"})
+
+        # 两个崩溃的用例都计入失败数，重启后的子进程沿用之前的统计，达到阈值后不再执行剩余用例
+        assert _read_result(report, "test_exit").ResultType == ResultType.FAILED
+        assert _read_result(report, "test_middle").ResultType == ResultType.SUCCEED
+        assert _read_result(report, "test_kill").ResultType == ResultType.FAILED
+        not_executed = _read_result(report, "test_after")
+        assert not_executed.ResultType == ResultType.IGNORED
+        assert "Aborted after 2 failed testcases" in not_executed.Message
+
+
+def test_read_journal_ignores_truncated_line():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "journal.jsonl"
+        path.write_text(
+            '{"event": "collected", "nodeids": ["a.py::t1", "a.py::t2"]}\n'
+            '{"event": "start", "nodeid": "a.py::t1", "time": 1.0}\n'
+            '{"event": "finish", "nodeid": "a.py::t1", "result": "SUCCEED", '
+            '"fail_fast": {"failures": 0, "consecutive_setup_errors": 0, '
+            '"recent": [false], "reason": null}}\n'
+            '{"event": "start", "nodeid": "a.py::t2", "time": 2.0}\n'
+            '{"event": "fini'
+        )
+        state = read_journal(str(path))
+        assert state.collected == ["a.py::t1", "a.py::t2"]
+        assert state.finished == {"a.py::t1": ResultType.SUCCEED}
+        assert list(state.started) == ["a.py::t1", "a.py::t2"]
+        assert not state.session_finished
+        assert state.fail_fast == {
+            "failures": 0,
+            "consecutive_setup_errors": 0,
+            "recent": [False],
+            "reason": None,
+        }
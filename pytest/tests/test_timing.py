@@ -0,0 +1,78 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from testsolar_testtool_sdk.model.param import EntryParam
+
+from src.testsolar_pytestx.executor import run_testcases
+from src.testsolar_pytestx.timing import (
+    NullTimingRecorder,
+    TimingRecorder,
+    create_timing_recorder,
+    get_timing_profile_path,
+)
+
+
+def test_timing_recorder_summary():
+    recorder = TimingRecorder()
+    recorder.samples["hook.a"].extend([i / 1000 for i in range(1, 101)])
+    with recorder.measure("hook.b"):
+        pass
+    wrapped = recorder.wrap("helper.c", lambda x: x + 1)
+    assert wrapped(1) == 2
+
+    summary = recorder.summary()
+    assert summary["hook.a"]["count"] == 100
+    assert round(summary["hook.a"]["p50_ms"]) == 50
+    assert round(summary["hook.a"]["p95_ms"]) == 95
+    assert round(summary["hook.a"]["p99_ms"]) == 99
+    assert round(summary["hook.a"]["max_ms"]) == 100
+    assert summary["hook.b"]["count"] == 1
+    assert summary["helper.c"]["count"] == 1
+
+
+def test_null_timing_recorder():
+    with mock.patch.dict(os.environ, {"TESTSOLAR_TTP_TIMINGPROFILE": ""}):
+        recorder = create_timing_recorder()
+    assert isinstance(recorder, NullTimingRecorder)
+
+    def func() -> None:
+        pass
+
+    assert recorder.wrap("helper.func", func) is func
+    with recorder.measure("hook.a"):
+        pass
+    assert recorder.summary() == {}
+
+
+def test_get_timing_profile_path():
+    assert get_timing_profile_path(Path("/report"), "run") == Path(
+        "/report/run_testsolar_timing_profile.json"
+    )
+    assert get_timing_profile_path(Path("/report/result.json"), "load") == Path(
+        "/report/load_testsolar_timing_profile.json"
+    )
+
+
+@mock.patch.dict(os.environ, {"TESTSOLAR_TTP_TIMINGPROFILE": "1"})
+def test_run_testcases_with_timing_profile():
+    testdata_dir = Path(__file__).parent.parent.absolute().joinpath("testdata")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        entry = EntryParam(
+            TaskId="aa",
+            ProjectPath=str(testdata_dir),
+            TestSelectors=["test_normal_case.py?name=test_success"],
+            FileReportPath=tmpdir,
+        )
+        run_testcases(entry)
+
+        with open(Path(tmpdir) / "run_testsolar_timing_profile.json") as f:
+            profile = json.load(f)
+        assert profile["wall_ms"] > profile["plugin_hook_ms"] > 0
+        timings = profile["timings"]
+        assert timings["hook.pytest_runtest_logstart"]["count"] == 1
+        assert timings["hook.pytest_runtest_logreport"]["count"] == 3
+        assert timings["helper.gen_logs"]["count"] == 3
+        assert "p99_ms" in timings["helper.report_case_result"]
@@ -0,0 +1,193 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+from unittest import mock
+
+import pytest
+from _pytest.runner import CallInfo
+from testsolar_testtool_sdk.file_reader import read_file_test_result
+from testsolar_testtool_sdk.model.param import EntryParam
+from testsolar_testtool_sdk.model.test import TestCase
+from testsolar_testtool_sdk.model.testresult import ResultType
+
+from src.testsolar_pytestx.executor import run_testcases
+from src.testsolar_pytestx.watchdog import (
+    TestTimeoutError,
+    TimeoutWatchdog,
+    create_timeout_watchdog,
+    is_trace_active,
+)
+
+HANG_TESTS = """
+import time
+
+
+def test_fast():
+    pass
+
+
+def test_hang():
+    time.sleep(30)
+
+
+def test_swallow():
+    try:
+        time.sleep(30)
+    except Exception:
+        pass
+
+
+def test_after():
+    pass
+"""
+
+
+def _run_hang_project(tmpdir: str, module: str, env: dict) -> Path:
+    # 每个用例使用不同的模块名，避免同名模块在同一个进程中重复导入冲突
+    project = Path(tmpdir) / "project"
+    project.mkdir()
+    (project / f"{module}.py").write_text(HANG_TESTS)
+    report = Path(tmpdir) / "report"
+    report.mkdir()
+    entry = EntryParam(
+        TaskId="aa",
+        ProjectPath=str(project),
+        TestSelectors=[f"{module}.py"],
+        FileReportPath=str(report),
+    )
+    with mock.patch.dict(os.environ, env):
+        run_testcases(entry)
+    return report
+
+
+def _read_result(report: Path, module: str, name: str):
+    return read_file_test_result(report, TestCase(Name=f"{module}.py?{name}", Attributes={}))
+
+
+def test_create_timeout_watchdog():
+    with mock.patch.dict(os.environ, {"TESTSOLAR_TTP_TIMEOUT": "0"}):
+        assert create_timeout_watchdog() is None
+    with mock.patch.dict(os.environ, {"TESTSOLAR_TTP_TIMEOUT": "abc"}):
+        assert create_timeout_watchdog() is None
+    with mock.patch.dict(os.environ, {"TESTSOLAR_TTP_SESSIONTIMEOUT": "60"}):
+        watchdog = create_timeout_watchdog()
+        assert watchdog is not None
+        assert watchdog.testcase_timeout == 0
+        assert watchdog.session_timeout == 60
+
+
+@pytest.mark.skipif(not hasattr(__import__("signal"), "setitimer"), reason="requires SIGALRM")
+def test_run_testcases_with_testcase_timeout():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        module = "test_testcase_timeout"
+        report = _run_hang_project(tmpdir, module, {"TESTSOLAR_TTP_TIMEOUT": "0.5"})
+
+        assert _read_result(report, module, "test_fast").ResultType == ResultType.SUCCEED
+        assert _read_result(report, module, "test_after").ResultType == ResultType.SUCCEED
+        for name in ["test_hang", "test_swallow"]:
+            result = _read_result(report, module, name)
+            assert result.ResultType == ResultType.FAILED
+            assert result.Message == "Testcase exceeded timeout of 0.5s"
+            timeout_step = result.Steps[-1]
+            assert timeout_step.Title == "Timeout"
+            assert "Thread MainThread" in timeout_step.Logs[0].Content
+            assert f"in {name}" in timeout_step.Logs[0].Content
+
+
+@pytest.mark.skipif(not hasattr(__import__("signal"), "setitimer"), reason="requires SIGALRM")
+def test_run_testcases_with_session_timeout():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        module = "test_session_timeout"
+        report = _run_hang_project(tmpdir, module, {"TESTSOLAR_TTP_SESSIONTIMEOUT": "1"})
+
+        assert _read_result(report, module, "test_fast").ResultType == ResultType.SUCCEED
+        hang = _read_result(report, module, "test_hang")
+        assert hang.ResultType == ResultType.FAILED
+        assert hang.Message == "Session exceeded timeout of 1.0s"
+        for name in ["test_swallow", "test_after"]:
+            result = _read_result(report, module, name)
+            assert result.ResultType == ResultType.IGNORED
+            assert "session exceeded timeout" in result.Message
+
+
+def _run_thread_based_watchdog(loop_seconds: float, trace: Any = None) -> dict:
+    watchdog = TimeoutWatchdog(testcase_timeout=0.2, session_timeout=0)
+    item = SimpleNamespace(session=SimpleNamespace(shouldstop=False))
+    outcome = {}
+
+    def run() -> None:
+        if trace is not None:
+            sys.settrace(trace)
+        outcome["tracing"] = is_trace_active()
+        watchdog.start_session(item.session)  # type: ignore[arg-type]
+        watchdog.start_test("test_a.py::test_loop")
+
+        def test_loop() -> None:
+            watchdog.arm(item, "call")  # type: ignore[arg-type]
+            deadline = time.monotonic() + loop_seconds
+            while time.monotonic() < deadline:
+                pass
+
+        call = CallInfo.from_call(test_loop, "call")
+        outcome["raised"] = call.excinfo is not None and call.excinfo.errisinstance(
+            TestTimeoutError
+        )
+        outcome["log"] = watchdog.finish_test("test_a.py::test_loop")
+        watchdog.close()
+        sys.settrace(None)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join(timeout=20)
+    assert not thread.is_alive()
+    assert outcome["log"].startswith("Testcase exceeded timeout of 0.2s")
+    assert "in test_loop" in outcome["log"]
+    assert not item.session.shouldstop
+    return outcome
+
+
+def test_thread_based_watchdog():
+    outcome = _run_thread_based_watchdog(3)
+    # 运行在覆盖率等跟踪函数下时不异步抛出，只记录超时信息
+    assert outcome["raised"] != outcome["tracing"]
+
+
+def test_thread_based_watchdog_under_tracer():
+    def trace(frame: Any, event: str, arg: Any) -> Any:
+        return trace
+
+    # 有跟踪函数时异步抛出后清除会使用例线程空转，只记录超时信息，用例执行完成后正常结束
+    outcome = _run_thread_based_watchdog(1, trace)
+    assert outcome["tracing"]
+    assert not outcome["raised"]
+
+
+def test_timeout_outside_phase_is_not_raised():
+    watchdog = TimeoutWatchdog(testcase_timeout=0.2, session_timeout=0)
+    item = SimpleNamespace(session=SimpleNamespace(shouldstop=False))
+    outcome = {}
+
+    def run() -> None:
+        # 新线程的调用栈中没有 CallInfo，模拟计时在阶段之外（例如生成报告时）到期
+        watchdog.start_session(item.session)  # type: ignore[arg-type]
+        watchdog.start_test("test_a.py::test_report")
+        watchdog.arm(item, "call")  # type: ignore[arg-type]
+        try:
+            deadline = time.monotonic() + 1
+            while time.monotonic() < deadline:
+                pass
+        except TestTimeoutError:
+            outcome["raised"] = True
+        outcome["log"] = watchdog.finish_test("test_a.py::test_report")
+        watchdog.close()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join(timeout=10)
+    assert "raised" not in outcome
+    assert outcome["log"].startswith("Testcase exceeded timeout of 0.2s")
@@ -0,0 +1,180 @@
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List
+from unittest import mock
+
+import pytest
+from testsolar_testtool_sdk.file_reader import read_file_load_result
+
+from src.testsolar_pytestx.worker import (
+    WORKER_SCRIPT,
+    _acquire_lock,
+    check_peer_uid,
+    get_worker_preload_modules,
+    get_worker_runtime_dir,
+    is_worker_supported,
+    run_in_worker,
+    serve,
+)
+
+testdata_dir = Path(__file__).parent.parent.absolute() / "testdata"
+
+pytestmark = pytest.mark.skipif(not is_worker_supported(), reason="worker requires fork")
+
+
+def test_get_worker_preload_modules():
+    with mock.patch.dict(os.environ, {"TESTSOLAR_TTP_WORKERPRELOAD": " requests, ,yaml "}):
+        assert get_worker_preload_modules() == ["requests", "yaml"]
+
+
+def test_get_worker_runtime_dir(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    monkeypatch.delenv("TESTSOLAR_TTP_WORKERSOCKET", raising=False)
+    runtime_dir = get_worker_runtime_dir()
+    assert runtime_dir == str(tmp_path / "testsolar_pytestx")
+    assert stat.S_IMODE(os.stat(runtime_dir).st_mode) == 0o700
+
+    # 其他用户可以访问的目录不能存放 socket，回退为在当前进程中执行
+    os.chmod(runtime_dir, 0o755)
+    with pytest.raises(PermissionError):
+        get_worker_runtime_dir()
+    assert run_in_worker("load", ["load.py", "entry.json"]) is None
+
+
+@pytest.mark.skipif(not hasattr(socket, "SO_PEERCRED"), reason="requires SO_PEERCRED")
+def test_check_peer_uid():
+    left, right = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+    with left, right:
+        check_peer_uid(left)
+        with mock.patch("os.getuid", return_value=os.getuid() + 1):
+            with pytest.raises(PermissionError):
+                check_peer_uid(left)
+
+
+def test_acquire_lock_does_not_follow_symlink(tmp_path):
+    target = tmp_path / "target"
+    target.write_text("")
+    lock_path = tmp_path / "worker.sock.lock"
+    lock_path.symlink_to(target)
+    assert _acquire_lock(str(lock_path)) is None
+
+    fd = _acquire_lock(str(tmp_path / "other.sock.lock"))
+    assert fd is not None
+    # 同一个锁只能被获取一次
+    assert _acquire_lock(str(tmp_path / "other.sock.lock")) is None
+    os.close(fd)
+
+
+def test_run_in_worker_fallback_when_worker_cannot_start():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        socket_path = str(Path(tmpdir) / "missing" / "worker.sock")
+        with mock.patch.dict(os.environ, {"TESTSOLAR_TTP_WORKERSOCKET": socket_path}):
+            assert run_in_worker("load", ["load.py", "entry.json"]) is None
+
+
+def test_run_in_worker():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        socket_path = str(Path(tmpdir) / "worker.sock")
+        report_file = Path(tmpdir) / "result.json"
+        entry_file = Path(tmpdir) / "entry.json"
+        with open(testdata_dir / "entry.json", "r") as f:
+            entry_data = json.load(f)
+        entry_data["ProjectPath"] = str(testdata_dir)
+        entry_data["FileReportPath"] = str(report_file)
+        with open(entry_file, "w") as f:
+            json.dump(entry_data, f)
+
+        worker = subprocess.Popen(
+            [sys.executable, str(WORKER_SCRIPT), socket_path],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            deadline = time.monotonic() + 30
+            while not os.path.exists(socket_path) and time.monotonic() < deadline:
+                time.sleep(0.1)
+
+            with mock.patch.dict(os.environ, {"TESTSOLAR_TTP_WORKERSOCKET": socket_path}):
+                assert run_in_worker("load", ["load.py", str(entry_file)]) == 0
+                assert run_in_worker("load", ["load.py"]) == 1
+
+            re = read_file_load_result(report_file)
+            assert len(re.Tests) == 7
+        finally:
+            worker.terminate()
+            worker.wait(timeout=10)
+        assert not os.path.exists(socket_path)
+
+
+def _sleep_command(args: List[str]) -> None:
+    Path(args[1]).write_text(str(os.getpid()))
+    time.sleep(60)
+
+
+CLIENT_SCRIPT = """
+import sys
+from src.testsolar_pytestx.worker import run_in_worker
+
+sys.exit(run_in_worker("sleep", ["sleep", sys.argv[1]]))
+"""
+
+
+def _wait_for(predicate: Callable[[], bool], timeout: float = 10) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def test_worker_job_does_not_outlive_client():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        socket_path = str(Path(tmpdir) / "worker.sock")
+        worker = multiprocessing.get_context("fork").Process(
+            target=serve, args=(socket_path, {"sleep": _sleep_command}, 0, [])
+        )
+        worker.start()
+        try:
+            assert _wait_for(lambda: os.path.exists(socket_path), 30)
+            assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+            env = dict(os.environ, TESTSOLAR_TTP_WORKERSOCKET=socket_path)
+            project_dir = Path(__file__).parent.parent
+
+            for client_signal, expected_code in [
+                # 客户端收到 SIGTERM 时转发给子进程，并返回子进程的退出码
+                (signal.SIGTERM, 128 + signal.SIGTERM),
+                # 客户端被强制结束时，常驻进程在连接断开后结束子进程
+                (signal.SIGKILL, -signal.SIGKILL),
+            ]:
+                pid_file = Path(tmpdir) / f"job_{client_signal}.pid"
+                client = subprocess.Popen(
+                    [sys.executable, "-c", CLIENT_SCRIPT, str(pid_file)],
+                    cwd=project_dir,
+                    env=env,
+                )
+                assert _wait_for(lambda: pid_file.exists() and bool(pid_file.read_text()))
+                job_pid = int(pid_file.read_text())
+                client.send_signal(client_signal)
+                assert client.wait(timeout=10) == expected_code
+                assert _wait_for(lambda: not _is_alive(job_pid))
+        finally:
+            worker.terminate()
+            worker.join(timeout=10)